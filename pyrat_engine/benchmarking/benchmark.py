@@ -1,18 +1,37 @@
 from typing import Callable, List
 
 import gc
+import numpy as np
 import random
 from timeit import Timer
 
 from pyrat_engine.benchmarking.config import BenchmarkConfig
 from pyrat_engine.engines.base import PyratEngine
+from pyrat_engine.engines.numpy_vectorized import BatchedNumpyEngine
 from pyrat_engine.initializer.initializer import CurrentStateInitializer
 from pyrat_engine.state.base import CurrentGameState
 from pyrat_engine.types import Move
 
 
-def run_moves(engine: PyratEngine, state: CurrentGameState, nb_moves: int) -> float:
-    """Run a series of nb_moves on the given state using the provided engine"""
+def random_legal_move(engine: PyratEngine, player: int) -> Move:
+    """Pick a random move among the legal moves of the player"""
+    return Move(random.choice(np.flatnonzero(engine.legal_moves(player))))
+
+
+def run_moves(
+    engine: PyratEngine,
+    state: CurrentGameState,
+    nb_moves: int,
+    legal_moves_only: bool = False,
+) -> float:
+    """Run a series of nb_moves on the given state using the provided engine
+    Args:
+        engine: the engine to benchmark
+        state: the state to start from
+        nb_moves: number of moves to make
+        legal_moves_only: if True, the players pick among their legal moves instead
+            of among every move. Picking the moves is then part of the timing.
+    """
 
     def setup():
         engine.set_current_game_state(state)
@@ -20,8 +39,12 @@ def run_moves(engine: PyratEngine, state: CurrentGameState, nb_moves: int) -> fl
 
     def run():
         for _ in range(nb_moves):
-            p1_move: Move = random.choice(list(Move))
-            p2_move: Move = random.choice(list(Move))
+            if legal_moves_only:
+                p1_move = random_legal_move(engine, 0)
+                p2_move = random_legal_move(engine, 1)
+            else:
+                p1_move: Move = random.choice(list(Move))
+                p2_move: Move = random.choice(list(Move))
             engine.move(p1_move, p2_move)
 
     timer = Timer(stmt=run, setup=setup)
@@ -42,7 +65,27 @@ def run_benchmark(
         # Create the state
         state = state_initializer()
         engine = engine_cls(state)
-        run_times = run_moves(engine, state, bench_config.nb_moves_per_run)
+        run_times = run_moves(
+            engine,
+            state,
+            bench_config.nb_moves_per_run,
+            legal_moves_only=bench_config.legal_moves_only,
+        )
         times.append(run_times)
 
     return times
+
+
+def games_per_second(
+    engine: BatchedNumpyEngine, nb_moves: int, rng: np.random.Generator
+) -> float:
+    """Number of game turns per second played by the engine, over nb_moves random
+    moves of the whole batch. Finished games are reset so that the batch stays full."""
+    moves = rng.integers(0, len(Move), size=(nb_moves, 2, engine.nb_games))
+
+    def play() -> None:
+        for p1_moves, p2_moves in moves:
+            engine.move(p1_moves, p2_moves)
+            engine.reset_games(engine.is_finished)
+
+    return nb_moves * engine.nb_games / Timer(play).timeit(number=1)
@@ -0,0 +1,149 @@
+"""Quick microbenchmark of the engines, run once per machine, maze size and batch
+size, and cached on disk. make_engine uses it to pick the fastest engine."""
+import json
+import os
+from typing import Callable, Dict, Mapping
+
+import math
+import numpy as np
+import platform
+import random
+from timeit import Timer
+
+from pyrat_engine.benchmarking.benchmark import games_per_second
+from pyrat_engine.state.base import CurrentGameState
+from pyrat_engine.types import Move
+
+# Directory of the calibration cache, ~/.cache/pyrat_engine when not set
+CACHE_DIR_ENV = "PYRAT_ENGINE_CACHE_DIR"
+
+
+def default_cache_path() -> str:
+    cache_dir = os.environ.get(CACHE_DIR_ENV) or os.path.join(
+        os.path.expanduser("~"), ".cache", "pyrat_engine"
+    )
+    return os.path.join(cache_dir, "calibration.json")
+
+
+def machine_key() -> str:
+    """Identify the machine and interpreter the timings were measured on"""
+    return (
+        f"{platform.node()}/{platform.machine()}/"
+        f"{platform.python_implementation()}-{platform.python_version()}"
+    )
+
+
+def calibration_key(state: CurrentGameState, batch_size: int = 1) -> str:
+    """Timings are shared by the mazes of the same size, and by the batch sizes
+    rounding up to the same power of two"""
+    batch_bucket = 1 << (batch_size - 1).bit_length()
+    return f"{state.maze_width}x{state.maze_height}/{batch_bucket}"
+
+
+def time_engine(
+    engine_cls: Callable,
+    state: CurrentGameState,
+    batch_size: int = 1,
+    nb_moves: int = 100,
+    repeat: int = 3,
+) -> float:
+    """Seconds per game turn of an engine playing random moves from state
+    Args:
+        engine_cls: the engine class, a batched engine when batch_size > 1
+        state: the state to start the games from
+        batch_size: number of games of the batch, 1 for a single game engine
+        nb_moves: number of moves of a timing
+        repeat: number of timings, the fastest one is kept
+
+    Returns:
+        the time per game turn, infinite if the engine does not handle state
+    """
+    try:
+        if batch_size > 1:
+            engine = engine_cls([state] * batch_size)
+        else:
+            engine = engine_cls(state)
+    except ValueError:
+        return math.inf
+
+    if batch_size > 1:
+        rng = np.random.default_rng(0)
+        with engine:
+            # The first move compiles or warms up whatever the engine needs
+            games_per_second(engine, 1, rng)
+            return min(
+                1 / games_per_second(engine, nb_moves, rng) for _ in range(repeat)
+            )
+
+    moves = [
+        (random.choice(list(Move)), random.choice(list(Move))) for _ in range(nb_moves)
+    ]
+    engine.move(*moves[0])
+    engine.reset()
+
+    def play() -> None:
+        for p1_move, p2_move in moves:
+            engine.move(p1_move, p2_move)
+            if engine.is_terminal():
+                engine.reset()
+
+    return min(Timer(play).repeat(repeat=repeat, number=1)) / nb_moves
+
+
+def load_calibration(path: str) -> Dict[str, Dict[str, float]]:
+    """Timings of this machine stored in the cache file, by calibration key then
+    by engine name. A missing or unreadable cache is empty."""
+    try:
+        with open(path) as cache_file:
+            cache = json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+    return cache.get(machine_key(), {}) if isinstance(cache, dict) else {}
+
+
+def save_calibration(path: str, timings: Dict[str, Dict[str, float]]) -> None:
+    """Store the timings of this machine, keeping those of the other machines"""
+    try:
+        with open(path) as cache_file:
+            cache = json.load(cache_file)
+        if not isinstance(cache, dict):
+            cache = {}
+    except (OSError, ValueError):
+        cache = {}
+    cache[machine_key()] = timings
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Write then rename, so that a concurrent reader never sees half a file
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "w") as cache_file:
+        json.dump(cache, cache_file, indent=2)
+    os.replace(temporary_path, path)
+
+
+def calibrated_timings(
+    engines: Mapping[str, Callable],
+    state: CurrentGameState,
+    batch_size: int = 1,
+    cache_path: str = None,
+) -> Dict[str, float]:
+    """Seconds per game turn of each engine on mazes like state, only timing the
+    engines missing from the cache
+    Args:
+        engines: engine classes by name
+        state: a state of the maze size to calibrate for
+        batch_size: number of games of the batch, 1 for single game engines
+        cache_path: (optional) the cache file, default_cache_path() by default
+    """
+    cache_path = cache_path or default_cache_path()
+    timings = load_calibration(cache_path)
+    key = calibration_key(state, batch_size)
+    key_timings = timings.setdefault(key, {})
+    missing = [name for name in engines if name not in key_timings]
+    for name in missing:
+        key_timings[name] = time_engine(engines[name], state, batch_size)
+    if missing:
+        try:
+            save_calibration(cache_path, timings)
+        except OSError:
+            # A read-only cache only means calibrating again next time
+            pass
+    return {name: key_timings[name] for name in engines}
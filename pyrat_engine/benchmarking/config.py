@@ -7,6 +7,8 @@ from pyrat_engine.initializer.configs import MazeConfig, PlayerConfig
 class BenchmarkConfig:
     nb_runs: int = 1000
     nb_moves_per_run: int = 200
+    # Random players only pick legal moves
+    legal_moves_only: bool = False
 
     maze_config: MazeConfig = MazeConfig()
     player_config: PlayerConfig = PlayerConfig()
@@ -2,6 +2,7 @@ from typing import Callable
 
 import random
 
+from pyrat_engine.benchmarking.benchmark import random_legal_move
 from pyrat_engine.engines.base import PyratEngine
 from pyrat_engine.initializer.configs import MazeConfig, PlayerConfig
 from pyrat_engine.initializer.initializer import CurrentStateInitializer
@@ -14,6 +15,7 @@ def profile_move(
     nb_moves: int,
     maze_config: MazeConfig = None,
     player_config: PlayerConfig = None,
+    legal_moves_only: bool = False,
 ):
     # Default parameters if not specified
     if maze_config is None:
@@ -28,6 +30,10 @@ def profile_move(
     engine = engine_cls(state)
     list_moves = list(Move)
     for _ in range(nb_moves):
-        p1_move: Move = random.choice(list_moves)
-        p2_move: Move = random.choice(list_moves)
+        if legal_moves_only:
+            p1_move = random_legal_move(engine, 0)
+            p2_move = random_legal_move(engine, 1)
+        else:
+            p1_move: Move = random.choice(list_moves)
+            p2_move: Move = random.choice(list_moves)
         engine.move(p1_move, p2_move)
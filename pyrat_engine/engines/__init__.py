@@ -0,0 +1,7 @@
+from pyrat_engine.engines.registry import (
+    ENGINES,
+    EngineSpec,
+    available_engines,
+    make_engine,
+    register_engine,
+)
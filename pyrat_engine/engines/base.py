@@ -1,14 +1,102 @@
 from abc import ABC, abstractmethod
-from typing import List, Tuple
+from typing import Any, Iterator, List, Optional, Tuple
+
+import copy
+import numpy as np
+import numpy.typing as npt
+from dataclasses import dataclass
 
 from pyrat_engine.state.base import CurrentGameState
-from pyrat_engine.types import Coordinates, Move
+from pyrat_engine.types import Coordinates, Move, Walls
+
+
+@dataclass
+class StepResult:
+    """What happened during a move, for both players"""
+
+    __slots__ = ("points", "eaten_cheeses", "missed", "muds", "is_terminal")
+
+    # Points won by each player
+    points: Tuple[float, float]
+    # Coordinates of the cheese eaten by each player, None if it did not eat any
+    eaten_cheeses: Tuple[Optional[Coordinates], Optional[Coordinates]]
+    # Whether each player stayed in place, because of a wall, mud or DID_NOT_MOVE
+    missed: Tuple[bool, bool]
+    # Mud counter of each player after the move
+    muds: Tuple[int, int]
+    # Whether the game is over after the move
+    is_terminal: bool
+
+
+def is_over(
+    remaining_cheeses: int,
+    player1_score: float,
+    player2_score: float,
+    half_cheeses: float,
+    turn: int = 0,
+    max_turns: Optional[int] = None,
+) -> bool:
+    """Whether a game is over : all the cheeses were eaten, a player has more than
+    half_cheeses points, or max_turns turns were played"""
+    return (
+        remaining_cheeses == 0
+        or player1_score > half_cheeses
+        or player2_score > half_cheeses
+        or (max_turns is not None and turn >= max_turns)
+    )
+
+
+def open_moves(
+    position: Coordinates, maze_width: int, maze_height: int, walls: Walls
+) -> Iterator[Tuple[Move, Coordinates]]:
+    """
+    The moves that can be made from position, in the Move order UP, LEFT, DOWN,
+    RIGHT, with the cell each one reaches. Engines building move tables use it so
+    that they all follow the same rules.
+    Args:
+        position: the cell to move from
+        maze_width: width of the maze
+        maze_height: height of the maze
+        walls: the walls of the maze, a wall may be listed from either of its cells
+
+    Returns:
+        (move, destination) pairs of the moves not blocked by a wall or the border
+    """
+    x, y = position
+    position_walls = walls.get(position, ())
+    for move, destination in zip(
+        (Move.UP, Move.LEFT, Move.DOWN, Move.RIGHT),
+        ((x, y + 1), (x - 1, y), (x, y - 1), (x + 1, y)),
+    ):
+        dest_x, dest_y = destination
+        if (
+            0 <= dest_x < maze_width
+            and 0 <= dest_y < maze_height
+            and destination not in position_walls
+            and position not in walls.get(destination, ())
+        ):
+            yield move, destination
+
+
+def winner_from_scores(player1_score: float, player2_score: float) -> Optional[int]:
+    """0 if player 1 has more points, 1 if player 2 has, None in case of a draw"""
+    if player1_score > player2_score:
+        return 0
+    if player2_score > player1_score:
+        return 1
+    return None
 
 
 class PyratEngine(ABC):
     """Interface definition for a PyratEngine.
     The engine is purely responsible for setting a (deterministic) state and running
-    it"""
+    it
+
+    Engines can be forked cheaply with clone and snapshot/restore. The static part of
+    the game (maze dimensions, walls and mud) is shared by reference between an
+    engine, its clones and its snapshots : it must never be modified in place.
+    Only the dynamic part (positions, muds, misses, scores and cheeses) is copied.
+    """
 
     @abstractmethod
     def reset(self) -> None:
@@ -40,6 +128,137 @@ class PyratEngine(ABC):
             The number of points gained by each players
         """
 
+    def step(self, p1_move: Move, p2_move: Move) -> StepResult:
+        """Make the player moves and describe what happened.
+        The default implementation compares the states before and after the move,
+        engines override it with something cheaper.
+        Args:
+            p1_move: The move from player 1
+            p2_move: The move from player 2
+
+        Returns:
+            The StepResult of the move
+        """
+        before = self.get_current_game_state()
+        points = self.move(p1_move, p2_move)
+        after = self.get_current_game_state()
+        eaten_cheeses = set(before.current_cheese_list) - set(after.current_cheese_list)
+        positions = (after.player1_pos, after.player2_pos)
+        return StepResult(
+            points=points,
+            eaten_cheeses=(
+                positions[0] if positions[0] in eaten_cheeses else None,
+                positions[1] if positions[1] in eaten_cheeses else None,
+            ),
+            missed=(
+                after.player1_misses > before.player1_misses,
+                after.player2_misses > before.player2_misses,
+            ),
+            muds=(after.player1_mud, after.player2_mud),
+            is_terminal=self.is_terminal(),
+        )
+
+    def step_many(
+        self, p1_moves: npt.ArrayLike, p2_moves: npt.ArrayLike
+    ) -> npt.NDArray[float]:
+        """Make a sequence of moves, stopping after the move that ends the game.
+        Args:
+            p1_moves: (nb_turns,) array of the moves of player 1, as ints
+            p2_moves: (nb_turns,) array of the moves of player 2, as ints
+
+        Returns:
+            a (nb_turns_played, 2) array of the points won by each player at each turn
+        """
+        p1_moves, p2_moves = move_sequences_as_lists(p1_moves, p2_moves)
+        rewards = np.zeros((len(p1_moves), 2))
+        for turn, (p1_move, p2_move) in enumerate(zip(p1_moves, p2_moves)):
+            step_result = self.step(Move(p1_move), Move(p2_move))
+            rewards[turn] = step_result.points
+            if step_result.is_terminal:
+                return rewards[: turn + 1]
+        return rewards
+
+    def advance_until_decision(self) -> int:
+        """Play the turns in which no player has a real choice : both players are
+        stuck in mud, or can't leave their cell. Stops as soon as a player is free in
+        a cell it can leave, when nothing changes anymore, or when the game is over.
+        The default implementation plays DID_NOT_MOVE one turn at a time, engines
+        override it with something cheaper.
+        Returns:
+            The number of turns played
+        """
+        nb_turns = 0
+        while not self.is_terminal():
+            if self.legal_moves(0)[: Move.DID_NOT_MOVE].any():
+                break
+            if self.legal_moves(1)[: Move.DID_NOT_MOVE].any():
+                break
+            state = self.get_current_game_state()
+            if state.player1_mud <= 0 and state.player2_mud <= 0:
+                break
+            self.move(Move.DID_NOT_MOVE, Move.DID_NOT_MOVE)
+            nb_turns += 1
+        return nb_turns
+
+    def legal_moves(self, player: int) -> npt.NDArray[bool]:
+        """Moves that change something for the player : the ones that do not bump
+        into a wall, and DID_NOT_MOVE. A player stuck in mud only has DID_NOT_MOVE.
+        Any illegal move has the same effect as DID_NOT_MOVE.
+        The default implementation goes through get_current_game_state.
+        Args:
+            player: 0 for player 1, 1 for player 2
+
+        Returns:
+            a (5,) array, legal_moves[move] says whether the move is legal
+        """
+        state = self.get_current_game_state()
+        position = (state.player1_pos, state.player2_pos)[player]
+        mud = (state.player1_mud, state.player2_mud)[player]
+        legal_moves = np.zeros((len(Move),), dtype=bool)
+        legal_moves[Move.DID_NOT_MOVE] = True
+        if mud > 0:
+            return legal_moves
+        for move, _ in open_moves(
+            position, state.maze_width, state.maze_height, state.walls
+        ):
+            legal_moves[move] = True
+        return legal_moves
+
+    def effective_joint_moves(self) -> List[Tuple[Move, Move]]:
+        """One joint move per distinct outcome of the next turn. Joint moves that
+        only differ by illegal moves have the same outcome, only the one using
+        DID_NOT_MOVE instead is kept."""
+        p1_moves = np.flatnonzero(self.legal_moves(0))
+        p2_moves = np.flatnonzero(self.legal_moves(1))
+        return [
+            (Move(p1_move), Move(p2_move))
+            for p1_move in p1_moves
+            for p2_move in p2_moves
+        ]
+
+    def is_terminal(self) -> bool:
+        """Whether the game is over : all the cheeses were eaten, or a player has more
+        than half of them. Engines built with a max_turns also stop after max_turns
+        turns. The default implementation goes through get_current_game_state."""
+        state = self.get_current_game_state()
+        remaining_cheeses = len(state.current_cheese_list)
+        score1, score2 = state.player1_score, state.player2_score
+        # Eaten cheeses are in the scores
+        half_cheeses = (remaining_cheeses + score1 + score2) / 2
+        return is_over(remaining_cheeses, score1, score2, half_cheeses)
+
+    def winner(self) -> Optional[int]:
+        """The player with the most points once the game is over, 0 for player 1 and
+        1 for player 2. None while the game goes on, or in case of a draw."""
+        if not self.is_terminal():
+            return None
+        return winner_from_scores(*self._scores())
+
+    def _scores(self) -> Tuple[float, float]:
+        """The scores of both players, engines override it with something cheaper"""
+        state = self.get_current_game_state()
+        return state.player1_score, state.player2_score
+
     @abstractmethod
     def unmove(
         self, p1_move: Move, p2_move: Move, cheeses: List[Coordinates] = None
@@ -50,3 +269,41 @@ class PyratEngine(ABC):
             p2_move: the move to unmake for player 2
             cheeses: (optional) Any cheeses to put back in
         """
+
+    def snapshot(self) -> Any:
+        """Save the dynamic part of the current state.
+        The default implementation goes through get_current_game_state, engines
+        override it with something cheaper.
+        Returns:
+            An opaque object, only meant to be given to restore on this engine or on
+            one of its clones
+        """
+        return self.get_current_game_state()
+
+    def restore(self, snapshot: Any) -> None:
+        """Go back to the state saved by snapshot.
+        The history of moves to unmake is lost.
+        Args:
+            snapshot: the value returned by snapshot
+        """
+        self.set_current_game_state(snapshot)
+
+    def clone(self) -> "PyratEngine":
+        """Return an independent engine in the same current state.
+        The clone starts with an empty history of moves to unmake, and resets to the
+        same initial state as this engine."""
+        return copy.deepcopy(self)
+
+
+def move_sequences_as_lists(
+    p1_moves: npt.ArrayLike, p2_moves: npt.ArrayLike
+) -> Tuple[List[int], List[int]]:
+    """Return the move sequences as lists of ints, raise if their lengths differ"""
+    p1_moves = np.asarray(p1_moves, dtype=int).tolist()
+    p2_moves = np.asarray(p2_moves, dtype=int).tolist()
+    if len(p1_moves) != len(p2_moves):
+        raise ValueError(
+            f"The players must have as many moves, got {len(p1_moves)} and "
+            f"{len(p2_moves)}"
+        )
+    return p1_moves, p2_moves
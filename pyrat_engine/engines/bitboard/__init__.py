@@ -0,0 +1 @@
+from pyrat_engine.engines.bitboard.engine import BitboardEngine
@@ -0,0 +1,7 @@
+from pyrat_engine.benchmarking.benchmark import run_benchmark
+from pyrat_engine.benchmarking.config import BenchmarkConfig
+from pyrat_engine.engines.bitboard import BitboardEngine
+
+if __name__ == "__main__":
+    times = run_benchmark(BitboardEngine, BenchmarkConfig())
+    print(f"mean time for a move operation : {sum(times)/len(times)}")
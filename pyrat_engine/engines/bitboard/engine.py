@@ -0,0 +1,272 @@
+from typing import Dict, List, Optional, Tuple
+
+import copy
+import numpy as np
+import numpy.typing as npt
+from dataclasses import dataclass
+
+from pyrat_engine.engines.base import PyratEngine, is_over, open_moves
+from pyrat_engine.state.base import (
+    AnyGameState,
+    CurrentGameState,
+    MazeTopology,
+    game_topology,
+)
+from pyrat_engine.types import Coordinates, Move
+
+# Dynamic part of the game : player 1 and player 2 positions, muds, misses and
+# scores, then the cheeses bitboard, the number of cheeses and the turn counter.
+# Bitboards are immutable ints, saving the state is saving this tuple.
+BitboardState = Tuple[int, int, int, int, int, int, float, float, int, int, int]
+
+
+@dataclass
+class _BitboardMaze:
+    """Static bitboards of a maze, shared between the engines playing on it"""
+
+    maze_width: int
+    maze_height: int
+    topology: MazeTopology
+    # Bit offset of each move, positive offsets are left shifts
+    offsets: Tuple[int, ...]
+    # open_moves[move] has the bits of the cells that can make move
+    open_moves: Tuple[int, ...]
+    # mud_moves[move] has the bits of the cells from which move goes through mud,
+    # mud_costs[move][bit] is the number of turns it takes
+    mud_moves: Tuple[int, ...]
+    mud_costs: Tuple[Dict[int, int], ...]
+
+    @classmethod
+    def from_topology(cls, topology: MazeTopology) -> "_BitboardMaze":
+        width, height = topology.maze_width, topology.maze_height
+        all_walls, all_muds = topology.walls_dict(), topology.mud_dict()
+        open_moves_bits = [0, 0, 0, 0]
+        mud_moves = [0, 0, 0, 0]
+        mud_costs: List[Dict[int, int]] = [{}, {}, {}, {}]
+        for x in range(width):
+            for y in range(height):
+                position = (x, y)
+                bit = 1 << (x * height + y)
+                muds = all_muds.get(position, {})
+                for move, destination in open_moves(position, width, height, all_walls):
+                    open_moves_bits[move] |= bit
+                    cost = muds.get(destination, 1)
+                    if cost > 1:
+                        mud_moves[move] |= bit
+                        mud_costs[move][bit] = cost
+        return cls(
+            maze_width=width,
+            maze_height=height,
+            topology=topology,
+            offsets=(1, -height, -1, height),
+            open_moves=tuple(open_moves_bits),
+            mud_moves=tuple(mud_moves),
+            mud_costs=tuple(mud_costs),
+        )
+
+
+class BitboardEngine(PyratEngine):
+    """Pure python engine storing the maze in int bitboards : bit x * maze_height + y
+    stands for the cell (x, y).
+    Player positions are single bit boards, the walls are one bitboard per direction
+    of the cells that can move that way, and the cheeses are one bitboard. A move is
+    a bit test and a shift, taking a cheese is a bit test.
+    Follows the same rules as NumpyEngine."""
+
+    def __init__(self, state: AnyGameState, max_turns: Optional[int] = None):
+        """
+        Args:
+            state: the state to start the game from
+            max_turns: (optional) the game is over after max_turns turns, see
+                NumpyEngine
+        """
+        self._max_turns = max_turns
+        self._load_maze(state)
+        self._load_state(state)
+        self._original = (self._maze, self.snapshot())
+
+    def _load_maze(self, state: AnyGameState) -> None:
+        """Get the static bitboards of the maze of state, shared by the games on the
+        same maze"""
+        topology = game_topology(state)
+        self._maze = topology.derived(_BitboardMaze, _BitboardMaze.from_topology)
+
+    def _load_state(self, state: AnyGameState) -> None:
+        """Start from the dynamic part of state"""
+        height = state.maze_height
+        cheeses = 0
+        for x, y in state.current_cheese_list:
+            cheeses |= 1 << (x * height + y)
+        self._p1 = 1 << (state.player1_pos[0] * height + state.player1_pos[1])
+        self._p2 = 1 << (state.player2_pos[0] * height + state.player2_pos[1])
+        self._mud1, self._mud2 = state.player1_mud, state.player2_mud
+        self._misses1, self._misses2 = state.player1_misses, state.player2_misses
+        self._score1 = float(state.player1_score)
+        self._score2 = float(state.player2_score)
+        self._cheeses = cheeses
+        self._nb_cheeses = bin(cheeses).count("1")
+        self._turn = 0
+        self._undo_log: List[BitboardState] = []
+        # Eaten cheeses are in the scores, the total does not change during a game
+        self._half_cheeses = (self._nb_cheeses + self._score1 + self._score2) / 2
+
+    def reset(self) -> None:
+        maze, snapshot = self._original
+        self._maze = maze
+        self.restore(snapshot)
+        self._half_cheeses = (self._nb_cheeses + self._score1 + self._score2) / 2
+
+    def set_current_game_state(self, current_game_state: CurrentGameState) -> None:
+        self._load_maze(current_game_state)
+        self._load_state(current_game_state)
+
+    def get_current_game_state(self) -> CurrentGameState:
+        maze = self._maze
+        return CurrentGameState(
+            maze_width=maze.maze_width,
+            maze_height=maze.maze_height,
+            walls=maze.topology.walls_dict(),
+            mud=maze.topology.mud_dict(),
+            current_cheese_list=[
+                divmod(bit, maze.maze_height)
+                for bit in range(self._cheeses.bit_length())
+                if self._cheeses >> bit & 1
+            ],
+            player1_pos=self._to_coordinates(self._p1),
+            player1_score=self._score1,
+            player1_mud=self._mud1,
+            player1_misses=self._misses1,
+            player2_pos=self._to_coordinates(self._p2),
+            player2_score=self._score2,
+            player2_mud=self._mud2,
+            player2_misses=self._misses2,
+        )
+
+    def _to_coordinates(self, position: int) -> Coordinates:
+        return divmod(position.bit_length() - 1, self._maze.maze_height)
+
+    def _move_player(self, position: int, mud: int, move: Move) -> Tuple[int, int]:
+        """New position and mud of a player making move"""
+        if mud > 0:
+            return position, mud - 1
+        if move == Move.DID_NOT_MOVE or not self._maze.open_moves[move] & position:
+            return position, 0
+        maze = self._maze
+        offset = maze.offsets[move]
+        new_position = position << offset if offset > 0 else position >> -offset
+        if maze.mud_moves[move] & position:
+            return new_position, maze.mud_costs[move][position] - 1
+        return new_position, 0
+
+    def move(self, p1_move: Move, p2_move: Move) -> Tuple[float, float]:
+        self._undo_log.append(self.snapshot())
+        p1, mud1 = self._move_player(self._p1, self._mud1, p1_move)
+        p2, mud2 = self._move_player(self._p2, self._mud2, p2_move)
+        if p1 == self._p1:
+            self._misses1 += 1
+        if p2 == self._p2:
+            self._misses2 += 1
+        self._p1, self._p2, self._mud1, self._mud2 = p1, p2, mud1, mud2
+        self._turn += 1
+
+        # Players out of the mud take the cheese of their cell, a cheese is shared
+        # between the players standing on its cell
+        cheeses = self._cheeses
+        share = 0.5 if p1 == p2 else 1.0
+        points1 = share if mud1 <= 0 and cheeses & p1 else 0.0
+        points2 = share if mud2 <= 0 and cheeses & p2 else 0.0
+        if points1:
+            cheeses ^= p1
+            self._nb_cheeses -= 1
+        if points2 and cheeses & p2:
+            cheeses ^= p2
+            self._nb_cheeses -= 1
+        self._cheeses = cheeses
+        self._score1 += points1
+        self._score2 += points2
+        return points1, points2
+
+    def unmove(
+        self, p1_move: Move, p2_move: Move, cheeses: List[Coordinates] = None
+    ) -> None:
+        """Unmake the last move, see NumpyEngine.unmove
+        Args:
+            p1_move: the move to unmake for player 1
+            p2_move: the move to unmake for player 2
+            cheeses: (optional) Any other cheeses to put back in
+        """
+        if not self._undo_log:
+            raise ValueError("There is no move to unmake")
+        self._set_state(self._undo_log.pop())
+        if cheeses is not None:
+            height = self._maze.maze_height
+            for x, y in cheeses:
+                bit = 1 << (x * height + y)
+                if not self._cheeses & bit:
+                    self._cheeses |= bit
+                    self._nb_cheeses += 1
+
+    def legal_moves(self, player: int) -> npt.NDArray[bool]:
+        position, mud = (
+            (self._p1, self._mud1) if player == 0 else (self._p2, self._mud2)
+        )
+        legal_moves = np.zeros((len(Move),), dtype=bool)
+        legal_moves[Move.DID_NOT_MOVE] = True
+        if mud <= 0:
+            for move in range(Move.DID_NOT_MOVE):
+                legal_moves[move] = bool(self._maze.open_moves[move] & position)
+        return legal_moves
+
+    def is_terminal(self) -> bool:
+        return is_over(
+            self._nb_cheeses,
+            self._score1,
+            self._score2,
+            self._half_cheeses,
+            self._turn,
+            self._max_turns,
+        )
+
+    def _scores(self) -> Tuple[float, float]:
+        return self._score1, self._score2
+
+    def snapshot(self) -> BitboardState:
+        """The dynamic part of the state, a tuple of ints and floats"""
+        return (
+            self._p1,
+            self._p2,
+            self._mud1,
+            self._mud2,
+            self._misses1,
+            self._misses2,
+            self._score1,
+            self._score2,
+            self._cheeses,
+            self._nb_cheeses,
+            self._turn,
+        )
+
+    def restore(self, snapshot: BitboardState) -> None:
+        self._set_state(snapshot)
+        self._undo_log = []
+
+    def _set_state(self, snapshot: BitboardState) -> None:
+        (
+            self._p1,
+            self._p2,
+            self._mud1,
+            self._mud2,
+            self._misses1,
+            self._misses2,
+            self._score1,
+            self._score2,
+            self._cheeses,
+            self._nb_cheeses,
+            self._turn,
+        ) = snapshot
+
+    def clone(self) -> "BitboardEngine":
+        """Clone sharing the maze bitboards, the state is made of immutable values"""
+        clone = copy.copy(self)
+        clone._undo_log = []
+        return clone
@@ -0,0 +1 @@
+from pyrat_engine.engines.flat_array.engine import FlatArrayEngine
@@ -0,0 +1,7 @@
+from pyrat_engine.benchmarking.benchmark import run_benchmark
+from pyrat_engine.benchmarking.config import BenchmarkConfig
+from pyrat_engine.engines.flat_array import FlatArrayEngine
+
+if __name__ == "__main__":
+    times = run_benchmark(FlatArrayEngine, BenchmarkConfig())
+    print(f"mean time for a move operation : {sum(times)/len(times)}")
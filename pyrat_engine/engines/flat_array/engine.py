@@ -0,0 +1,301 @@
+from typing import List, Optional, Tuple
+
+import copy
+import numpy as np
+import numpy.typing as npt
+from array import array
+from dataclasses import dataclass
+
+from pyrat_engine.engines.base import PyratEngine, is_over, open_moves
+from pyrat_engine.state.base import (
+    AnyGameState,
+    CurrentGameState,
+    MazeTopology,
+    game_topology,
+)
+from pyrat_engine.types import Coordinates, Move
+
+_NB_MOVES = len(Move)
+
+# Dynamic part of the game : player 1 and player 2 slots, muds, misses and scores,
+# then the number of cheeses and the turn counter. The cheeses bytearray is not
+# part of it.
+FlatArrayState = Tuple[int, int, int, int, int, int, float, float, int, int]
+
+
+@dataclass
+class _FlatMaze:
+    """Static tables of a maze, shared between the engines playing on it.
+    Cells are numbered x * maze_height + y, and a cell is stored as its slot
+    cell * 5 so that the tables are indexed by slot + move without a multiplication.
+    """
+
+    maze_width: int
+    maze_height: int
+    topology: MazeTopology
+    # Slot reached by each move, the slot itself if the move is blocked
+    next_cell: array
+    # Number of turns each move takes, 1 for blocked moves
+    move_cost: array
+
+    @classmethod
+    def from_topology(cls, topology: MazeTopology) -> "_FlatMaze":
+        width, height = topology.maze_width, topology.maze_height
+        all_walls, all_muds = topology.walls_dict(), topology.mud_dict()
+        if _NB_MOVES * width * height > 1 << 16:
+            raise ValueError(
+                f"A {width}x{height} maze has too many cells for 16 bits slots"
+            )
+        next_cell = array("H", bytes(2 * _NB_MOVES * width * height))
+        move_cost = array("B", [1] * (_NB_MOVES * width * height))
+        for x in range(width):
+            for y in range(height):
+                position = (x, y)
+                slot = (x * height + y) * _NB_MOVES
+                muds = all_muds.get(position, {})
+                # Blocked moves and DID_NOT_MOVE stay in place
+                for move in range(_NB_MOVES):
+                    next_cell[slot + move] = slot
+                for move, (dest_x, dest_y) in open_moves(
+                    position, width, height, all_walls
+                ):
+                    next_cell[slot + move] = (dest_x * height + dest_y) * _NB_MOVES
+                    move_cost[slot + move] = muds.get((dest_x, dest_y), 1)
+        return cls(
+            maze_width=width,
+            maze_height=height,
+            topology=topology,
+            next_cell=next_cell,
+            move_cost=move_cost,
+        )
+
+
+class FlatArrayEngine(PyratEngine):
+    """Pure python engine on flat array tables : the cell reached and the cost of
+    each move of each cell, a bytearray of the cheeses, and plain int and float
+    fields for the players. A move is a couple of table lookups per player, which
+    makes it the fastest engine for a single game on a single core.
+    Follows the same rules as NumpyEngine."""
+
+    def __init__(self, state: AnyGameState, max_turns: Optional[int] = None):
+        """
+        Args:
+            state: the state to start the game from
+            max_turns: (optional) the game is over after max_turns turns, see
+                NumpyEngine
+        """
+        self._max_turns = max_turns
+        self._load(state)
+        self._original = (self._maze, self.snapshot())
+
+    def _slot(self, position: Coordinates) -> int:
+        return (position[0] * self._maze.maze_height + position[1]) * _NB_MOVES
+
+    def _coordinates(self, slot: int) -> Coordinates:
+        return divmod(slot // _NB_MOVES, self._maze.maze_height)
+
+    def _load(self, state: AnyGameState) -> None:
+        # The games on the same maze share its tables
+        topology = game_topology(state)
+        self._maze = topology.derived(_FlatMaze, _FlatMaze.from_topology)
+        # Indexed by slot, only one byte out of _NB_MOVES is used
+        self._cheeses = bytearray(len(self._maze.next_cell))
+        for cheese in state.current_cheese_list:
+            self._cheeses[self._slot(cheese)] = 1
+        self._p1 = self._slot(state.player1_pos)
+        self._p2 = self._slot(state.player2_pos)
+        self._mud1, self._mud2 = state.player1_mud, state.player2_mud
+        self._misses1, self._misses2 = state.player1_misses, state.player2_misses
+        self._score1 = float(state.player1_score)
+        self._score2 = float(state.player2_score)
+        self._nb_cheeses = sum(self._cheeses)
+        self._turn = 0
+        # Each record is the FlatArrayState before a move, and the slots of the
+        # cheeses eaten by each player during the move, -1 if none
+        self._undo_log: List[Tuple[FlatArrayState, int, int]] = []
+        # Eaten cheeses are in the scores, the total does not change during a game
+        self._half_cheeses = (self._nb_cheeses + self._score1 + self._score2) / 2
+
+    def reset(self) -> None:
+        maze, snapshot = self._original
+        self._maze = maze
+        self.restore(snapshot)
+        self._half_cheeses = (self._nb_cheeses + self._score1 + self._score2) / 2
+
+    def set_current_game_state(self, current_game_state: CurrentGameState) -> None:
+        self._load(current_game_state)
+
+    def get_current_game_state(self) -> CurrentGameState:
+        maze = self._maze
+        return CurrentGameState(
+            maze_width=maze.maze_width,
+            maze_height=maze.maze_height,
+            walls=maze.topology.walls_dict(),
+            mud=maze.topology.mud_dict(),
+            current_cheese_list=[
+                self._coordinates(slot)
+                for slot in range(0, len(self._cheeses), _NB_MOVES)
+                if self._cheeses[slot]
+            ],
+            player1_pos=self._coordinates(self._p1),
+            player1_score=self._score1,
+            player1_mud=self._mud1,
+            player1_misses=self._misses1,
+            player2_pos=self._coordinates(self._p2),
+            player2_score=self._score2,
+            player2_mud=self._mud2,
+            player2_misses=self._misses2,
+        )
+
+    def move(self, p1_move: Move, p2_move: Move) -> Tuple[float, float]:
+        p1 = old1 = self._p1
+        p2 = old2 = self._p2
+        mud1, mud2 = self._mud1, self._mud2
+        # Inlined _dynamic_state, saves a method call on the hot path
+        state = (
+            p1,
+            p2,
+            mud1,
+            mud2,
+            self._misses1,
+            self._misses2,
+            self._score1,
+            self._score2,
+            self._nb_cheeses,
+            self._turn,
+        )
+        next_cell = self._maze.next_cell
+        move_cost = self._maze.move_cost
+
+        # Stuck players stay in place, the others get the cost of their move
+        if mud1 > 0:
+            mud1 -= 1
+            self._misses1 += 1
+        else:
+            p1 = next_cell[old1 + p1_move]
+            mud1 = move_cost[old1 + p1_move] - 1
+            if p1 == old1:
+                self._misses1 += 1
+        if mud2 > 0:
+            mud2 -= 1
+            self._misses2 += 1
+        else:
+            p2 = next_cell[old2 + p2_move]
+            mud2 = move_cost[old2 + p2_move] - 1
+            if p2 == old2:
+                self._misses2 += 1
+        self._p1, self._p2, self._mud1, self._mud2 = p1, p2, mud1, mud2
+        self._turn += 1
+
+        # Players out of the mud take the cheese of their cell, a cheese is shared
+        # between the players standing on its cell
+        cheeses = self._cheeses
+        share = 0.5 if p1 == p2 else 1.0
+        points1 = share if mud1 <= 0 and cheeses[p1] else 0.0
+        points2 = share if mud2 <= 0 and cheeses[p2] else 0.0
+        eaten1 = eaten2 = -1
+        if points1:
+            cheeses[p1] = 0
+            self._nb_cheeses -= 1
+            self._score1 += points1
+            eaten1 = p1
+        if points2:
+            if cheeses[p2]:
+                cheeses[p2] = 0
+                self._nb_cheeses -= 1
+            self._score2 += points2
+            eaten2 = p2
+        self._undo_log.append((state, eaten1, eaten2))
+        return points1, points2
+
+    def unmove(
+        self, p1_move: Move, p2_move: Move, cheeses: List[Coordinates] = None
+    ) -> None:
+        """Unmake the last move, see NumpyEngine.unmove
+        Args:
+            p1_move: the move to unmake for player 1
+            p2_move: the move to unmake for player 2
+            cheeses: (optional) Any other cheeses to put back in
+        """
+        if not self._undo_log:
+            raise ValueError("There is no move to unmake")
+        state, eaten1, eaten2 = self._undo_log.pop()
+        self._set_state(state)
+        if eaten1 >= 0:
+            self._cheeses[eaten1] = 1
+        if eaten2 >= 0:
+            self._cheeses[eaten2] = 1
+        if cheeses is not None:
+            for cheese in cheeses:
+                slot = self._slot(cheese)
+                if not self._cheeses[slot]:
+                    self._cheeses[slot] = 1
+                    self._nb_cheeses += 1
+
+    def legal_moves(self, player: int) -> npt.NDArray[bool]:
+        slot, mud = (self._p1, self._mud1) if player == 0 else (self._p2, self._mud2)
+        next_cell = self._maze.next_cell
+        legal_moves = np.zeros((len(Move),), dtype=bool)
+        legal_moves[Move.DID_NOT_MOVE] = True
+        if mud <= 0:
+            for move in range(Move.DID_NOT_MOVE):
+                legal_moves[move] = next_cell[slot + move] != slot
+        return legal_moves
+
+    def is_terminal(self) -> bool:
+        return is_over(
+            self._nb_cheeses,
+            self._score1,
+            self._score2,
+            self._half_cheeses,
+            self._turn,
+            self._max_turns,
+        )
+
+    def _scores(self) -> Tuple[float, float]:
+        return self._score1, self._score2
+
+    def snapshot(self) -> Tuple[FlatArrayState, bytes]:
+        """The dynamic part of the state and a copy of the cheeses"""
+        return self._dynamic_state(), bytes(self._cheeses)
+
+    def restore(self, snapshot: Tuple[FlatArrayState, bytes]) -> None:
+        state, cheeses = snapshot
+        self._set_state(state)
+        self._cheeses = bytearray(cheeses)
+        self._undo_log = []
+
+    def clone(self) -> "FlatArrayEngine":
+        """Clone sharing the maze tables, with its own cheeses"""
+        clone = copy.copy(self)
+        clone._cheeses = bytearray(self._cheeses)
+        clone._undo_log = []
+        return clone
+
+    def _dynamic_state(self) -> FlatArrayState:
+        return (
+            self._p1,
+            self._p2,
+            self._mud1,
+            self._mud2,
+            self._misses1,
+            self._misses2,
+            self._score1,
+            self._score2,
+            self._nb_cheeses,
+            self._turn,
+        )
+
+    def _set_state(self, state: FlatArrayState) -> None:
+        (
+            self._p1,
+            self._p2,
+            self._mud1,
+            self._mud2,
+            self._misses1,
+            self._misses2,
+            self._score1,
+            self._score2,
+            self._nb_cheeses,
+            self._turn,
+        ) = state
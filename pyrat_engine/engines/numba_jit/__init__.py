@@ -0,0 +1,2 @@
+from pyrat_engine.engines.numba_jit.engine import NumbaEngine
+from pyrat_engine.engines.numba_jit.kernels import NUMBA_AVAILABLE
@@ -0,0 +1,9 @@
+from pyrat_engine.benchmarking.benchmark import run_benchmark
+from pyrat_engine.benchmarking.config import BenchmarkConfig
+from pyrat_engine.engines.numba_jit import NUMBA_AVAILABLE, NumbaEngine
+
+if __name__ == "__main__":
+    if not NUMBA_AVAILABLE:
+        print("numba is not installed, the kernels run as plain python")
+    times = run_benchmark(NumbaEngine, BenchmarkConfig())
+    print(f"mean time for a move operation : {sum(times)/len(times)}")
@@ -0,0 +1,165 @@
+from typing import List, Optional, Tuple
+
+import copy
+import numpy as np
+import numpy.typing as npt
+
+from pyrat_engine.engines.base import PyratEngine, StepResult
+from pyrat_engine.engines.numba_jit.kernels import move_kernel, unmove_kernel
+from pyrat_engine.engines.numpy_vectorized.base import NumpyState, UndoStack, to_cell
+from pyrat_engine.engines.numpy_vectorized.helpers import (
+    current_game_state_from_state,
+    state_from_current_state,
+    step_result_from_history,
+)
+from pyrat_engine.engines.numpy_vectorized.logic import is_finished, legal_moves
+from pyrat_engine.state.base import AnyGameState, CurrentGameState
+from pyrat_engine.types import Coordinates, Move
+
+
+def _numba_state_from_current_state(state: AnyGameState) -> NumpyState:
+    """NumpyState with float64 scores, numba kernels do not handle float16"""
+    numpy_state = state_from_current_state(state)
+    numpy_state.game_data.player_scores = numpy_state.game_data.player_scores.astype(
+        np.float64
+    )
+    return numpy_state
+
+
+class NumbaEngine(PyratEngine):
+    """Same game as NumpyEngine, on the same NumpyState, whose move and unmove are
+    scalar loops compiled by numba (see kernels). Without numba installed, the
+    kernels run as plain python : the engine still works, only slower.
+    The first move of a process compiles the kernels, or loads them from numba's
+    cache."""
+
+    def __init__(self, state: AnyGameState, max_turns: Optional[int] = None):
+        """
+        Args:
+            state: the state to start the game from
+            max_turns: (optional) the game is over after max_turns turns, see
+                NumpyEngine
+        """
+        self._max_turns = max_turns
+        self._history = UndoStack()
+        self._original_state = _numba_state_from_current_state(state)
+        self.state = self._original_state.fork()
+
+    def reset(self) -> None:
+        self.state = self._original_state.fork()
+
+    def set_current_game_state(self, current_game_state: CurrentGameState) -> None:
+        self.state = _numba_state_from_current_state(current_game_state)
+
+    def get_current_game_state(self) -> CurrentGameState:
+        return current_game_state_from_state(self._current_state)
+
+    def _move(self, p1_move: Move, p2_move: Move) -> int:
+        """Make the moves and record them in the history, return the record index"""
+        state = self._current_state
+        board = state.board
+        game_data = state.game_data
+        history = self._history
+        record = history.reserve()
+        history.turns[record] = state.turn
+        board.remaining_cheeses -= move_kernel(
+            int(p1_move),
+            int(p2_move),
+            board.player_cells,
+            game_data.player_muds,
+            game_data.player_misses,
+            game_data.player_scores,
+            board.cheese_cells,
+            board.next_cell,
+            board.move_cost,
+            history.player_cells,
+            history.player_muds,
+            history.player_misses,
+            history.points,
+            history.eaten_cheeses,
+            record,
+        )
+        state.turn += 1
+        return record
+
+    def move(self, p1_move: Move, p2_move: Move) -> Tuple[float, float]:
+        # _move may grow the history, its arrays are read after it
+        record = self._move(p1_move, p2_move)
+        points = self._history.points[record]
+        return float(points[0]), float(points[1])
+
+    def step(self, p1_move: Move, p2_move: Move) -> StepResult:
+        record = self._move(p1_move, p2_move)
+        points = self._history.points[record]
+        return step_result_from_history(
+            self._current_state, self._history, points, self.is_terminal()
+        )
+
+    def legal_moves(self, player: int) -> npt.NDArray[bool]:
+        return legal_moves(self._current_state)[player]
+
+    def is_terminal(self) -> bool:
+        return is_finished(self._current_state, self._max_turns)
+
+    def _scores(self) -> Tuple[float, float]:
+        score1, score2 = self._current_state.game_data.player_scores.tolist()
+        return score1, score2
+
+    def unmove(
+        self, p1_move: Move, p2_move: Move, cheeses: List[Coordinates] = None
+    ) -> None:
+        """Unmake the last move, see NumpyEngine.unmove
+        Args:
+            p1_move: the move to unmake for player 1
+            p2_move: the move to unmake for player 2
+            cheeses: (optional) Any other cheeses to put back in
+        """
+        history = self._history
+        if len(history) == 0:
+            raise ValueError("There is no move to unmake")
+        history.size -= 1
+        record = history.size
+        state = self._current_state
+        board = state.board
+        game_data = state.game_data
+        board.remaining_cheeses += unmove_kernel(
+            board.player_cells,
+            game_data.player_muds,
+            game_data.player_misses,
+            game_data.player_scores,
+            board.cheese_cells,
+            history.player_cells,
+            history.player_muds,
+            history.player_misses,
+            history.points,
+            history.eaten_cheeses,
+            record,
+        )
+        state.turn = int(history.turns[record])
+        if cheeses is not None:
+            for cheese in cheeses:
+                board.put_cheese(to_cell(cheese, board.maze_height))
+
+    def snapshot(self) -> NumpyState:
+        """Fork of the current state, sharing its static arrays"""
+        return self._current_state.fork()
+
+    def restore(self, snapshot: NumpyState) -> None:
+        self._current_state.restore(snapshot)
+        self._history.clear()
+
+    def clone(self) -> "NumbaEngine":
+        clone = copy.copy(self)
+        clone._history = UndoStack()
+        clone.state = self._current_state.fork()
+        return clone
+
+    @property
+    def state(self) -> NumpyState:
+        return self._current_state
+
+    @state.setter
+    def state(self, value: NumpyState):
+        self._current_state = value
+        # The history belongs to the previous state
+        self._history.clear()
@@ -0,0 +1,123 @@
+"""Move and unmove kernels of the NumbaEngine, working on the arrays of a NumpyState
+and of an UndoStack. They are compiled with numba when it is installed, and run as
+plain python otherwise."""
+import numpy as np
+import numpy.typing as npt
+
+try:
+    from numba import njit
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit, returns the function unchanged"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda function: function
+
+
+@njit(cache=True)
+def move_kernel(
+    p1_move: int,
+    p2_move: int,
+    player_cells: npt.NDArray[np.intp],
+    player_muds: npt.NDArray[int],
+    player_misses: npt.NDArray[int],
+    player_scores: npt.NDArray[float],
+    cheese_cells: npt.NDArray[bool],
+    next_cell: npt.NDArray[np.intp],
+    move_cost: npt.NDArray[np.uint8],
+    history_cells: npt.NDArray[np.intp],
+    history_muds: npt.NDArray[int],
+    history_misses: npt.NDArray[int],
+    history_points: npt.NDArray[float],
+    history_eaten_cheeses: npt.NDArray[np.intp],
+    record: int,
+) -> int:
+    """
+    Make the player moves in place, following the rules of logic.move, and write
+    the record needed to unmake them in the history arrays
+    Args:
+        p1_move: player 1's move
+        p2_move: player 2's move
+        player_cells, player_muds, player_misses, player_scores, cheese_cells,
+        next_cell, move_cost: the arrays of the NumpyState
+        history_cells, history_muds, history_misses, history_points,
+        history_eaten_cheeses: the arrays of the UndoStack
+        record: index of the history record to write
+
+    Returns:
+        the number of cheeses removed from the maze
+    """
+    for player in range(2):
+        history_cells[record, player] = player_cells[player]
+        history_muds[record, player] = player_muds[player]
+        history_misses[record, player] = player_misses[player]
+        history_points[record, player] = 0.0
+        history_eaten_cheeses[record, player] = -1
+
+    for player in range(2):
+        cell = player_cells[player]
+        if player_muds[player] > 0:
+            # Stuck in mud, the player stays in place
+            player_muds[player] -= 1
+            player_misses[player] += 1
+        else:
+            player_move = p1_move if player == 0 else p2_move
+            new_cell = next_cell[cell, player_move]
+            player_muds[player] = move_cost[cell, player_move] - 1
+            if new_cell == cell:
+                player_misses[player] += 1
+            player_cells[player] = new_cell
+
+    # A cheese is shared between the players standing on its cell
+    points = 0.5 if player_cells[0] == player_cells[1] else 1.0
+    for player in range(2):
+        cell = player_cells[player]
+        if player_muds[player] <= 0 and cheese_cells[cell]:
+            player_scores[player] += points
+            history_points[record, player] = points
+            history_eaten_cheeses[record, player] = cell
+
+    nb_eaten_cheeses = 0
+    for player in range(2):
+        cell = history_eaten_cheeses[record, player]
+        # Players sharing a cheese only eat one
+        if cell >= 0 and cheese_cells[cell]:
+            cheese_cells[cell] = False
+            nb_eaten_cheeses += 1
+    return nb_eaten_cheeses
+
+
+@njit(cache=True)
+def unmove_kernel(
+    player_cells: npt.NDArray[np.intp],
+    player_muds: npt.NDArray[int],
+    player_misses: npt.NDArray[int],
+    player_scores: npt.NDArray[float],
+    cheese_cells: npt.NDArray[bool],
+    history_cells: npt.NDArray[np.intp],
+    history_muds: npt.NDArray[int],
+    history_misses: npt.NDArray[int],
+    history_points: npt.NDArray[float],
+    history_eaten_cheeses: npt.NDArray[np.intp],
+    record: int,
+) -> int:
+    """
+    Restore the state arrays from a history record written by move_kernel
+    Returns:
+        the number of cheeses put back in the maze
+    """
+    nb_restored_cheeses = 0
+    for player in range(2):
+        player_cells[player] = history_cells[record, player]
+        player_muds[player] = history_muds[record, player]
+        player_misses[player] = history_misses[record, player]
+        player_scores[player] -= history_points[record, player]
+        cell = history_eaten_cheeses[record, player]
+        if cell >= 0 and not cheese_cells[cell]:
+            cheese_cells[cell] = True
+            nb_restored_cheeses += 1
+    return nb_restored_cheeses
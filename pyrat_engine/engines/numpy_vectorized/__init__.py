@@ -1 +1,3 @@
+from pyrat_engine.engines.numpy_vectorized.batched_engine import BatchedNumpyEngine
 from pyrat_engine.engines.numpy_vectorized.engine import NumpyEngine
+from pyrat_engine.engines.numpy_vectorized.packed_engine import PackedNumpyEngine
@@ -1,14 +1,127 @@
-from typing import List
+from typing import Iterable, List, Mapping, Optional, Sequence, Tuple
 
+import copy
 import numpy as np
 import numpy.typing as npt
 from dataclasses import dataclass
+from itertools import chain
 
+from pyrat_engine.state.base import MazeTopology
 from pyrat_engine.types import Coordinates, Move, Muds, Walls
-from pyrat_engine.utils import get_direction
+
+# _DIRECTIONS[dx + 1][dy + 1] is the move going from (x, y) to (x + dx, y + dy),
+# -1 if the coordinates are not adjacent
+_DIRECTIONS = np.array(
+    [
+        [-1, Move.LEFT, -1],
+        [Move.DOWN, Move.DID_NOT_MOVE, Move.UP],
+        [-1, Move.RIGHT, -1],
+    ],
+    dtype=np.intp,
+)
+# OPPOSITE_MOVES[move] is the move that goes back
+OPPOSITE_MOVES = np.array(
+    [Move.DOWN, Move.RIGHT, Move.UP, Move.LEFT, Move.DID_NOT_MOVE], dtype=np.intp
+)
+
+
+def to_cell(coordinates: Coordinates, maze_height: int) -> int:
+    """
+    Return the flat cell index of the coordinates.
+    Cells are numbered column by column : cell = x * maze_height + y
+    """
+    return coordinates[0] * maze_height + coordinates[1]
+
+
+def to_coordinates(cell, maze_height: int):
+    """Inverse of to_cell, works on ints and on arrays of cells"""
+    return divmod(cell, maze_height)
+
+
+def get_directions(
+    coordinates: npt.NDArray[np.intp], others: npt.NDArray[np.intp]
+) -> npt.NDArray[np.intp]:
+    """
+    Array version of utils.get_direction
+    Args:
+        coordinates: (n, 2) array of the coordinates we're starting from
+        others: (n, 2) array of the coordinates to get to
+
+    Returns:
+        a (n,) array of the moves to get from each coordinate to the other one
+    """
+    offsets = others - coordinates
+    is_close = (np.abs(offsets) <= 1).all(axis=1)
+    moves = np.full(len(offsets), -1, dtype=np.intp)
+    moves[is_close] = _DIRECTIONS[offsets[is_close, 0] + 1, offsets[is_close, 1] + 1]
+    if (moves < 0).any():
+        index = np.argmin(moves)
+        raise ValueError(
+            f"Coordinates {tuple(coordinates[index].tolist())} and "
+            f"{tuple(others[index].tolist())} are not adjacent"
+        )
+    return moves
+
+
+def edge_arrays(
+    edges: Mapping[Coordinates, Iterable[Coordinates]]
+) -> Tuple[npt.NDArray[np.intp], npt.NDArray[np.intp]]:
+    """
+    Flatten a Walls or Muds dict into arrays of edges
+    Args:
+        edges: dict giving the neighbours of each coordinate
+
+    Returns:
+        two (nb_edges, 2) arrays, the coordinates and the neighbour of each edge
+    """
+    nb_neighbours = [len(neighbours) for neighbours in edges.values()]
+    # Read the coordinates as flat sequences of ints, much faster than from tuples
+    coordinates = np.fromiter(
+        chain.from_iterable(edges.keys()), dtype=np.intp, count=2 * len(edges)
+    ).reshape(-1, 2)
+    neighbours = np.fromiter(
+        chain.from_iterable(chain.from_iterable(edges.values())),
+        dtype=np.intp,
+        count=2 * sum(nb_neighbours),
+    ).reshape(-1, 2)
+    return np.repeat(coordinates, nb_neighbours, axis=0), neighbours
+
+
+def build_transitions(
+    can_move: npt.NDArray[bool], cost: npt.NDArray[np.uint8]
+) -> Tuple[npt.NDArray[np.intp], npt.NDArray[np.uint8]]:
+    """
+    Build the per cell transition tables of a maze
+    Args:
+        can_move: (width, height, 5) array, whether each move is possible
+        cost: (width, height, 5) array, number of turns each move takes
+
+    Returns:
+        next_cell, a (width * height, 5) array of the cell reached by each move
+        move_cost, a (width * height, 5) array of the number of turns each move takes.
+            Impossible moves take 1 turn.
+    """
+    maze_width, maze_height = can_move.shape[:2]
+    # Cell offset of each move, in the Move order
+    cell_offsets = np.array([1, -maze_height, -1, maze_height, 0], dtype=np.intp)
+    cells = np.arange(maze_width * maze_height, dtype=np.intp)[:, np.newaxis]
+    flat_can_move = can_move.reshape(maze_width * maze_height, 5)
+    next_cell = np.where(flat_can_move, cells + cell_offsets, cells)
+    move_cost = np.where(
+        flat_can_move, cost.reshape(maze_width * maze_height, 5), 1
+    ).astype(np.uint8)
+    return next_cell, move_cost
 
 
 class Board:
+    """
+    Numpy representation of a maze and of the players on it.
+    can_move, cost, next_cell and move_cost are the static part of the board, they are
+    shared between a board and its forks, and between the boards on the same
+    topology. They must never be modified in place.
+    player_cells and cheese_cells are the dynamic part, each fork has its own.
+    """
+
     def __init__(
         self,
         maze_width: int,
@@ -21,15 +134,16 @@ class Board:
     ):
         self.maze_width = maze_width
         self.maze_height = maze_height
-        # width x height array with a True where there is a player
+        # The topology the static arrays are shared through, see helpers.maze_board.
+        # It keeps the topology interned as long as a board uses its arrays.
+        self.topology: Optional[MazeTopology] = None
+        # self.player_cells[player] is the cell index of the player (see to_cell)
         # 0 is rat
         # 1 is snake
-        # Array is in column major ('F') order because
-        # most operations on this array are along the last dimension
-        self.player_positions: npt.NDArray[bool] = np.zeros(
-            (maze_width, maze_height, 2), dtype=bool, order="F"
+        self.player_cells: npt.NDArray[np.intp] = np.array(
+            [to_cell(p1_pos, maze_height), to_cell(p2_pos, maze_height)],
+            dtype=np.intp,
         )
-        self._init_player_positions(p1_pos, p2_pos)
 
         # self.can_move[x][y][Move.UP][0] gets whether we can go up
         # shape = (width, height, 5)
@@ -42,18 +156,35 @@ class Board:
         )  # max mud = 256 on uint8
         self._init_muds(muds)
 
-        # self.cheeses[x][y] says whether there is a cheese in (x,y)
-        # Order is set to column major order ('F') because
-        # Most operations are done along the last dimension
-        self.cheeses: npt.NDArray[bool] = np.zeros(
-            (maze_width, maze_height), dtype=bool, order="F"
+        # Transition tables, indexed by [cell, move]
+        # self.next_cell[cell][Move.UP] is the cell a player in cell ends up in
+        # when going up. It is the cell itself if the move is impossible.
+        # self.move_cost[cell][Move.UP] says how much turns it takes to go up
+        self.next_cell: npt.NDArray[np.intp]
+        self.move_cost: npt.NDArray[np.uint8]
+        self._init_transitions()
+
+        # self.cheese_cells[cell] says whether there is a cheese in the cell
+        self.cheese_cells: npt.NDArray[bool] = np.zeros(
+            (maze_width * maze_height,), dtype=bool
         )
+        # Number of True values in cheese_cells, kept up to date by every move
+        self.remaining_cheeses: int = 0
         self._init_cheeses(cheeses)
 
-    def _init_player_positions(self, p1_pos: Coordinates, p2_pos: Coordinates) -> None:
-        """Place the players at the provided positions"""
-        self.player_positions[p1_pos][0] = True
-        self.player_positions[p2_pos][1] = True
+    @property
+    def player_positions(self) -> npt.NDArray[bool]:
+        """
+        (width, height, nb_players) array with a True where there is a player.
+        It is built from player_cells on every access, the engine does not use it.
+        """
+        nb_players = len(self.player_cells)
+        player_positions = np.zeros(
+            (self.maze_width, self.maze_height, nb_players), dtype=bool, order="F"
+        )
+        x, y = to_coordinates(self.player_cells, self.maze_height)
+        player_positions[x, y, np.arange(nb_players)] = True
+        return player_positions
 
     def _create_labyrinth_boundaries(self) -> npt.NDArray[bool]:
         """
@@ -64,6 +195,13 @@ class Board:
         can_move = np.ones(
             (self.maze_width, self.maze_height, 5), dtype=bool, order="F"
         )
+        self._init_boundaries(can_move)
+        return can_move
+
+    def _init_boundaries(self, can_move: npt.NDArray[bool]) -> None:
+        """Allow every move of can_move, except through the 4 border walls and the
+        null move"""
+        can_move[...] = True
         # Can't move up from upper row
         can_move[:, self.maze_height - 1, Move.UP] = False
 
@@ -79,18 +217,13 @@ class Board:
         # Can't move with a null move
         can_move[:, :, Move.DID_NOT_MOVE] = False
 
-        return can_move
-
     def _init_walls(self, walls: Walls) -> None:
-        for coordinate, neighbours in walls.items():
-            for neighbour in neighbours:
-                move = get_direction(coordinate, neighbour)
-                # Can't move from coordinate to neighbour
-                self.can_move[coordinate][move] = False
-
-                # opposite move
-                opposite_move = get_direction(neighbour, coordinate)
-                self.can_move[neighbour][opposite_move] = False
+        coordinates, neighbours = edge_arrays(walls)
+        moves = get_directions(coordinates, neighbours)
+        # Can't move from coordinate to neighbour
+        self.can_move[coordinates[:, 0], coordinates[:, 1], moves] = False
+        # opposite move
+        self.can_move[neighbours[:, 0], neighbours[:, 1], OPPOSITE_MOVES[moves]] = False
 
     def _init_muds(self, muds: Muds) -> None:
         """
@@ -98,14 +231,144 @@ class Board:
         Args:
             muds: Muds type dict, containing costs to go to the neighbours
         """
-        for coordinate, neighbours in muds.items():
-            for neighbour in neighbours:
-                move = get_direction(coordinate, neighbour)
-                self.cost[coordinate][move] = neighbours[neighbour]
+        coordinates, neighbours = edge_arrays(muds)
+        moves = get_directions(coordinates, neighbours)
+        costs = np.fromiter(
+            chain.from_iterable(neighbours.values() for neighbours in muds.values()),
+            dtype=np.uint8,
+            count=len(moves),
+        )
+        self.cost[coordinates[:, 0], coordinates[:, 1], moves] = costs
+
+    def _init_transitions(self) -> None:
+        """Build the next_cell and move_cost tables from can_move and cost"""
+        self.next_cell, self.move_cost = build_transitions(self.can_move, self.cost)
 
     def _init_cheeses(self, cheeses: List[Coordinates]) -> None:
-        for cheese in cheeses:
-            self.cheeses[cheese] = True
+        coordinates = np.fromiter(
+            chain.from_iterable(cheeses), dtype=np.intp, count=2 * len(cheeses)
+        ).reshape(-1, 2)
+        self.cheese_cells[to_cell(coordinates.T, self.maze_height)] = True
+        self.remaining_cheeses = int(np.count_nonzero(self.cheese_cells))
+
+    @property
+    def cheeses(self) -> npt.NDArray[bool]:
+        """(width, height) view on cheese_cells, self.cheeses[x][y] says whether there
+        is a cheese in (x,y). Use put_cheese and remove_cheese to modify it."""
+        return self.cheese_cells.reshape(self.maze_width, self.maze_height)
+
+    def put_cheese(self, cell: int) -> None:
+        """Place a cheese in the cell, if there is not one already"""
+        if not self.cheese_cells[cell]:
+            self.cheese_cells[cell] = True
+            self.remaining_cheeses += 1
+
+    def remove_cheese(self, cell: int) -> None:
+        """Remove the cheese of the cell, if there is one"""
+        if self.cheese_cells[cell]:
+            self.cheese_cells[cell] = False
+            self.remaining_cheeses -= 1
+
+    def use_maze(self, maze: "Board") -> None:
+        """
+        Switch to the maze of another board of the same dimensions, sharing its static
+        arrays. The forks of this board keep the previous maze : they must not be
+        used to restore it afterwards.
+        """
+        self.topology = maze.topology
+        self.can_move = maze.can_move
+        self.cost = maze.cost
+        self.next_cell = maze.next_cell
+        self.move_cost = maze.move_cost
+
+    def place(
+        self, p1_pos: Coordinates, p2_pos: Coordinates, cheeses: List[Coordinates]
+    ) -> None:
+        """Refill the player cells and the cheeses in place"""
+        self.player_cells[0] = to_cell(p1_pos, self.maze_height)
+        self.player_cells[1] = to_cell(p2_pos, self.maze_height)
+        self.cheese_cells.fill(False)
+        self._init_cheeses(cheeses)
+
+    def fork(self) -> "Board":
+        """Copy of the board sharing its static arrays"""
+        forked = copy.copy(self)
+        forked.player_cells = self.player_cells.copy()
+        forked.cheese_cells = self.cheese_cells.copy()
+        return forked
+
+    def restore(self, other: "Board") -> None:
+        """Copy the dynamic part of other, a fork of this board, in place"""
+        np.copyto(self.player_cells, other.player_cells)
+        np.copyto(self.cheese_cells, other.cheese_cells)
+        self.remaining_cheeses = other.remaining_cheeses
+
+    def pad(self, width: int, height: int) -> "Board":
+        """
+        Copy of the board in the lower left corner of a bigger width x height board.
+        The padding cells have no cheese and are unreachable : the real cells keep
+        their boundary walls, and no move is possible from a padding cell.
+        """
+        if width < self.maze_width or height < self.maze_height:
+            raise ValueError(
+                f"Cannot pad a {self.maze_width}x{self.maze_height} board to "
+                f"{width}x{height}"
+            )
+        real_cells = (slice(0, self.maze_width), slice(0, self.maze_height))
+        can_move = np.zeros((width, height, 5), dtype=bool)
+        can_move[real_cells] = self.can_move
+        cost = np.ones((width, height, 5), dtype=np.uint8)
+        cost[real_cells] = self.cost
+        cheeses = np.zeros((width, height), dtype=bool)
+        cheeses[real_cells] = self.cheeses
+        x, y = to_coordinates(self.player_cells, self.maze_height)
+        return Board.from_arrays(
+            player_cells=to_cell((x, y), height),
+            can_move=can_move,
+            cost=cost,
+            cheese_cells=cheeses.reshape(width * height),
+        )
+
+    def crop(self, width: int, height: int) -> "Board":
+        """Inverse of pad, copy of the width x height lower left corner of the board"""
+        real_cells = (slice(0, width), slice(0, height))
+        x, y = to_coordinates(self.player_cells, self.maze_height)
+        return Board.from_arrays(
+            player_cells=to_cell((x, y), height),
+            can_move=self.can_move[real_cells].copy(),
+            cost=self.cost[real_cells].copy(),
+            cheese_cells=self.cheeses[real_cells].reshape(width * height).copy(),
+        )
+
+    @classmethod
+    def from_arrays(
+        cls,
+        player_cells: npt.NDArray[np.intp],
+        can_move: npt.NDArray[bool],
+        cost: npt.NDArray[np.uint8],
+        cheese_cells: npt.NDArray[bool],
+        next_cell: Optional[npt.NDArray[np.intp]] = None,
+        move_cost: Optional[npt.NDArray[np.uint8]] = None,
+    ) -> "Board":
+        """
+        Build a Board directly from its arrays, without going through the walls and
+        muds dicts. The arrays are used as is, not copied.
+        The transition tables are built from can_move and cost if they are not given.
+        """
+        board = cls.__new__(cls)
+        board.maze_width, board.maze_height = can_move.shape[:2]
+        board.topology = None
+        board.player_cells = player_cells
+        board.can_move = can_move
+        board.cost = cost
+        board.cheese_cells = cheese_cells
+        board.remaining_cheeses = int(np.count_nonzero(cheese_cells))
+        if next_cell is None or move_cost is None:
+            board._init_transitions()
+        else:
+            board.next_cell = next_cell
+            board.move_cost = move_cost
+        return board
 
 
 @dataclass
@@ -114,8 +377,585 @@ class GameData:
     player_muds: npt.NDArray[int]
     player_misses: npt.NDArray[int]
 
+    def copy(self) -> "GameData":
+        return GameData(
+            player_scores=self.player_scores.copy(),
+            player_muds=self.player_muds.copy(),
+            player_misses=self.player_misses.copy(),
+        )
+
+    def restore(self, other: "GameData") -> None:
+        """Copy the values of other in place"""
+        np.copyto(self.player_scores, other.player_scores)
+        np.copyto(self.player_muds, other.player_muds)
+        np.copyto(self.player_misses, other.player_misses)
+
 
 @dataclass
 class NumpyState:
     board: Board
     game_data: GameData
+    # Number of turns played since the state was built
+    turn: int = 0
+
+    def fork(self) -> "NumpyState":
+        """Copy of the state sharing the static arrays of the board"""
+        return NumpyState(
+            board=self.board.fork(), game_data=self.game_data.copy(), turn=self.turn
+        )
+
+    def restore(self, other: "NumpyState") -> None:
+        """Copy the dynamic part of other, a fork of this state, in place"""
+        self.board.restore(other.board)
+        self.game_data.restore(other.game_data)
+        self.turn = other.turn
+
+
+class PackedBoard:
+    """
+    Compact version of a Board, for when many boards have to be kept in memory.
+    It holds the same information in a few bytes per cell :
+    - 4 wall bits per cell, 2 cells per byte
+    - a sparse table of the muddy passages only, each stored once
+    - 1 cheese bit per cell
+    The engine steps on it directly (see logic.packed_move), at the price of
+    decoding the bits of the 2 player cells on every move.
+    Convert from and to a Board with from_board and to_board.
+    """
+
+    def __init__(
+        self,
+        maze_width: int,
+        maze_height: int,
+        player_cells: npt.NDArray[np.uint32],
+        wall_bits: npt.NDArray[np.uint8],
+        mud_keys: npt.NDArray[np.uint32],
+        mud_costs: npt.NDArray[np.uint8],
+        cheese_bits: npt.NDArray[np.uint8],
+    ):
+        self.maze_width = maze_width
+        self.maze_height = maze_height
+        # shape = (2,)
+        self.player_cells = player_cells
+        # Nibble of cell c in wall_bits[c // 2], the low one for even cells.
+        # Bit `move` of the nibble is set when the move is blocked by a wall or by
+        # the maze boundaries.
+        # shape = (ceil(width * height / 2),)
+        self.wall_bits = wall_bits
+        # Sorted keys of the muddy passages, and the number of turns they take.
+        # A passage is keyed from its lower or leftmost cell : cell * 2 + 0 for the
+        # passage going up, cell * 2 + 1 for the one going right.
+        # shape = (nb_muds,)
+        self.mud_keys = mud_keys
+        self.mud_costs = mud_costs
+        # Bit c % 8 of cheese_bits[c // 8] says whether there is a cheese in cell c
+        # shape = (ceil(width * height / 8),)
+        self.cheese_bits = cheese_bits
+        self.remaining_cheeses: int = int(
+            np.unpackbits(cheese_bits, bitorder="little").sum()
+        )
+        # Cell offset of each move, in the Move order
+        self.cell_offsets = np.array([1, -maze_height, -1, maze_height, 0], dtype=int)
+
+    @classmethod
+    def from_board(cls, board: Board) -> "PackedBoard":
+        nb_cells = board.maze_width * board.maze_height
+        can_move = board.can_move.reshape(nb_cells, 5)
+        cost = board.cost.reshape(nb_cells, 5)
+
+        # Bit `move` set for the blocked moves, padded to an even number of cells
+        nibbles = np.zeros((nb_cells + nb_cells % 2,), dtype=np.uint8)
+        nibbles[:nb_cells] = np.packbits(
+            ~can_move[:, : Move.DID_NOT_MOVE], axis=1, bitorder="little"
+        )[:, 0]
+        wall_bits = nibbles[0::2] | (nibbles[1::2] << 4)
+
+        # (nb_cells, 2) whether the passage up and right of each cell is muddy.
+        # Mud behind a wall is kept too, so that the conversion is lossless.
+        muddy = cost[:, [Move.UP, Move.RIGHT]] > 1
+        cells, directions = muddy.nonzero()
+        # nonzero is in row major order, the keys are sorted
+        mud_keys = (cells * 2 + directions).astype(np.uint32)
+        mud_costs = cost[:, [Move.UP, Move.RIGHT]][cells, directions]
+
+        return cls(
+            maze_width=board.maze_width,
+            maze_height=board.maze_height,
+            player_cells=board.player_cells.astype(np.uint32),
+            wall_bits=wall_bits,
+            mud_keys=mud_keys,
+            mud_costs=mud_costs,
+            cheese_bits=np.packbits(board.cheese_cells, bitorder="little"),
+        )
+
+    def to_board(self) -> Board:
+        nb_cells = self.maze_width * self.maze_height
+        nibbles = np.empty((2 * len(self.wall_bits), 1), dtype=np.uint8)
+        nibbles[0::2, 0] = self.wall_bits & 0xF
+        nibbles[1::2, 0] = self.wall_bits >> 4
+        is_blocked = np.unpackbits(nibbles[:nb_cells], axis=1, bitorder="little")
+
+        can_move = np.zeros((self.maze_width, self.maze_height, 5), dtype=bool)
+        can_move.reshape(nb_cells, 5)[:, : Move.DID_NOT_MOVE] = (
+            is_blocked[:, : Move.DID_NOT_MOVE] == 0
+        )
+
+        cost = np.ones((self.maze_width, self.maze_height, 5), dtype=np.uint8)
+        flat_cost = cost.reshape(nb_cells, 5)
+        cells = (self.mud_keys // 2).astype(np.intp)
+        goes_right = (self.mud_keys % 2).astype(bool)
+        neighbours = np.where(goes_right, cells + self.maze_height, cells + 1).astype(
+            np.intp
+        )
+        flat_cost[cells, np.where(goes_right, Move.RIGHT, Move.UP)] = self.mud_costs
+        flat_cost[
+            neighbours, np.where(goes_right, Move.LEFT, Move.DOWN)
+        ] = self.mud_costs
+
+        cheese_cells = np.unpackbits(
+            self.cheese_bits, count=nb_cells, bitorder="little"
+        ).astype(bool)
+        return Board.from_arrays(
+            player_cells=self.player_cells.astype(np.intp),
+            can_move=can_move,
+            cost=cost,
+            cheese_cells=cheese_cells,
+        )
+
+    def fork(self) -> "PackedBoard":
+        """Copy of the board sharing its static arrays, see Board.fork"""
+        forked = copy.copy(self)
+        forked.player_cells = self.player_cells.copy()
+        forked.cheese_bits = self.cheese_bits.copy()
+        return forked
+
+    def restore(self, other: "PackedBoard") -> None:
+        """Copy the dynamic part of other, a fork of this board, in place"""
+        np.copyto(self.player_cells, other.player_cells)
+        np.copyto(self.cheese_bits, other.cheese_bits)
+        self.remaining_cheeses = other.remaining_cheeses
+
+    @property
+    def nbytes(self) -> int:
+        """Number of bytes taken by the arrays of the board"""
+        return (
+            self.player_cells.nbytes
+            + self.wall_bits.nbytes
+            + self.mud_keys.nbytes
+            + self.mud_costs.nbytes
+            + self.cheese_bits.nbytes
+        )
+
+    def is_blocked(self, cells: npt.NDArray, moves: npt.NDArray) -> npt.NDArray[bool]:
+        """Whether each move is blocked from its cell. DID_NOT_MOVE always is."""
+        nibbles = (self.wall_bits[cells >> 1] >> ((cells & 1) << 2)) & 0xF
+        # Bit 4 is the DID_NOT_MOVE bit
+        return (((nibbles | 0x10) >> moves) & 1).astype(bool)
+
+    def mud_cost(
+        self, cells: npt.NDArray, next_cells: npt.NDArray, moves: npt.NDArray
+    ) -> npt.NDArray[np.uint8]:
+        """
+        Number of turns each move from cells to next_cells takes.
+        The moves must not be blocked.
+        """
+        if len(self.mud_keys) == 0:
+            return np.ones(cells.shape, dtype=np.uint8)
+        # Going down or left takes the passage from the cell we arrive in,
+        # moves & 1 is 0 for the vertical moves and 1 for the horizontal ones
+        goes_back = (moves == Move.DOWN) | (moves == Move.LEFT)
+        keys = np.where(goes_back, next_cells, cells) * 2 + (moves & 1)
+        index = np.searchsorted(self.mud_keys, keys)
+        np.minimum(index, len(self.mud_keys) - 1, out=index)
+        is_muddy = self.mud_keys[index] == keys
+        return np.where(is_muddy, self.mud_costs[index], 1).astype(np.uint8)
+
+    def has_cheese(self, cells: npt.NDArray) -> npt.NDArray[bool]:
+        return ((self.cheese_bits[cells >> 3] >> (cells & 7)) & 1).astype(bool)
+
+    def put_cheese(self, cell: int) -> None:
+        """Place a cheese in the cell, if there is not one already"""
+        mask = 1 << (int(cell) & 7)
+        if not self.cheese_bits[cell >> 3] & mask:
+            self.cheese_bits[cell >> 3] |= mask
+            self.remaining_cheeses += 1
+
+    def remove_cheese(self, cell: int) -> None:
+        """Remove the cheese of the cell, if there is one"""
+        mask = 1 << (int(cell) & 7)
+        if self.cheese_bits[cell >> 3] & mask:
+            self.cheese_bits[cell >> 3] &= ~mask & 0xFF
+            self.remaining_cheeses -= 1
+
+
+@dataclass
+class PackedNumpyState:
+    board: PackedBoard
+    game_data: GameData
+    # Number of turns played since the state was built
+    turn: int = 0
+
+    def fork(self) -> "PackedNumpyState":
+        """Copy of the state sharing the static arrays of the board"""
+        return PackedNumpyState(
+            board=self.board.fork(), game_data=self.game_data.copy(), turn=self.turn
+        )
+
+    def restore(self, other: "PackedNumpyState") -> None:
+        """Copy the dynamic part of other, a fork of this state, in place"""
+        self.board.restore(other.board)
+        self.game_data.restore(other.game_data)
+        self.turn = other.turn
+
+
+class UndoStack:
+    """History of the moves made on a NumpyState or a PackedNumpyState, holding just
+    enough to unmake them.
+    Each record is one row of small preallocated arrays, that grow by doubling when
+    full, so pushing and popping a record does not allocate in the steady state."""
+
+    def __init__(self, capacity: int = 256):
+        self.size = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int) -> None:
+        # Every array has shape (capacity, 2), one record per row
+        self.player_cells = np.zeros((capacity, 2), dtype=np.intp)
+        self.player_muds = np.zeros((capacity, 2), dtype=int)
+        self.player_misses = np.zeros((capacity, 2), dtype=int)
+        self.points = np.zeros((capacity, 2), dtype=float)
+        # Cell of the cheese eaten by each player, -1 if it did not eat any
+        self.eaten_cheeses = np.zeros((capacity, 2), dtype=np.intp)
+        # Turn counter of the state, shape = (capacity,)
+        self.turns = np.zeros((capacity,), dtype=int)
+
+    def _grow(self) -> None:
+        old = (
+            self.player_cells,
+            self.player_muds,
+            self.player_misses,
+            self.points,
+            self.eaten_cheeses,
+            self.turns,
+        )
+        self._allocate(2 * len(self.player_cells))
+        new = (
+            self.player_cells,
+            self.player_muds,
+            self.player_misses,
+            self.points,
+            self.eaten_cheeses,
+            self.turns,
+        )
+        for old_array, new_array in zip(old, new):
+            new_array[: len(old_array)] = old_array
+
+    def __len__(self) -> int:
+        return self.size
+
+    def clear(self) -> None:
+        self.size = 0
+
+    def reserve(self) -> int:
+        """Add an empty record and return its index, for callers that fill the
+        record arrays themselves"""
+        if self.size == len(self.player_cells):
+            self._grow()
+        self.size += 1
+        return self.size - 1
+
+    def push(self, state: NumpyState) -> None:
+        """Record the part of the state a move changes, before the move is made"""
+        if self.size == len(self.player_cells):
+            self._grow()
+        self.player_cells[self.size] = state.board.player_cells
+        self.player_muds[self.size] = state.game_data.player_muds
+        self.player_misses[self.size] = state.game_data.player_misses
+        self.turns[self.size] = state.turn
+        self.size += 1
+
+    def record_points(self, state: NumpyState, points: npt.NDArray[float]) -> None:
+        """Complete the last record with the outcome of the move.
+        A player that won points ate the cheese of the cell it stands on."""
+        record = self.size - 1
+        self.points[record] = points
+        self.eaten_cheeses[record] = state.board.player_cells
+        for player in range(2):
+            if points[player] == 0:
+                self.eaten_cheeses[record, player] = -1
+
+    def pop(self, state: NumpyState) -> None:
+        """Restore the state as it was before the last recorded move"""
+        if self.size == 0:
+            raise ValueError("There is no move to unmake")
+        self.size -= 1
+        record = self.size
+        state.turn = int(self.turns[record])
+        # The cells are not stored with the same dtype on every board
+        state.board.player_cells[:] = self.player_cells[record]
+        np.copyto(state.game_data.player_muds, self.player_muds[record])
+        np.copyto(state.game_data.player_misses, self.player_misses[record])
+        np.subtract(
+            state.game_data.player_scores,
+            self.points[record],
+            out=state.game_data.player_scores,
+            casting="same_kind",
+        )
+        for player in range(2):
+            cheese = self.eaten_cheeses[record, player]
+            if cheese >= 0:
+                state.board.put_cheese(cheese)
+
+
+@dataclass
+class MoveBuffers:
+    """Scratch arrays written to by logic.move_preallocated, so that a move does
+    not allocate any array.
+    The flat_* fields are flat views on the arrays of a NumpyState, they have to be
+    rebuilt with from_state whenever the state arrays are replaced."""
+
+    # Every scratch array has shape (2,)
+    moves: npt.NDArray[np.intp]
+    # index in the flattened transition tables, cell * 5 + move
+    table_index: npt.NDArray[np.intp]
+    next_cells: npt.NDArray[np.intp]
+    move_cost: npt.NDArray[np.uint8]
+    is_stuck: npt.NDArray[bool]
+    is_free: npt.NDArray[bool]
+    stays_in_place: npt.NDArray[bool]
+    has_cheese: npt.NDArray[bool]
+    takes_cheese: npt.NDArray[bool]
+    points: npt.NDArray[float]
+
+    # (width * height * 5,) views on next_cell and move_cost
+    flat_next_cell: npt.NDArray[np.intp]
+    flat_move_cost: npt.NDArray[np.uint8]
+
+    @classmethod
+    def from_state(cls, state: NumpyState) -> "MoveBuffers":
+        board = state.board
+        return cls(
+            moves=np.zeros((2,), dtype=np.intp),
+            table_index=np.zeros((2,), dtype=np.intp),
+            next_cells=np.zeros((2,), dtype=np.intp),
+            move_cost=np.zeros((2,), dtype=np.uint8),
+            is_stuck=np.zeros((2,), dtype=bool),
+            is_free=np.zeros((2,), dtype=bool),
+            stays_in_place=np.zeros((2,), dtype=bool),
+            has_cheese=np.zeros((2,), dtype=bool),
+            takes_cheese=np.zeros((2,), dtype=bool),
+            points=np.zeros((2,), dtype=float),
+            flat_next_cell=_flat_view(board.next_cell),
+            flat_move_cost=_flat_view(board.move_cost),
+        )
+
+
+def _flat_view(array: npt.NDArray) -> npt.NDArray:
+    """Return a flat view on a C contiguous array, raise if a copy would be needed"""
+    flat = array.view()
+    flat.shape = (array.size,)
+    return flat
+
+
+class BatchedBoard:
+    """Stack of boards of the same dimensions, so that several games can be stepped
+    with a single set of numpy calls. Mazes of different sizes are stacked by
+    padding them to the same dimensions first.
+    Every array has the game index as its first dimension."""
+
+    def __init__(
+        self,
+        boards: Sequence[Board],
+        maze_sizes: Optional[Sequence[Tuple[int, int]]] = None,
+    ):
+        """
+        Args:
+            boards: the boards of each game, all of the same dimensions
+            maze_sizes: (optional) (width, height) of the maze of each game, if the
+                boards are padded versions of smaller mazes (see Board.pad)
+        """
+        if len(boards) == 0:
+            raise ValueError("Cannot build a BatchedBoard from an empty list of boards")
+        self.maze_width = boards[0].maze_width
+        self.maze_height = boards[0].maze_height
+        for board in boards:
+            if (board.maze_width, board.maze_height) != (
+                self.maze_width,
+                self.maze_height,
+            ):
+                raise ValueError(
+                    f"All boards must have the same dimensions, got "
+                    f"{(board.maze_width, board.maze_height)} and "
+                    f"{(self.maze_width, self.maze_height)}"
+                )
+        if maze_sizes is None:
+            maze_sizes = [(self.maze_width, self.maze_height)] * len(boards)
+        # Dimensions of the real maze of each game, the other cells are padding
+        # shape = (nb_games, 2)
+        self.maze_sizes: npt.NDArray[int] = np.array(maze_sizes, dtype=int)
+        self.nb_games = len(boards)
+
+        # self.player_cells[game][player] is the cell index of a player
+        # shape = (nb_games, 2)
+        self.player_cells: npt.NDArray[np.intp] = np.stack(
+            [board.player_cells for board in boards]
+        )
+        # shape = (nb_games, width, height, 5)
+        self.can_move: npt.NDArray[bool] = np.stack(
+            [board.can_move for board in boards]
+        )
+        # shape = (nb_games, width, height, 5)
+        self.cost: npt.NDArray[np.uint8] = np.stack([board.cost for board in boards])
+        # shape = (nb_games, width * height, 5)
+        self.next_cell: npt.NDArray[np.intp] = np.stack(
+            [board.next_cell for board in boards]
+        )
+        # shape = (nb_games, width * height, 5)
+        self.move_cost: npt.NDArray[np.uint8] = np.stack(
+            [board.move_cost for board in boards]
+        )
+        # shape = (nb_games, width * height)
+        self.cheese_cells: npt.NDArray[bool] = np.stack(
+            [board.cheese_cells for board in boards]
+        )
+        # shape = (nb_games,)
+        self.remaining_cheeses: npt.NDArray[int] = np.array(
+            [board.remaining_cheeses for board in boards], dtype=int
+        )
+
+    @classmethod
+    def repeat(cls, board: Board, nb_games: int) -> "BatchedBoard":
+        """
+        Batch of nb_games copies of the same board. The static arrays are read only
+        broadcast views on the board arrays, only the player cells and the cheeses
+        are copied.
+        """
+        batched_board = cls.__new__(cls)
+        batched_board.maze_width = board.maze_width
+        batched_board.maze_height = board.maze_height
+        batched_board.nb_games = nb_games
+        batched_board.maze_sizes = np.full(
+            (nb_games, 2), (board.maze_width, board.maze_height), dtype=int
+        )
+        batched_board.player_cells = np.repeat(
+            board.player_cells[np.newaxis], nb_games, axis=0
+        )
+        for name in ("can_move", "cost", "next_cell", "move_cost"):
+            array = getattr(board, name)
+            setattr(
+                batched_board,
+                name,
+                np.broadcast_to(array[np.newaxis], (nb_games,) + array.shape),
+            )
+        batched_board.cheese_cells = np.repeat(
+            board.cheese_cells[np.newaxis], nb_games, axis=0
+        )
+        batched_board.remaining_cheeses = np.full(
+            (nb_games,), board.remaining_cheeses, dtype=int
+        )
+        return batched_board
+
+    @property
+    def valid_cells(self) -> npt.NDArray[bool]:
+        """(nb_games, width * height) array, whether each cell belongs to the maze of
+        the game rather than to its padding"""
+        x, y = to_coordinates(
+            np.arange(self.maze_width * self.maze_height), self.maze_height
+        )
+        return (x < self.maze_sizes[:, :1]) & (y < self.maze_sizes[:, 1:])
+
+    def shard(self, start: int, stop: int) -> "BatchedBoard":
+        """Batch of the games start to stop, whose arrays are views on this batch's
+        arrays : stepping the shard steps these games of the batch."""
+        shard = copy.copy(self)
+        shard.nb_games = stop - start
+        for name in (
+            "maze_sizes",
+            "player_cells",
+            "can_move",
+            "cost",
+            "next_cell",
+            "move_cost",
+            "cheese_cells",
+            "remaining_cheeses",
+        ):
+            setattr(shard, name, getattr(self, name)[start:stop])
+        return shard
+
+    def board(self, game: int) -> Board:
+        """Return a (non batched) Board of the given game, sharing this batch's
+        arrays. Its remaining_cheeses is a copy.
+        The board is padded if the game's maze is smaller than the batch's, see
+        Board.crop."""
+        return Board.from_arrays(
+            player_cells=self.player_cells[game],
+            can_move=self.can_move[game],
+            cost=self.cost[game],
+            cheese_cells=self.cheese_cells[game],
+            next_cell=self.next_cell[game],
+            move_cost=self.move_cost[game],
+        )
+
+
+# dtype of the structured array of StepResults of a batch, one element per game.
+# eaten_cheeses holds cell indices, -1 when the player did not eat a cheese.
+STEP_RESULT_DTYPE = np.dtype(
+    [
+        ("points", np.float64, (2,)),
+        ("eaten_cheeses", np.intp, (2,)),
+        ("missed", bool, (2,)),
+        ("muds", int, (2,)),
+        ("is_terminal", bool),
+    ]
+)
+
+
+@dataclass
+class BatchedNumpyState:
+    board: BatchedBoard
+    # Every GameData field has shape (nb_games, 2)
+    game_data: GameData
+    # Total number of cheeses of each game, eaten or not. shape = (nb_games,)
+    total_cheeses: npt.NDArray[float]
+    # Whether each game is over. Finished games are not stepped anymore.
+    # shape = (nb_games,)
+    is_finished: npt.NDArray[bool]
+    # Number of turns played in each game. shape = (nb_games,)
+    turns: npt.NDArray[int]
+    # Games are over after max_turns turns, if it is set
+    max_turns: Optional[int] = None
+
+    def shard(self, start: int, stop: int) -> "BatchedNumpyState":
+        """State of the games start to stop, made of views on this state's arrays"""
+        return BatchedNumpyState(
+            board=self.board.shard(start, stop),
+            game_data=GameData(
+                player_scores=self.game_data.player_scores[start:stop],
+                player_muds=self.game_data.player_muds[start:stop],
+                player_misses=self.game_data.player_misses[start:stop],
+            ),
+            total_cheeses=self.total_cheeses[start:stop],
+            is_finished=self.is_finished[start:stop],
+            turns=self.turns[start:stop],
+            max_turns=self.max_turns,
+        )
+
+
+@dataclass
+class Successors:
+    """The states reached from a NumpyState by the joint moves of both players.
+    Joint moves with the same outcome lead to the same successor, which is only
+    computed once."""
+
+    # The successor states, stacked in a batch of nb_successors games
+    state: BatchedNumpyState
+    # A joint move leading to each successor, shape = (nb_successors, 2)
+    moves: npt.NDArray[np.intp]
+    # Points won by each player on the way to each successor
+    # shape = (nb_successors, 2)
+    rewards: npt.NDArray[float]
+    # Whether each successor is the end of the game, shape = (nb_successors,)
+    is_terminal: npt.NDArray[bool]
+    # successor_index[p1_move][p2_move] is the index of the successor the joint move
+    # leads to. shape = (5, 5)
+    successor_index: npt.NDArray[np.intp]
@@ -0,0 +1,27 @@
+import os
+
+import numpy as np
+import random
+
+from pyrat_engine.benchmarking.benchmark import games_per_second
+from pyrat_engine.engines.numpy_vectorized import BatchedNumpyEngine
+from pyrat_engine.initializer.configs import MazeConfig
+from pyrat_engine.initializer.initializer import CurrentStateInitializer
+
+if __name__ == "__main__":
+    random.seed(0)
+    rng = np.random.default_rng(0)
+    initializer = CurrentStateInitializer(maze_config=MazeConfig())
+    batch_size = 4096
+    # Generating mazes is slow, the batch cycles through 64 of them
+    states = [initializer() for _ in range(64)] * (batch_size // 64)
+    nb_cpus = os.cpu_count() or 1
+    nb_workers = 1
+    while nb_workers <= nb_cpus:
+        with BatchedNumpyEngine(states, nb_workers=nb_workers) as engine:
+            throughput = games_per_second(engine, 200, rng)
+        print(
+            f"21x15, {batch_size} games, {nb_workers} workers :"
+            f" {throughput:.0f} game turns per second"
+        )
+        nb_workers *= 2
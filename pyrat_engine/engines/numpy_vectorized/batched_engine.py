@@ -0,0 +1,205 @@
+from typing import List, Optional, Sequence, Tuple
+
+import copy
+import numpy as np
+import numpy.typing as npt
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from pyrat_engine.engines.numpy_vectorized.base import (
+    STEP_RESULT_DTYPE,
+    BatchedNumpyState,
+)
+from pyrat_engine.engines.numpy_vectorized.helpers import (
+    batched_state_from_current_states,
+    current_game_state_from_state,
+    state_from_batched_state,
+)
+from pyrat_engine.engines.numpy_vectorized.logic import (
+    batched_legal_moves,
+    batched_move,
+    batched_update_finished,
+)
+from pyrat_engine.state.base import CurrentGameState
+
+
+class BatchedNumpyEngine:
+    """Run several games at once, on mazes of the same dimensions or padded to the
+    same dimensions.
+    Every move advances all the unfinished games with a single set of numpy calls.
+    Finished games stay in the batch, their moves are ignored.
+    With several workers, the batch is split in one shard per worker and the shards
+    are stepped on a thread pool : numpy releases the GIL during the array
+    operations, so big batches use several cores. Use the engine as a context
+    manager, or call close, to stop the threads."""
+
+    def __init__(
+        self,
+        states: Sequence[CurrentGameState],
+        max_turns: Optional[int] = None,
+        padded_size: Optional[Tuple[int, int]] = None,
+        nb_workers: int = 1,
+    ):
+        """
+        Args:
+            states: the state to start each game of the batch from
+            max_turns: (optional) the games are over after max_turns turns
+            padded_size: (optional) (width, height) to pad every maze to, so that
+                mazes of different sizes can share a batch. Cell indices, like the
+                eaten cheeses of step, are then cells of the padded maze.
+                See helpers.bucket_by_size to group mazes with little padding.
+            nb_workers: number of threads stepping the batch. Each one steps a shard
+                of the batch, small batches are better stepped with a single worker.
+        """
+        if nb_workers < 1:
+            raise ValueError(f"nb_workers must be at least 1, got {nb_workers}")
+        self._original_state = batched_state_from_current_states(
+            states, max_turns, padded_size
+        )
+        batched_update_finished(self._original_state)
+        self._nb_workers = min(nb_workers, self._original_state.board.nb_games)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._finalizer: Optional[weakref.finalize] = None
+        if self._nb_workers > 1:
+            self._executor = ThreadPoolExecutor(max_workers=self._nb_workers)
+            # Stops the threads of an engine dropped without being closed
+            self._finalizer = weakref.finalize(
+                self, self._executor.shutdown, wait=False
+            )
+        self.state = copy.deepcopy(self._original_state)
+
+    def close(self) -> None:
+        """Stop the worker threads. The engine can still be used with a single
+        worker."""
+        if self._executor is not None:
+            self._finalizer.detach()
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> "BatchedNumpyEngine":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    @property
+    def nb_games(self) -> int:
+        return self._current_state.board.nb_games
+
+    @property
+    def is_finished(self) -> npt.NDArray[bool]:
+        """(nb_games,) array, whether each game is over"""
+        return self._current_state.is_finished
+
+    def reset(self) -> None:
+        self.state = copy.deepcopy(self._original_state)
+
+    def reset_games(self, games: npt.ArrayLike) -> None:
+        """Reset some games of the batch to their initial state, for instance the
+        finished ones so that the batch keeps playing
+        Args:
+            games: (nb_games,) boolean mask or array of indices of the games to reset
+        """
+        # games may be the is_finished array itself, which is reset below
+        games = np.array(games, copy=True)
+        original = self._original_state
+        current = self._current_state
+        for name in ("player_cells", "cheese_cells", "remaining_cheeses"):
+            getattr(current.board, name)[games] = getattr(original.board, name)[games]
+        for name in ("player_scores", "player_muds", "player_misses"):
+            getattr(current.game_data, name)[games] = getattr(original.game_data, name)[
+                games
+            ]
+        current.is_finished[games] = original.is_finished[games]
+        current.turns[games] = original.turns[games]
+
+    def winners(self) -> npt.NDArray[int]:
+        """(nb_games,) array of the player with the most points in each finished game,
+        0 for player 1 and 1 for player 2. -1 for unfinished games and draws."""
+        scores = self._current_state.game_data.player_scores
+        winners = np.where(
+            scores[:, 0] > scores[:, 1], 0, np.where(scores[:, 1] > scores[:, 0], 1, -1)
+        )
+        return np.where(self._current_state.is_finished, winners, -1)
+
+    def get_current_game_state(self, game: int) -> CurrentGameState:
+        """Get the CurrentGameState representation of one game of the batch
+        Args:
+            game: index of the game in the batch
+        """
+        return current_game_state_from_state(
+            state_from_batched_state(self._current_state, game)
+        )
+
+    def move(
+        self, p1_moves: npt.ArrayLike, p2_moves: npt.ArrayLike
+    ) -> npt.NDArray[float]:
+        """Make the player moves on every game of the batch
+        Args:
+            p1_moves: (nb_games,) array of moves of player 1, one per game
+            p2_moves: (nb_games,) array of moves of player 2, one per game
+
+        Returns:
+            a (nb_games, 2) array of the points won by each player in each game.
+            Finished games always win 0 points.
+        """
+        if self._executor is None:
+            return batched_move(self._current_state, p1_moves, p2_moves)
+        p1_moves = np.asarray(p1_moves)
+        p2_moves = np.asarray(p2_moves)
+        points = np.empty((self.nb_games, 2))
+
+        def move_shard(bounds: Tuple[int, int], shard: BatchedNumpyState) -> None:
+            start, stop = bounds
+            points[start:stop] = batched_move(
+                shard, p1_moves[start:stop], p2_moves[start:stop]
+            )
+
+        # Consume the iterator so that worker exceptions are raised here
+        list(self._executor.map(move_shard, self._shard_bounds, self._shards))
+        return points
+
+    def legal_moves(self) -> npt.NDArray[bool]:
+        """(nb_games, 2, 5) array, whether each move of each player of each game is
+        legal (see PyratEngine.legal_moves). Finished games only have DID_NOT_MOVE."""
+        return batched_legal_moves(self._current_state)
+
+    def step(self, p1_moves: npt.ArrayLike, p2_moves: npt.ArrayLike) -> npt.NDArray:
+        """Make the player moves on every game of the batch and describe what happened
+        Args:
+            p1_moves: (nb_games,) array of moves of player 1, one per game
+            p2_moves: (nb_games,) array of moves of player 2, one per game
+
+        Returns:
+            a (nb_games,) structured array of dtype STEP_RESULT_DTYPE, the batched
+            version of StepResult. Finished games are left untouched.
+        """
+        game_data = self._current_state.game_data
+        previous_misses = game_data.player_misses.copy()
+        points = self.move(p1_moves, p2_moves)
+        results = np.empty((self.nb_games,), dtype=STEP_RESULT_DTYPE)
+        results["points"] = points
+        # Players that won points ate the cheese of their cell
+        results["eaten_cheeses"] = np.where(
+            points > 0, self._current_state.board.player_cells, -1
+        )
+        results["missed"] = game_data.player_misses > previous_misses
+        results["muds"] = game_data.player_muds
+        results["is_terminal"] = self._current_state.is_finished
+        return results
+
+    @property
+    def state(self) -> BatchedNumpyState:
+        return self._current_state
+
+    @state.setter
+    def state(self, value: BatchedNumpyState):
+        self._current_state = value
+        # Contiguous shards of (almost) the same number of games, one per worker
+        bounds = np.linspace(0, value.board.nb_games, self._nb_workers + 1).astype(int)
+        self._shard_bounds: List[Tuple[int, int]] = list(
+            zip(bounds[:-1].tolist(), bounds[1:].tolist())
+        )
+        self._shards: List[BatchedNumpyState] = [
+            value.shard(start, stop) for start, stop in self._shard_bounds
+        ]
@@ -0,0 +1,35 @@
+from typing import Tuple
+
+import random
+from timeit import Timer
+
+from pyrat_engine.engines.numpy_vectorized.helpers import (
+    current_game_state_from_state,
+    state_from_current_state,
+)
+from pyrat_engine.initializer.configs import MazeConfig
+from pyrat_engine.initializer.initializer import CurrentStateInitializer
+
+
+def time_conversions(maze_config: MazeConfig, number: int) -> Tuple[float, float]:
+    """Mean time of a CurrentGameState -> NumpyState conversion and of the reverse
+    conversion, on a maze generated from maze_config"""
+    state = CurrentStateInitializer(maze_config=maze_config)()
+    numpy_state = state_from_current_state(state)
+    to_numpy = Timer(lambda: state_from_current_state(state)).timeit(number=number)
+    from_numpy = Timer(lambda: current_game_state_from_state(numpy_state)).timeit(
+        number=number
+    )
+    return to_numpy / number, from_numpy / number
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    for width, height, number in [(21, 15, 1000), (101, 101, 20)]:
+        to_numpy, from_numpy = time_conversions(
+            MazeConfig(width=width, height=height), number
+        )
+        print(
+            f"{width}x{height} : CurrentGameState -> NumpyState {to_numpy * 1e6:.0f}us,"
+            f" NumpyState -> CurrentGameState {from_numpy * 1e6:.0f}us"
+        )
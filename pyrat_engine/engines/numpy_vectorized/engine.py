@@ -1,45 +1,252 @@
-import typing
-from typing import List, Tuple
+from typing import List, Optional, Tuple, Union
 
 import copy
+import numpy as np
+import numpy.typing as npt
 
-from pyrat_engine.engines.base import PyratEngine
-from pyrat_engine.engines.numpy_vectorized.base import NumpyState
+from pyrat_engine.engines.base import PyratEngine, StepResult, move_sequences_as_lists
+from pyrat_engine.engines.numpy_vectorized.base import (
+    MoveBuffers,
+    NumpyState,
+    Successors,
+    UndoStack,
+    to_cell,
+)
 from pyrat_engine.engines.numpy_vectorized.helpers import (
+    LazyCurrentGameState,
     current_game_state_from_state,
+    load_current_game_state,
     state_from_current_state,
+    step_result_from_history,
+)
+from pyrat_engine.engines.numpy_vectorized.logic import (
+    expand,
+    is_finished,
+    legal_moves,
+    move,
+    move_preallocated,
+    skip_turns,
+    turns_until_decision,
 )
-from pyrat_engine.engines.numpy_vectorized.logic import move
-from pyrat_engine.state.base import CurrentGameState
+from pyrat_engine.state.base import AnyGameState, CurrentGameState
 from pyrat_engine.types import Coordinates, Move
 
 
 class NumpyEngine(PyratEngine):
-    def __init__(self, state: CurrentGameState):
+    def __init__(
+        self,
+        state: AnyGameState,
+        allocation_free: bool = False,
+        max_turns: Optional[int] = None,
+    ):
+        """
+        Args:
+            state: the state to start the game from
+            allocation_free: if True, the engine preallocates scratch buffers and
+                move does not allocate any array.
+            max_turns: (optional) the game is over after max_turns turns, counted from
+                the last reset or set_current_game_state
+        """
+        self._allocation_free = allocation_free
+        self._max_turns = max_turns
+        self._buffers: Optional[MoveBuffers] = None
+        self._history = UndoStack()
         self._original_state = state_from_current_state(state)
-        self._current_state = state_from_current_state(state)
+        self.state = self._original_state.fork()
 
     def reset(self) -> None:
-        self._current_state = copy.deepcopy(self._original_state)
+        self.state = self._original_state.fork()
+
+    def load(self, state: AnyGameState) -> None:
+        """Start a new game from state, as if the engine was built from it.
+        If the maze has the same dimensions as the current one, the players and
+        cheeses arrays are refilled in place instead of being allocated again, and
+        the maze arrays are the ones shared by the engines on the same maze.
+        Snapshots, clones and lazy states taken before share the refilled arrays and
+        must not be used afterwards.
+        Args:
+            state: the state to start the game from
+        """
+        original = self._original_state
+        if (state.maze_width, state.maze_height) != (
+            original.board.maze_width,
+            original.board.maze_height,
+        ):
+            self._original_state = state_from_current_state(state)
+            self.state = self._original_state.fork()
+            return
+        current = self._current_state
+        # The current state is a fork of the original one, it is reused
+        is_fork = current.board.next_cell is original.board.next_cell
+        load_current_game_state(original, state)
+        if is_fork:
+            current.board.use_maze(original.board)
+            current.restore(original)
+            self.state = current
+        else:
+            self.state = original.fork()
 
     def set_current_game_state(self, current_game_state: CurrentGameState) -> None:
-        self._current_state = state_from_current_state(current_game_state)
+        self.state = state_from_current_state(current_game_state)
 
-    def get_current_game_state(self) -> CurrentGameState:
+    def get_current_game_state(
+        self, lazy: bool = False
+    ) -> Union[CurrentGameState, LazyCurrentGameState]:
+        """Get the CurrentGameState representation of the current state
+        Args:
+            lazy: if True, return a LazyCurrentGameState of a snapshot of the current
+                state, that only builds walls, mud and the cheese list when accessed
+
+        Returns:
+            A CurrentGameState representation of the current game state
+        """
+        if lazy:
+            return LazyCurrentGameState(self.snapshot())
         return current_game_state_from_state(self._current_state)
 
+    def _apply_move(self, p1_move: Move, p2_move: Move) -> npt.NDArray[float]:
+        """Make the moves without recording them, return the points array"""
+        if self._buffers is not None:
+            return move_preallocated(
+                self._current_state, p1_move, p2_move, self._buffers
+            )
+        return move(self._current_state, p1_move, p2_move)
+
+    def _move(self, p1_move: Move, p2_move: Move) -> npt.NDArray[float]:
+        """Make the moves and record them in the history, return the points array"""
+        self._history.push(self._current_state)
+        points = self._apply_move(p1_move, p2_move)
+        self._history.record_points(self._current_state, points)
+        return points
+
     def move(self, p1_move: Move, p2_move: Move) -> Tuple[float, float]:
-        previous_scores = self._current_state.game_data.player_scores[:]
-        move(self._current_state, p1_move, p2_move)
-        return typing.cast(
-            Tuple[float, float],
-            tuple(self._current_state.game_data.player_scores - previous_scores),
+        points = self._move(p1_move, p2_move)
+        return float(points[0]), float(points[1])
+
+    def step(self, p1_move: Move, p2_move: Move) -> StepResult:
+        points = self._move(p1_move, p2_move)
+        return step_result_from_history(
+            self._current_state, self._history, points, self.is_terminal()
+        )
+
+    def step_many(
+        self, p1_moves: npt.ArrayLike, p2_moves: npt.ArrayLike
+    ) -> npt.NDArray[float]:
+        """Make a sequence of moves, see PyratEngine.step_many. The end of the game
+        is checked on python scores and counters kept up to date in the loop, instead
+        of calling is_terminal after each move."""
+        p1_moves, p2_moves = move_sequences_as_lists(p1_moves, p2_moves)
+        rewards = np.zeros((len(p1_moves), 2))
+        state = self._current_state
+        board = state.board
+        history = self._history
+        apply_move = self._apply_move
+        score1, score2 = state.game_data.player_scores.tolist()
+        # Eaten cheeses are in the scores, the total does not change during a game
+        half_cheeses = (board.remaining_cheeses + score1 + score2) / 2
+        nb_turns = len(p1_moves)
+        if self._max_turns is not None:
+            nb_turns = min(nb_turns, max(self._max_turns - state.turn, 1))
+        for turn in range(len(p1_moves)):
+            history.push(state)
+            points = apply_move(p1_moves[turn], p2_moves[turn])
+            history.record_points(state, points)
+            rewards[turn] = points
+            points1, points2 = points.tolist()
+            score1 += points1
+            score2 += points2
+            if (
+                board.remaining_cheeses == 0
+                or score1 > half_cheeses
+                or score2 > half_cheeses
+                or turn + 1 >= nb_turns
+            ):
+                return rewards[: turn + 1]
+        return rewards
+
+    def advance_until_decision(self) -> int:
+        """Fast forward while no player has a choice, see
+        PyratEngine.advance_until_decision. Nobody moves during those turns : the
+        muds and misses are updated in closed form, and only the turns where a player
+        gets out of its mud onto a cheese are played. The whole advance is recorded
+        as a single move, one unmove undoes it."""
+        if self.is_terminal():
+            return 0
+        state = self._current_state
+        nb_turns = turns_until_decision(state, self._max_turns)
+        if nb_turns == 0:
+            return 0
+        # A player eats the cheese of its cell on the turn it gets out of its mud
+        muds = state.game_data.player_muds
+        has_cheese = state.board.cheese_cells[state.board.player_cells]
+        eating_turns = sorted(
+            {
+                max(int(muds[player]), 1)
+                for player in range(2)
+                if has_cheese[player] and max(int(muds[player]), 1) <= nb_turns
+            }
         )
 
+        self._history.push(state)
+        points = np.zeros((2,))
+        elapsed = 0
+        for eating_turn in eating_turns:
+            skip_turns(state, eating_turn - 1 - elapsed)
+            points += self._apply_move(Move.DID_NOT_MOVE, Move.DID_NOT_MOVE)
+            elapsed = eating_turn
+            if self.is_terminal():
+                break
+        else:
+            skip_turns(state, nb_turns - elapsed)
+            elapsed = nb_turns
+        # Nobody moved, the eaten cheeses are the ones of the player cells
+        self._history.record_points(state, points)
+        return elapsed
+
+    def expand(self) -> Successors:
+        """Compute every successor of the current state at once, without changing
+        it. See logic.expand"""
+        return expand(self._current_state, self._max_turns)
+
+    def legal_moves(self, player: int) -> npt.NDArray[bool]:
+        return legal_moves(self._current_state)[player]
+
+    def is_terminal(self) -> bool:
+        return is_finished(self._current_state, self._max_turns)
+
+    def _scores(self) -> Tuple[float, float]:
+        score1, score2 = self._current_state.game_data.player_scores.tolist()
+        return score1, score2
+
     def unmove(
         self, p1_move: Move, p2_move: Move, cheeses: List[Coordinates] = None
     ) -> None:
-        pass
+        """Unmake the last move. The moves are not needed, the engine keeps what it
+        needs to restore the previous state in its history.
+        Args:
+            p1_move: the move to unmake for player 1
+            p2_move: the move to unmake for player 2
+            cheeses: (optional) Any other cheeses to put back in
+        """
+        self._history.pop(self._current_state)
+        if cheeses is not None:
+            board = self._current_state.board
+            for cheese in cheeses:
+                board.put_cheese(to_cell(cheese, board.maze_height))
+
+    def snapshot(self) -> NumpyState:
+        """Fork of the current state, sharing its static arrays"""
+        return self._current_state.fork()
+
+    def restore(self, snapshot: NumpyState) -> None:
+        self._current_state.restore(snapshot)
+        self._history.clear()
+
+    def clone(self) -> "NumpyEngine":
+        clone = copy.copy(self)
+        clone._history = UndoStack()
+        clone.state = self._current_state.fork()
+        return clone
 
     @property
     def state(self):
@@ -48,3 +255,8 @@ class NumpyEngine(PyratEngine):
     @state.setter
     def state(self, value: NumpyState):
         self._current_state = value
+        # The history belongs to the previous state
+        self._history.clear()
+        if self._allocation_free:
+            # The buffers hold views on the state arrays
+            self._buffers = MoveBuffers.from_state(value)
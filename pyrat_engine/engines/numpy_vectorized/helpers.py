@@ -1,28 +1,62 @@
 import typing
-from typing import List
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
+import dataclasses
+import functools
 import numpy as np
 import numpy.typing as npt
 
-from pyrat_engine.engines.numpy_vectorized.base import Board, GameData, NumpyState
-from pyrat_engine.state.base import CurrentGameState
-from pyrat_engine.types import Coordinates, Muds, Walls
-from pyrat_engine.utils import add_mud, add_wall, get_direction, valid_neighbors
+from pyrat_engine.engines.base import StepResult
+from pyrat_engine.engines.numpy_vectorized.base import (
+    BatchedBoard,
+    BatchedNumpyState,
+    Board,
+    GameData,
+    NumpyState,
+    PackedBoard,
+    PackedNumpyState,
+    UndoStack,
+    to_cell,
+    to_coordinates,
+)
+from pyrat_engine.state.base import (
+    AnyGameState,
+    CurrentGameState,
+    MazeTopology,
+    game_topology,
+)
+from pyrat_engine.types import Coordinates, Move, Muds, Walls
 
 
-def board_from_current_game_state(state: CurrentGameState) -> Board:
-    return Board(
-        maze_width=state.maze_width,
-        maze_height=state.maze_height,
-        p1_pos=state.player1_pos,
-        p2_pos=state.player2_pos,
-        walls=state.walls,
-        muds=state.mud,
-        cheeses=state.current_cheese_list,
+def _empty_board(topology: MazeTopology) -> Board:
+    board = Board(
+        maze_width=topology.maze_width,
+        maze_height=topology.maze_height,
+        p1_pos=(0, 0),
+        p2_pos=(0, 0),
+        walls=topology.walls_dict(),
+        muds=topology.mud_dict(),
+        cheeses=[],
     )
+    board.topology = topology
+    return board
 
 
-def game_data_from_current_game_state(state: CurrentGameState) -> GameData:
+def maze_board(state: AnyGameState) -> Board:
+    """Board of the maze of state, without cheeses. Its static arrays are shared by
+    all the boards on the same topology (see state.base.game_topology), it must not
+    be modified."""
+    return game_topology(state).derived(Board, _empty_board)
+
+
+def board_from_current_game_state(state: AnyGameState) -> Board:
+    """Board of state, sharing its static arrays with the boards on the same maze"""
+    board = maze_board(state).fork()
+    board.place(state.player1_pos, state.player2_pos, state.current_cheese_list)
+    return board
+
+
+def game_data_from_current_game_state(state: AnyGameState) -> GameData:
     return GameData(
         player_scores=np.array(
             [state.player1_score, state.player2_score], dtype=np.float16
@@ -32,51 +66,156 @@ def game_data_from_current_game_state(state: CurrentGameState) -> GameData:
     )
 
 
-def state_from_current_state(current_game_state: CurrentGameState) -> NumpyState:
+def state_from_current_state(current_game_state: AnyGameState) -> NumpyState:
     return NumpyState(
         board=board_from_current_game_state(current_game_state),
         game_data=game_data_from_current_game_state(current_game_state),
     )
 
 
+def multiplayer_state_from_current_state(
+    current_game_state: CurrentGameState, player_positions: Sequence[Coordinates]
+) -> NumpyState:
+    """
+    NumpyState of the maze of a CurrentGameState, with any number of players.
+    The players start with no score, mud or miss. Play it with logic.move_players.
+    Args:
+        current_game_state: the state to take the maze and the cheeses from
+        player_positions: the starting position of each player
+
+    Returns:
+        A NumpyState whose player arrays have one element per player
+    """
+    board = board_from_current_game_state(current_game_state)
+    coordinates = np.array(player_positions, dtype=np.intp).reshape(-1, 2)
+    board.player_cells = to_cell(coordinates.T, board.maze_height).astype(np.intp)
+    nb_players = len(coordinates)
+    return NumpyState(
+        board=board,
+        game_data=GameData(
+            # float16 cannot hold the 1/k shares of a cheese split between k players,
+            # their sum would drift away from the number of eaten cheeses
+            player_scores=np.zeros((nb_players,), dtype=np.float64),
+            player_muds=np.zeros((nb_players,), dtype=int),
+            player_misses=np.zeros((nb_players,), dtype=int),
+        ),
+    )
+
+
+def load_current_game_state(
+    state: NumpyState, current_game_state: AnyGameState
+) -> None:
+    """
+    Refill a NumpyState in place from a state of the same dimensions, on the shared
+    static arrays of its maze, see Board.use_maze
+    Args:
+        state: the NumpyState to overwrite
+        current_game_state: the state to load
+    """
+    board = state.board
+    if (current_game_state.maze_width, current_game_state.maze_height) != (
+        board.maze_width,
+        board.maze_height,
+    ):
+        raise ValueError(
+            f"Cannot load a {current_game_state.maze_width}x"
+            f"{current_game_state.maze_height} maze in a {board.maze_width}x"
+            f"{board.maze_height} state"
+        )
+    board.use_maze(maze_board(current_game_state))
+    board.place(
+        p1_pos=current_game_state.player1_pos,
+        p2_pos=current_game_state.player2_pos,
+        cheeses=current_game_state.current_cheese_list,
+    )
+    game_data = state.game_data
+    game_data.player_scores[:] = (
+        current_game_state.player1_score,
+        current_game_state.player2_score,
+    )
+    game_data.player_muds[:] = (
+        current_game_state.player1_mud,
+        current_game_state.player2_mud,
+    )
+    game_data.player_misses[:] = (
+        current_game_state.player1_misses,
+        current_game_state.player2_misses,
+    )
+    state.turn = 0
+
+
+def _to_coordinate_list(cells: npt.NDArray[np.intp], maze_height) -> List[Coordinates]:
+    x, y = to_coordinates(cells, maze_height)
+    return list(zip(x.tolist(), y.tolist()))
+
+
 def get_current_cheese_list(board: Board) -> List[Coordinates]:
     """Return the list of cheeses from the Board, in lexicographical order"""
-    cheeses_positions = board.cheeses.nonzero()
-    cheeses_positions = np.stack(cheeses_positions).T
-    cheeses: List[Coordinates] = list(
-        map(lambda x: typing.cast(Coordinates, tuple(x)), cheeses_positions)
+    # Cells are numbered in lexicographical order of the coordinates
+    return _to_coordinate_list(board.cheese_cells.nonzero()[0], board.maze_height)
+
+
+def _passages(
+    board: Board, is_edge: npt.NDArray[bool]
+) -> Tuple[npt.NDArray[np.intp], npt.NDArray[np.intp]]:
+    """
+    Select passages between neighbouring cells
+    Args:
+        board: the board the passages belong to
+        is_edge: (width, height, 5) array, whether each move from each cell is selected
+
+    Returns:
+        the lower cells and the upper cells of the selected vertical passages, and the
+        left cells and the right cells of the selected horizontal passages.
+    """
+    cells = np.arange(board.maze_width * board.maze_height).reshape(
+        board.maze_width, board.maze_height
+    )
+    # A passage is selected if it is selected in either direction
+    goes_up = is_edge[:, :-1, Move.UP] | is_edge[:, 1:, Move.DOWN]
+    goes_right = is_edge[:-1, :, Move.RIGHT] | is_edge[1:, :, Move.LEFT]
+    lower_cells = cells[:, :-1][goes_up]
+    left_cells = cells[:-1][goes_right]
+    return (
+        np.concatenate([lower_cells, left_cells]),
+        np.concatenate([lower_cells + 1, left_cells + board.maze_height]),
     )
-    cheeses.sort()
-    return cheeses
 
 
 def get_walls(board: Board) -> Walls:
+    """Return the Walls dict of the board. The neighbours of each coordinate are listed
+    in the order left, down, up, right"""
+    cells, others = _passages(board, ~board.can_move)
+    # Every wall is listed from both sides
+    sources = np.concatenate([cells, others])
+    destinations = np.concatenate([others, cells])
+    # Order the neighbours of a cell by their cell index : left, down, up, right
+    order = np.lexsort((destinations, sources))
     walls: Walls = {}
-    for i in range(board.maze_width):
-        for j in range(board.maze_height):
-            coordinate = (i, j)
-            for neighbour in valid_neighbors(
-                coordinate, board.maze_width, board.maze_height
-            ):
-                move = get_direction(coordinate, neighbour)
-                if not board.can_move[coordinate][move]:
-                    wall = (coordinate, neighbour)
-                    add_wall(walls, wall)
+    for coordinate, neighbour in zip(
+        _to_coordinate_list(sources[order], board.maze_height),
+        _to_coordinate_list(destinations[order], board.maze_height),
+    ):
+        walls.setdefault(coordinate, []).append(neighbour)
     return walls
 
 
 def get_muds(board: Board) -> Muds:
+    cells, others = _passages(board, board.cost > 1)
+    flat_cost = board.cost.reshape(board.maze_width * board.maze_height, 5)
+    is_vertical = others - cells == 1
+    cost_from_cell = flat_cost[cells, np.where(is_vertical, Move.UP, Move.RIGHT)]
+    cost_from_other = flat_cost[others, np.where(is_vertical, Move.DOWN, Move.LEFT)]
+    # Both directions have the same cost, unless the board was modified by hand
+    costs = np.where(cost_from_other > 1, cost_from_other, cost_from_cell)
     muds: Muds = {}
-    for i in range(board.maze_width):
-        for j in range(board.maze_height):
-            coordinate = (i, j)
-            for neighbor in valid_neighbors(
-                coordinate, board.maze_width, board.maze_height
-            ):
-                move = get_direction(coordinate, neighbor)
-                cost = board.cost[coordinate][move]
-                if cost > 1:
-                    add_mud(muds, coordinate, neighbor, cost)
+    for coordinate, neighbour, cost in zip(
+        _to_coordinate_list(cells, board.maze_height),
+        _to_coordinate_list(others, board.maze_height),
+        costs.tolist(),
+    ):
+        muds.setdefault(coordinate, {})[neighbour] = cost
+        muds.setdefault(neighbour, {})[coordinate] = cost
     return muds
 
 
@@ -91,11 +230,8 @@ def get_player_positions(board) -> npt.NDArray[int]:
             array[0] are the coordinates of the first player
             array[1] are the coordinates of the second player
     """
-    # Get the positions of the True values
-    player_positions = board.player_positions.nonzero()
-    # pack them into 3 dimensional coordinates
-    player_positions = np.stack(player_positions[:2]).T
-    return player_positions
+    x, y = to_coordinates(board.player_cells, board.maze_height)
+    return np.stack([x, y], axis=1)
 
 
 def current_game_state_from_state(state: NumpyState) -> CurrentGameState:
@@ -117,3 +253,251 @@ def current_game_state_from_state(state: NumpyState) -> CurrentGameState:
         player2_mud=game_data.player_muds[1],
         player2_misses=game_data.player_misses[1],
     )
+
+
+class LazyCurrentGameState:
+    """
+    Read only view of a NumpyState that looks like a CurrentGameState.
+    The players' positions, scores, muds and misses are read straight from the state,
+    walls, mud and current_cheese_list are only built on first access and cached.
+    The state must not change during the lifetime of the view, give it a fork
+    (see NumpyState.fork) of a state that keeps being played.
+    """
+
+    def __init__(self, state: NumpyState):
+        self._state = state
+
+    @property
+    def maze_width(self) -> int:
+        return self._state.board.maze_width
+
+    @property
+    def maze_height(self) -> int:
+        return self._state.board.maze_height
+
+    @functools.cached_property
+    def current_cheese_list(self) -> List[Coordinates]:
+        return get_current_cheese_list(self._state.board)
+
+    @functools.cached_property
+    def walls(self) -> Walls:
+        return get_walls(self._state.board)
+
+    @functools.cached_property
+    def mud(self) -> Muds:
+        return get_muds(self._state.board)
+
+    def _position(self, player: int) -> Coordinates:
+        return to_coordinates(
+            int(self._state.board.player_cells[player]), self.maze_height
+        )
+
+    @property
+    def player1_pos(self) -> Coordinates:
+        return self._position(0)
+
+    @property
+    def player1_score(self) -> float:
+        return self._state.game_data.player_scores[0]
+
+    @property
+    def player1_mud(self) -> int:
+        return self._state.game_data.player_muds[0]
+
+    @property
+    def player1_misses(self) -> int:
+        return self._state.game_data.player_misses[0]
+
+    @property
+    def player2_pos(self) -> Coordinates:
+        return self._position(1)
+
+    @property
+    def player2_score(self) -> float:
+        return self._state.game_data.player_scores[1]
+
+    @property
+    def player2_mud(self) -> int:
+        return self._state.game_data.player_muds[1]
+
+    @property
+    def player2_misses(self) -> int:
+        return self._state.game_data.player_misses[1]
+
+    def to_current_game_state(self) -> CurrentGameState:
+        return CurrentGameState(
+            **{
+                field.name: getattr(self, field.name)
+                for field in dataclasses.fields(CurrentGameState)
+            }
+        )
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (CurrentGameState, LazyCurrentGameState)):
+            return NotImplemented
+        return all(
+            getattr(self, field.name) == getattr(other, field.name)
+            for field in dataclasses.fields(CurrentGameState)
+        )
+
+
+def batched_state_from_current_states(
+    current_game_states: Sequence[CurrentGameState],
+    max_turns: Optional[int] = None,
+    padded_size: Optional[Tuple[int, int]] = None,
+) -> BatchedNumpyState:
+    """
+    Stack several CurrentGameStates in a BatchedNumpyState
+    Args:
+        current_game_states: the states of each game of the batch
+        max_turns: (optional) number of turns after which the games are over
+        padded_size: (optional) (width, height) every maze is padded to, so that mazes
+            of different sizes can be batched together (see Board.pad). Without it,
+            the states must all have the same dimensions.
+
+    Returns:
+        The BatchedNumpyState of all the games
+    """
+    states = [state_from_current_state(state) for state in current_game_states]
+    maze_sizes = [(state.board.maze_width, state.board.maze_height) for state in states]
+    boards = [state.board for state in states]
+    if padded_size is not None:
+        boards = [board.pad(*padded_size) for board in boards]
+    board = BatchedBoard(boards, maze_sizes)
+    game_data = GameData(
+        player_scores=np.stack([state.game_data.player_scores for state in states]),
+        player_muds=np.stack([state.game_data.player_muds for state in states]),
+        player_misses=np.stack([state.game_data.player_misses for state in states]),
+    )
+    # Eaten cheeses are in the scores
+    total_cheeses = board.remaining_cheeses + game_data.player_scores.sum(axis=1)
+    return BatchedNumpyState(
+        board=board,
+        game_data=game_data,
+        total_cheeses=total_cheeses,
+        is_finished=np.zeros((board.nb_games,), dtype=bool),
+        turns=np.zeros((board.nb_games,), dtype=int),
+        max_turns=max_turns,
+    )
+
+
+def state_from_batched_state(state: BatchedNumpyState, game: int) -> NumpyState:
+    """
+    Extract the NumpyState of one game of the batch
+    Args:
+        state: the BatchedNumpyState
+        game: index of the game in the batch
+
+    Returns:
+        The NumpyState of the game. Its board arrays are views on the batch arrays,
+        unless the maze of the game is padded : its board is then a cropped copy.
+    """
+    board = state.board.board(game)
+    width, height = state.board.maze_sizes[game].tolist()
+    if (width, height) != (board.maze_width, board.maze_height):
+        board = board.crop(width, height)
+    return NumpyState(
+        board=board,
+        game_data=GameData(
+            player_scores=state.game_data.player_scores[game],
+            player_muds=state.game_data.player_muds[game],
+            player_misses=state.game_data.player_misses[game],
+        ),
+        turn=int(state.turns[game]),
+    )
+
+
+def bucket_by_size(
+    maze_sizes: Sequence[Tuple[int, int]], max_overhead: float = 0.25
+) -> Dict[Tuple[int, int], List[int]]:
+    """
+    Group mazes of different sizes in buckets that can each be batched by padding
+    every maze to the bucket size (see batched_state_from_current_states)
+    Args:
+        maze_sizes: (width, height) of each maze
+        max_overhead: maximum fraction of padding cells over real cells for any maze,
+            0.25 means a maze is never padded to more than 1.25 times its area
+
+    Returns:
+        A dict from the (width, height) of each bucket to the indices of its mazes
+    """
+    buckets: Dict[Tuple[int, int], List[int]] = {}
+    # Largest mazes first, so that each bucket is created with its size
+    order = sorted(
+        range(len(maze_sizes)),
+        key=lambda index: (
+            maze_sizes[index][0] * maze_sizes[index][1],
+            maze_sizes[index],
+        ),
+        reverse=True,
+    )
+    for index in order:
+        width, height = maze_sizes[index]
+        max_area = (1 + max_overhead) * width * height
+        fitting_buckets = [
+            (bucket_width, bucket_height)
+            for bucket_width, bucket_height in buckets
+            if bucket_width >= width
+            and bucket_height >= height
+            and bucket_width * bucket_height <= max_area
+        ]
+        # Pad as little as possible
+        bucket = min(
+            fitting_buckets,
+            key=lambda size: size[0] * size[1],
+            default=(width, height),
+        )
+        buckets.setdefault(bucket, []).append(index)
+    for indices in buckets.values():
+        indices.sort()
+    return buckets
+
+
+def packed_state_from_current_state(
+    current_game_state: AnyGameState,
+) -> PackedNumpyState:
+    return PackedNumpyState(
+        board=PackedBoard.from_board(board_from_current_game_state(current_game_state)),
+        game_data=game_data_from_current_game_state(current_game_state),
+    )
+
+
+def current_game_state_from_packed_state(state: PackedNumpyState) -> CurrentGameState:
+    return current_game_state_from_state(
+        NumpyState(board=state.board.to_board(), game_data=state.game_data)
+    )
+
+
+def step_result_from_history(
+    state: Union[NumpyState, PackedNumpyState],
+    history: UndoStack,
+    points: npt.NDArray[float],
+    is_terminal: bool,
+) -> StepResult:
+    """
+    Build the StepResult of the last move, from the state after the move and the
+    record the move left in the history
+    Args:
+        state: the state after the move
+        history: the UndoStack the move was recorded in
+        points: the (2,) array of points won during the move
+        is_terminal: whether the game is over after the move
+    """
+    record = len(history) - 1
+    maze_height = state.board.maze_height
+    eaten_cheeses = history.eaten_cheeses[record].tolist()
+    missed = state.game_data.player_misses > history.player_misses[record]
+    return StepResult(
+        points=(float(points[0]), float(points[1])),
+        eaten_cheeses=(
+            None
+            if eaten_cheeses[0] < 0
+            else to_coordinates(eaten_cheeses[0], maze_height),
+            None
+            if eaten_cheeses[1] < 0
+            else to_coordinates(eaten_cheeses[1], maze_height),
+        ),
+        missed=(bool(missed[0]), bool(missed[1])),
+        muds=(int(state.game_data.player_muds[0]), int(state.game_data.player_muds[1])),
+        is_terminal=is_terminal,
+    )
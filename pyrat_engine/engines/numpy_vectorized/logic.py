@@ -1,230 +1,499 @@
+from typing import Optional, Union
+
 import numpy as np
 import numpy.typing as npt
 
-from pyrat_engine.engines.numpy_vectorized.base import Board, NumpyState
+from pyrat_engine.engines.numpy_vectorized.base import (
+    BatchedBoard,
+    BatchedNumpyState,
+    GameData,
+    MoveBuffers,
+    NumpyState,
+    PackedNumpyState,
+    Successors,
+)
 from pyrat_engine.types import Move
 
 
-def move_up(player_position_matrix: npt.NDArray):
+def end_turn(state: NumpyState):
+    """End the turn chores"""
+    state.game_data.player_muds -= 1
+
+
+def calculate_new_muds(state: NumpyState, moves: npt.ArrayLike) -> npt.NDArray[int]:
     """
-    move a player up whether it is possible or not
+    Calculate the new player muds after they move from their position.
+    Does not change it if the player is still in a previous mud
     Args:
-        player_position_matrix: The player position matrix to move the player on
+        state: The current NumpyState
+        moves: (nb_players,) array of the move of each player
 
     Returns:
-        the new board
-    """
-    player_position_matrix = np.copy(player_position_matrix)
-    player_position = np.argwhere(player_position_matrix)[0]
-    new_player_pos = (player_position + [0, 1]) % np.array(player_position_matrix.shape)
-    (
-        player_position_matrix[player_position[0], player_position[1]],
-        player_position_matrix[new_player_pos[0], new_player_pos[1]],
-    ) = (
-        player_position_matrix[new_player_pos[0], new_player_pos[1]],
-        player_position_matrix[player_position[0], player_position[1]],
-    )
-    return player_position_matrix
+        a (nb_players,) array containing each player's mud
+    """
+    is_stuck = state.game_data.player_muds > 0
+    move_cost = state.board.move_cost[state.board.player_cells, moves]
+
+    new_muds = np.where(is_stuck, state.game_data.player_muds, move_cost)
+
+    return new_muds
 
 
-def move_down(player_position_matrix: npt.NDArray):
+def update_cheese_and_score(state: NumpyState) -> npt.NDArray[float]:
     """
-    move a player down whether it is possible or not
+    Give the points to the players that reached a cheese and remove the eaten cheeses
     Args:
-        player_position_matrix: The player position matrix to move the player on
+        state: The NumpyState to update in place
 
     Returns:
-        the new board
-    """
-    player_position_matrix = np.copy(player_position_matrix)
-    player_position = np.argwhere(player_position_matrix)[0]
-    new_player_pos = (player_position - [0, 1]) % np.array(player_position_matrix.shape)
-    (
-        player_position_matrix[player_position[0], player_position[1]],
-        player_position_matrix[new_player_pos[0], new_player_pos[1]],
-    ) = (
-        player_position_matrix[new_player_pos[0], new_player_pos[1]],
-        player_position_matrix[player_position[0], player_position[1]],
-    )
-    return player_position_matrix
+        a (nb_players,) array containing the points won by each player
+    """
+    board = state.board
+    cells = board.player_cells
+    # Player gets points if he actually got to the cheese
+    # (nb_players,)
+    takes_cheese = (state.game_data.player_muds <= 0) & board.cheese_cells[cells]
+    # A cheese is shared equally between the k players standing on its cell, stuck
+    # or not : each one that reaches it gets 1/k
+    player_per_cell = (cells[:, np.newaxis] == cells[np.newaxis]).sum(axis=1)
+    points = takes_cheese / player_per_cell
+
+    # update scores
+    state.game_data.player_scores += points
+    # update cheeses
+    for cell in cells[takes_cheese]:
+        board.remove_cheese(cell)
+    return points
 
 
-def move_right(player_position_matrix: npt.NDArray):
+def move(state: NumpyState, p1_move: Move, p2_move: Move) -> npt.NDArray[float]:
     """
-    move a player right whether it is possible or not
+    Make the player moves
     Args:
-        player_position_matrix: The player position matrix to move the player on
+        state: The NumpyState to update in place
+        p1_move: player 1's move
+        p2_move: player 2's move
 
     Returns:
-        the new board
-    """
-    player_position_matrix = np.copy(player_position_matrix)
-    player_position = np.argwhere(player_position_matrix)[0]
-    new_player_pos = (player_position + [1, 0]) % np.array(player_position_matrix.shape)
-    (
-        player_position_matrix[player_position[0], player_position[1]],
-        player_position_matrix[new_player_pos[0], new_player_pos[1]],
-    ) = (
-        player_position_matrix[new_player_pos[0], new_player_pos[1]],
-        player_position_matrix[player_position[0], player_position[1]],
-    )
-    return player_position_matrix
+        a (2,) array containing the points won by each player during this move
+    """
+    return move_players(state, (p1_move, p2_move))
 
 
-def move_left(player_position_matrix: npt.NDArray):
+def move_players(state: NumpyState, moves: npt.ArrayLike) -> npt.NDArray[float]:
     """
-    move a player left whether it is possible or not
+    Make the moves of any number of players, each array of the state has one element
+    per player (see multiplayer_state_from_current_state)
     Args:
-        player_position_matrix: The player position matrix to move the player on
+        state: The NumpyState to update in place
+        moves: (nb_players,) array of the move of each player
 
     Returns:
-        the new board
-    """
-    player_position_matrix = np.copy(player_position_matrix)
-    player_position = np.argwhere(player_position_matrix)[0]
-    new_player_pos = (player_position - [1, 0]) % np.array(player_position_matrix.shape)
-    (
-        player_position_matrix[player_position[0], player_position[1]],
-        player_position_matrix[new_player_pos[0], new_player_pos[1]],
-    ) = (
-        player_position_matrix[new_player_pos[0], new_player_pos[1]],
-        player_position_matrix[player_position[0], player_position[1]],
-    )
-    return player_position_matrix
-
-
-def move_player(player_position_matrix: npt.NDArray, player_move: Move):
-    """Handle moving one player"""
-    if player_move == Move.DID_NOT_MOVE:
-        return player_position_matrix.copy()
-    if player_move == Move.UP:
-        return move_up(player_position_matrix)
-    elif player_move == Move.RIGHT:
-        return move_right(player_position_matrix)
-    elif player_move == Move.LEFT:
-        return move_left(player_position_matrix)
-    else:
-        return move_down(player_position_matrix)
+        a (nb_players,) array containing the points won by each player during this
+        move
+    """
+    moves = np.asarray(moves, dtype=np.intp)
+    # Calculate the player cells
+    new_player_cells = compute_new_positions(state, moves)
 
+    # Player has missed if his position is the same as before
+    state.game_data.player_misses += new_player_cells == state.board.player_cells
 
-def move_players(board: Board, player1_move: Move, player2_move: Move):
+    # Calculate the new muds, from the cells the players moved from
+    new_muds = calculate_new_muds(state, moves)
+    state.game_data.player_muds = new_muds
+    # Update the player positions
+    state.board.player_cells = new_player_cells
+    # decrement the muds because the player moved now
+    state.game_data.player_muds -= 1
+    state.turn += 1
+    return update_cheese_and_score(state)
+
+
+def move_preallocated(
+    state: NumpyState, p1_move: Move, p2_move: Move, buffers: MoveBuffers
+) -> npt.NDArray[float]:
     """
-    Move the players without checking move correctness
+    Same as move, but every intermediate result is written in the buffers, so that
+    no array is allocated.
     Args:
-        board:
-        player1_move: The move for player 1
-        player2_move: The move for player 2
+        state: The NumpyState to update in place
+        p1_move: player 1's move
+        p2_move: player 2's move
+        buffers: MoveBuffers built from this state
 
     Returns:
-        The new board with moved players
+        buffers.points, the (2,) array of points won by each player during this move
     """
-    new_board = np.empty_like(board.player_positions, dtype=bool)
-    new_board[..., 0] = move_player(board.player_positions[..., 0], player1_move)
-    new_board[..., 1] = move_player(board.player_positions[..., 1], player2_move)
-
-    return new_board
+    board = state.board
+    game_data = state.game_data
+    cells = board.player_cells
+    buffers.moves[0] = p1_move
+    buffers.moves[1] = p2_move
+
+    # Look up the transition tables
+    np.multiply(cells, 5, out=buffers.table_index)
+    np.add(buffers.table_index, buffers.moves, out=buffers.table_index)
+    buffers.flat_next_cell.take(buffers.table_index, out=buffers.next_cells)
+    buffers.flat_move_cost.take(buffers.table_index, out=buffers.move_cost)
 
+    # Players are stuck because of previous mud
+    np.greater(game_data.player_muds, 0, out=buffers.is_stuck)
+    np.logical_not(buffers.is_stuck, out=buffers.is_free)
 
-def end_turn(state: NumpyState):
-    """End the turn chores"""
-    state.game_data.player_muds -= 1
+    # Player has missed if his position is the same as before
+    np.equal(buffers.next_cells, cells, out=buffers.stays_in_place)
+    np.logical_or(buffers.stays_in_place, buffers.is_stuck, out=buffers.stays_in_place)
+    np.add(game_data.player_misses, buffers.stays_in_place, out=game_data.player_misses)
 
+    # Free players get the cost of their move, then the turn passes
+    np.copyto(game_data.player_muds, buffers.move_cost, where=buffers.is_free)
+    np.subtract(game_data.player_muds, 1, out=game_data.player_muds)
+    np.copyto(cells, buffers.next_cells, where=buffers.is_free)
+    state.turn += 1
 
-def calculate_new_muds(state: NumpyState, p1_move: Move, p2_move: Move):
+    # Player gets points if he actually got to the cheese
+    board.cheese_cells.take(cells, out=buffers.has_cheese)
+    np.less_equal(game_data.player_muds, 0, out=buffers.takes_cheese)
+    np.logical_and(buffers.takes_cheese, buffers.has_cheese, out=buffers.takes_cheese)
+    # A cheese is shared between the players standing on its cell
+    player_per_cell = 2 if cells[0] == cells[1] else 1
+    np.divide(buffers.takes_cheese, player_per_cell, out=buffers.points)
+    np.add(game_data.player_scores, buffers.points, out=game_data.player_scores)
+    for player in range(2):
+        if buffers.takes_cheese[player]:
+            board.remove_cheese(cells[player])
+
+    return buffers.points
+
+
+def packed_move(
+    state: PackedNumpyState, p1_move: Move, p2_move: Move
+) -> npt.NDArray[float]:
     """
-    Calculate the new player muds after they move from their position.
-    Does not change it if the player is still in a previous mud
+    Same as move, on a PackedNumpyState. The walls, muds and cheeses of the 2 player
+    cells are decoded from the packed board on the fly.
     Args:
-        state: The current NumpyState
+        state: The PackedNumpyState to update in place
         p1_move: player 1's move
         p2_move: player 2's move
 
     Returns:
-        a (2,) array containing each player's mud
+        a (2,) array containing the points won by each player during this move
     """
-    is_stuck = state.game_data.player_muds > 0
-    move_cost = np.ones((2,), dtype=int)
-    move_cost[0] = state.board.cost[state.board.player_positions[..., 0]][0][p1_move]
-    move_cost[1] = state.board.cost[state.board.player_positions[..., 1]][0][p2_move]
+    board = state.board
+    game_data = state.game_data
+    cells = board.player_cells.astype(np.intp)
+    moves = np.array([p1_move, p2_move], dtype=np.intp)
 
-    new_muds = (
-        is_stuck * state.game_data.player_muds + np.logical_not(is_stuck) * move_cost
-    )
-
-    return new_muds
+    is_blocked = board.is_blocked(cells, moves)
+    next_cells = np.where(is_blocked, cells, cells + board.cell_offsets[moves])
+    move_cost = np.where(is_blocked, 1, board.mud_cost(cells, next_cells, moves))
 
+    # Players are stuck because of previous mud
+    is_stuck = game_data.player_muds > 0
+    new_cells = np.where(is_stuck, cells, next_cells)
+    # Player has missed if his position is the same as before
+    game_data.player_misses += new_cells == cells
+    # Free players get the cost of their move, then the turn passes
+    game_data.player_muds = np.where(is_stuck, game_data.player_muds, move_cost) - 1
+    board.player_cells[:] = new_cells
+    state.turn += 1
 
-def update_cheese_and_score(state: NumpyState):
     # Player gets points if he actually got to the cheese
-    should_get_points = state.game_data.player_muds <= 0
-    # (2,maze_width,maze_height)
-    taken_cheeses = should_get_points * np.logical_and(
-        state.board.cheeses[..., np.newaxis], state.board.player_positions
-    )
-    # (maze_width,maze_height)
-    player_per_cell = state.board.player_positions.sum(axis=2)
-    # (2,)
-    points = np.nan_to_num(
-        taken_cheeses / player_per_cell[..., np.newaxis], copy=False
-    ).sum(axis=(0, 1))
-
-    # (maze_width, maze_height)
-    new_cheeses = np.logical_xor(
-        state.board.cheeses,
-        taken_cheeses.sum(axis=2),
-    )
+    takes_cheese = (game_data.player_muds <= 0) & board.has_cheese(new_cells)
+    # A cheese is shared between the players standing on its cell
+    player_per_cell = 1 + (new_cells[0] == new_cells[1])
+    points = takes_cheese / player_per_cell
+    game_data.player_scores += points
+    for cell in new_cells[takes_cheese]:
+        board.remove_cheese(cell)
+    return points
 
-    # update scores
-    state.game_data.player_scores += points
-    # update cheeses
-    state.board.cheeses = new_cheeses
 
+def skip_turns(state: NumpyState, nb_turns: int) -> None:
+    """
+    Play nb_turns turns in which no player moves nor eats a cheese, in closed form.
+    Every player misses every turn and the stuck players get out of their mud.
+    It is the caller's job to make sure that the turns are really uneventful.
+    Args:
+        state: The NumpyState to update in place
+        nb_turns: the number of turns to play
+    """
+    if nb_turns <= 0:
+        return
+    game_data = state.game_data
+    np.add(game_data.player_misses, nb_turns, out=game_data.player_misses)
+    # Free players stay at 0 mud, stuck players lose a turn of mud per turn
+    np.subtract(game_data.player_muds, nb_turns, out=game_data.player_muds)
+    np.maximum(game_data.player_muds, 0, out=game_data.player_muds)
+    state.turn += nb_turns
 
-def move(state: NumpyState, p1_move: Move, p2_move: Move):
-    # Calculate the player positions
-    new_player_pos = compute_new_positions(state, p1_move, p2_move)
 
-    # Player has missed if his position is the same as before
-    player_misses = (state.board.player_positions == new_player_pos).all(axis=(0, 1))
-    # Update misses
-    state.game_data.player_misses += player_misses
+def turns_until_decision(state: NumpyState, max_turns: Optional[int] = None) -> int:
+    """
+    Count the turns during which no player can do anything but stay in place : until
+    a player is free in a cell it can leave. If the players can't leave their cell,
+    until both are out of their mud.
+    Args:
+        state: the current NumpyState
+        max_turns: (optional) number of turns after which the game is over
 
-    # Update the player positions
-    state.board.player_positions = new_player_pos
-    # Calculate the new muds
-    new_muds = calculate_new_muds(state, p1_move, p2_move)
-    state.game_data.player_muds = new_muds
-    # decrement the muds because the player moved now
-    state.game_data.player_muds -= 1
-    update_cheese_and_score(state)
+    Returns:
+        The number of turns, 0 if a player has a choice right now
+    """
+    board = state.board
+    cells = board.player_cells
+    muds = state.game_data.player_muds
+    can_leave = (
+        board.next_cell[cells, : Move.DID_NOT_MOVE] != cells[:, np.newaxis]
+    ).any(axis=1)
+    # Turns until each player is out of its mud
+    free_turns = np.maximum(muds, 0)
+    if can_leave.any():
+        nb_turns = int(free_turns[can_leave].min())
+    else:
+        nb_turns = int(free_turns.max())
+    if max_turns is not None:
+        nb_turns = min(nb_turns, max_turns - state.turn)
+    return max(nb_turns, 0)
 
 
 def compute_new_positions(
-    state: NumpyState, p1_move: Move, p2_move: Move
-) -> npt.NDArray:
+    state: NumpyState, moves: npt.ArrayLike
+) -> npt.NDArray[np.intp]:
     """
-    Calculate the new player positions, taking into account walls, labyrinth boundaries
+    Calculate the new player cells, taking into account walls, labyrinth boundaries
     and player's current mud status
     Args:
         state: the current NumpyState
-        p1_move: player 1's move
-        p2_move: player 2's move
+        moves: (nb_players,) array of the move of each player
 
     Returns:
-        The updated player position matrix
+        a (nb_players,) array containing each player's new cell
     """
     # Players are stuck because of previous mud
-    is_stuck = state.game_data.player_muds > 0  # (2,) array
-    # The move chosen makes the player move
-    can_move = np.zeros((2,), dtype=bool)
-    can_move[0] = state.board.can_move[state.board.player_positions[..., 0]][0][p1_move]
-    can_move[1] = state.board.can_move[state.board.player_positions[..., 1]][0][p2_move]
-    should_stay_in_place = is_stuck | np.logical_not(can_move)
-    # Numpy broadcasts from the right
-    new_player_pos = (
-        should_stay_in_place * state.board.player_positions
-        + np.logical_not(should_stay_in_place)
-        * move_players(state.board, player1_move=p1_move, player2_move=p2_move)
+    is_stuck = state.game_data.player_muds > 0  # (nb_players,) array
+    # Walls and boundaries are already in the transition table
+    next_cells = state.board.next_cell[state.board.player_cells, moves]
+    return np.where(is_stuck, state.board.player_cells, next_cells)
+
+
+def legal_moves(state: NumpyState) -> npt.NDArray[bool]:
+    """
+    Moves that change something for each player : the ones that do not bump into a
+    wall, and DID_NOT_MOVE. A player stuck in mud only has DID_NOT_MOVE.
+    Args:
+        state: the current NumpyState
+
+    Returns:
+        a (nb_players, 5) array, legal_moves[player][move] says whether the move is
+        legal
+    """
+    cells = state.board.player_cells
+    is_legal = state.board.next_cell[cells] != cells[:, np.newaxis]
+    is_legal[:, Move.DID_NOT_MOVE] = True
+    is_legal[state.game_data.player_muds > 0, : Move.DID_NOT_MOVE] = False
+    return is_legal
+
+
+def effective_moves(state: NumpyState) -> npt.NDArray[np.intp]:
+    """
+    Map every move to the legal move that has the same effect : illegal moves do the
+    same as DID_NOT_MOVE. Joint moves with the same effective moves have the same
+    outcome.
+    Args:
+        state: the current NumpyState
+
+    Returns:
+        a (2, 5) array, effective_moves[player][move] is the legal move equivalent to
+        move
+    """
+    return np.where(legal_moves(state), np.arange(len(Move)), Move.DID_NOT_MOVE)
+
+
+def batched_move(
+    state: BatchedNumpyState, p1_moves: npt.ArrayLike, p2_moves: npt.ArrayLike
+) -> npt.NDArray[float]:
+    """
+    Make the player moves on every unfinished game of the batch.
+    Follows the same rules as move, finished games are left untouched.
+    Args:
+        state: The BatchedNumpyState to update in place
+        p1_moves: (nb_games,) array of player 1 moves
+        p2_moves: (nb_games,) array of player 2 moves
+
+    Returns:
+        a (nb_games, 2) array containing the points won by each player in each game
+    """
+    board = state.board
+    game_data = state.game_data
+    # (nb_games, 2)
+    moves = np.stack([p1_moves, p2_moves], axis=1).astype(np.intp)
+    # (nb_games, 1) so that it broadcasts against the players dimension
+    games = np.arange(board.nb_games)[:, np.newaxis]
+    is_active = np.logical_not(state.is_finished)[:, np.newaxis]
+
+    cells = board.player_cells
+    is_stuck = game_data.player_muds > 0
+    next_cells = board.next_cell[games, cells, moves]
+    move_cost = board.move_cost[games, cells, moves]
+    should_move = is_active & np.logical_not(is_stuck)
+    new_cells = np.where(should_move, next_cells, cells)
+
+    # Player has missed if he stays in place
+    game_data.player_misses += is_active & (new_cells == cells)
+    # Players that were not stuck get the cost of their move, then the turn passes
+    # The arrays are updated in place, the state may be a shard of a bigger batch
+    game_data.player_muds[...] = np.where(
+        is_active,
+        np.where(is_stuck, game_data.player_muds, move_cost) - 1,
+        game_data.player_muds,
+    )
+    board.player_cells[...] = new_cells
+    state.turns += is_active[:, 0]
+
+    points = batched_update_cheese_and_score(state, is_active)
+    batched_update_finished(state)
+    return points
+
+
+def expand(state: NumpyState, max_turns: Optional[int] = None) -> Successors:
+    """
+    Compute every successor of the state in a single batched move.
+    Only one joint move per distinct outcome is played (see effective_moves).
+    Args:
+        state: the NumpyState to expand, it is not modified
+        max_turns: (optional) number of turns after which the game is over
+
+    Returns:
+        The Successors of the state
+    """
+    effective = effective_moves(state)
+    # (5, 5) effective joint move of each joint move, encoded as p1_move * 5 + p2_move
+    joint_moves = effective[0][:, np.newaxis] * len(Move) + effective[1][np.newaxis]
+    unique_joint_moves, successor_index = np.unique(joint_moves, return_inverse=True)
+    nb_successors = len(unique_joint_moves)
+    moves = np.stack(np.divmod(unique_joint_moves, len(Move)), axis=1)
+
+    game_data = GameData(
+        player_scores=np.repeat(
+            state.game_data.player_scores[np.newaxis], nb_successors, axis=0
+        ),
+        player_muds=np.repeat(
+            state.game_data.player_muds[np.newaxis], nb_successors, axis=0
+        ),
+        player_misses=np.repeat(
+            state.game_data.player_misses[np.newaxis], nb_successors, axis=0
+        ),
+    )
+    board = BatchedBoard.repeat(state.board, nb_successors)
+    successors = BatchedNumpyState(
+        board=board,
+        game_data=game_data,
+        total_cheeses=board.remaining_cheeses + game_data.player_scores.sum(axis=1),
+        is_finished=np.zeros((nb_successors,), dtype=bool),
+        turns=np.full((nb_successors,), state.turn, dtype=int),
+        max_turns=max_turns,
+    )
+    # Successors of a finished game are not played
+    batched_update_finished(successors)
+    rewards = batched_move(successors, moves[:, 0], moves[:, 1])
+    return Successors(
+        state=successors,
+        moves=moves,
+        rewards=rewards,
+        is_terminal=successors.is_finished,
+        successor_index=successor_index.reshape(len(Move), len(Move)),
     )
 
-    return new_player_pos
+
+def batched_legal_moves(state: BatchedNumpyState) -> npt.NDArray[bool]:
+    """
+    legal_moves for every game of the batch. Finished games only have DID_NOT_MOVE.
+    Args:
+        state: the current BatchedNumpyState
+
+    Returns:
+        a (nb_games, 2, 5) array, legal_moves[game][player][move] says whether the
+        move is legal
+    """
+    board = state.board
+    games = np.arange(board.nb_games)[:, np.newaxis]
+    cells = board.player_cells
+    is_legal = board.next_cell[games, cells] != cells[..., np.newaxis]
+    is_legal[..., Move.DID_NOT_MOVE] = True
+    has_no_choice = (state.game_data.player_muds > 0) | state.is_finished[:, np.newaxis]
+    is_legal[has_no_choice, : Move.DID_NOT_MOVE] = False
+    return is_legal
+
+
+def batched_update_cheese_and_score(
+    state: BatchedNumpyState, is_active: npt.NDArray[bool]
+) -> npt.NDArray[float]:
+    """
+    Give the points to the players that reached a cheese and remove the eaten cheeses
+    Args:
+        state: The BatchedNumpyState to update in place
+        is_active: (nb_games, 1) array, whether each game is still played
+
+    Returns:
+        a (nb_games, 2) array containing the points won by each player in each game
+    """
+    board = state.board
+    game_data = state.game_data
+    games = np.arange(board.nb_games)[:, np.newaxis]
+    cells = board.player_cells
+
+    # Player gets points if he actually got to the cheese
+    # (nb_games, 2)
+    takes_cheese = (
+        is_active & (game_data.player_muds <= 0) & board.cheese_cells[games, cells]
+    )
+    # A cheese is shared between the players standing on its cell
+    # (nb_games, 1)
+    is_same_cell = cells[:, :1] == cells[:, 1:]
+    player_per_cell = 1 + is_same_cell
+    points = takes_cheese / player_per_cell
+
+    game_data.player_scores += points
+    # Players sharing a cheese only eat one
+    board.remaining_cheeses -= takes_cheese.sum(axis=1) - (
+        is_same_cell[:, 0] & takes_cheese.all(axis=1)
+    )
+    board.cheese_cells[
+        np.broadcast_to(games, cells.shape)[takes_cheese], cells[takes_cheese]
+    ] = False
+    return points
+
+
+def is_finished(
+    state: Union[NumpyState, PackedNumpyState], max_turns: Optional[int] = None
+) -> bool:
+    """
+    Whether the game is over : all the cheeses were eaten, a player has more than
+    half of the cheeses, or max_turns turns were played
+    """
+    remaining_cheeses = state.board.remaining_cheeses
+    scores = state.game_data.player_scores
+    # Eaten cheeses are in the scores
+    total_cheeses = remaining_cheeses + float(scores.sum())
+    return (
+        remaining_cheeses == 0
+        or float(scores.max()) > total_cheeses / 2
+        or (max_turns is not None and state.turn >= max_turns)
+    )
+
+
+def batched_update_finished(state: BatchedNumpyState) -> None:
+    """
+    Flag the games that are over : all the cheeses were eaten, a player has more
+    than half of the cheeses, or max_turns turns were played
+    """
+    no_cheese_left = state.board.remaining_cheeses == 0
+    has_won = (
+        state.game_data.player_scores > state.total_cheeses[:, np.newaxis] / 2
+    ).any(axis=1)
+    state.is_finished |= no_cheese_left | has_won
+    if state.max_turns is not None:
+        state.is_finished |= state.turns >= state.max_turns
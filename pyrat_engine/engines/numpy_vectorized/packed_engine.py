@@ -0,0 +1,109 @@
+from typing import List, Optional, Tuple
+
+import copy
+import numpy.typing as npt
+
+from pyrat_engine.engines.base import PyratEngine, StepResult
+from pyrat_engine.engines.numpy_vectorized.base import (
+    PackedNumpyState,
+    UndoStack,
+    to_cell,
+)
+from pyrat_engine.engines.numpy_vectorized.helpers import (
+    current_game_state_from_packed_state,
+    packed_state_from_current_state,
+    step_result_from_history,
+)
+from pyrat_engine.engines.numpy_vectorized.logic import is_finished, packed_move
+from pyrat_engine.state.base import AnyGameState, CurrentGameState
+from pyrat_engine.types import Coordinates, Move
+
+
+class PackedNumpyEngine(PyratEngine):
+    """Same game as NumpyEngine, played on a PackedBoard.
+    Moves are a bit slower, but the state takes a few bytes per cell instead of
+    dozens, which matters when many states are kept around."""
+
+    def __init__(self, state: AnyGameState, max_turns: Optional[int] = None):
+        """
+        Args:
+            state: the state to start the game from
+            max_turns: (optional) the game is over after max_turns turns, see
+                NumpyEngine
+        """
+        self._max_turns = max_turns
+        self._history = UndoStack()
+        self._original_state = packed_state_from_current_state(state)
+        self.state = self._original_state.fork()
+
+    def reset(self) -> None:
+        self.state = self._original_state.fork()
+
+    def set_current_game_state(self, current_game_state: CurrentGameState) -> None:
+        self.state = packed_state_from_current_state(current_game_state)
+
+    def get_current_game_state(self) -> CurrentGameState:
+        return current_game_state_from_packed_state(self._current_state)
+
+    def _move(self, p1_move: Move, p2_move: Move) -> npt.NDArray[float]:
+        """Make the moves and record them in the history, return the points array"""
+        self._history.push(self._current_state)
+        points = packed_move(self._current_state, p1_move, p2_move)
+        self._history.record_points(self._current_state, points)
+        return points
+
+    def move(self, p1_move: Move, p2_move: Move) -> Tuple[float, float]:
+        points = self._move(p1_move, p2_move)
+        return float(points[0]), float(points[1])
+
+    def step(self, p1_move: Move, p2_move: Move) -> StepResult:
+        points = self._move(p1_move, p2_move)
+        return step_result_from_history(
+            self._current_state, self._history, points, self.is_terminal()
+        )
+
+    def is_terminal(self) -> bool:
+        return is_finished(self._current_state, self._max_turns)
+
+    def _scores(self) -> Tuple[float, float]:
+        score1, score2 = self._current_state.game_data.player_scores.tolist()
+        return score1, score2
+
+    def unmove(
+        self, p1_move: Move, p2_move: Move, cheeses: List[Coordinates] = None
+    ) -> None:
+        """Unmake the last move, see NumpyEngine.unmove
+        Args:
+            p1_move: the move to unmake for player 1
+            p2_move: the move to unmake for player 2
+            cheeses: (optional) Any other cheeses to put back in
+        """
+        self._history.pop(self._current_state)
+        if cheeses is not None:
+            board = self._current_state.board
+            for cheese in cheeses:
+                board.put_cheese(to_cell(cheese, board.maze_height))
+
+    def snapshot(self) -> PackedNumpyState:
+        """Fork of the current state, sharing its static arrays"""
+        return self._current_state.fork()
+
+    def restore(self, snapshot: PackedNumpyState) -> None:
+        self._current_state.restore(snapshot)
+        self._history.clear()
+
+    def clone(self) -> "PackedNumpyEngine":
+        clone = copy.copy(self)
+        clone._history = UndoStack()
+        clone.state = self._current_state.fork()
+        return clone
+
+    @property
+    def state(self) -> PackedNumpyState:
+        return self._current_state
+
+    @state.setter
+    def state(self, value: PackedNumpyState):
+        self._current_state = value
+        # The history belongs to the previous state
+        self._history.clear()
@@ -0,0 +1,56 @@
+from typing import Any, Dict, Iterator, List, Tuple
+
+import contextlib
+
+from pyrat_engine.engines.numpy_vectorized.engine import NumpyEngine
+from pyrat_engine.state.base import CurrentGameState
+
+
+class EnginePool:
+    """Recycle NumpyEngines between games instead of building a new one per game.
+    Released engines are kept by maze size, acquiring an engine for a maze of a
+    known size loads the maze into the arrays of a released engine (see
+    NumpyEngine.load)."""
+
+    def __init__(self, max_idle_per_size: int = 16, **engine_kwargs: Any):
+        """
+        Args:
+            max_idle_per_size: maximum number of released engines kept for each maze
+                size, the others are left to the garbage collector
+            engine_kwargs: arguments given to NumpyEngine when the pool builds a new
+                engine, like allocation_free or max_turns
+        """
+        self._max_idle_per_size = max_idle_per_size
+        self._engine_kwargs = engine_kwargs
+        self._idle_engines: Dict[Tuple[int, int], List[NumpyEngine]] = {}
+
+    def acquire(self, state: CurrentGameState) -> NumpyEngine:
+        """Get an engine starting a game from state, recycled if possible"""
+        idle_engines = self._idle_engines.get((state.maze_width, state.maze_height))
+        if not idle_engines:
+            return NumpyEngine(state, **self._engine_kwargs)
+        engine = idle_engines.pop()
+        engine.load(state)
+        return engine
+
+    def release(self, engine: NumpyEngine) -> None:
+        """Give an engine back to the pool. It must not be used anymore."""
+        board = engine.state.board
+        idle_engines = self._idle_engines.setdefault(
+            (board.maze_width, board.maze_height), []
+        )
+        if len(idle_engines) < self._max_idle_per_size:
+            idle_engines.append(engine)
+
+    @contextlib.contextmanager
+    def engine(self, state: CurrentGameState) -> Iterator[NumpyEngine]:
+        """Context manager acquiring an engine and releasing it on exit"""
+        engine = self.acquire(state)
+        try:
+            yield engine
+        finally:
+            self.release(engine)
+
+    def __len__(self) -> int:
+        """Number of idle engines in the pool"""
+        return sum(len(engines) for engines in self._idle_engines.values())
@@ -0,0 +1,31 @@
+import numpy as np
+import random
+from timeit import Timer
+
+from pyrat_engine.engines.base import PyratEngine
+from pyrat_engine.engines.numpy_vectorized import NumpyEngine
+from pyrat_engine.initializer.configs import MazeConfig
+from pyrat_engine.initializer.initializer import CurrentStateInitializer
+from pyrat_engine.types import Move
+
+if __name__ == "__main__":
+    random.seed(0)
+    rng = np.random.default_rng(0)
+    state = CurrentStateInitializer(maze_config=MazeConfig())()
+    engine = NumpyEngine(state)
+    nb_moves = 1000
+    p1_moves = rng.integers(0, len(Move), size=nb_moves)
+    p2_moves = rng.integers(0, len(Move), size=nb_moves)
+    for name, step_many in (
+        ("NumpyEngine.step_many", NumpyEngine.step_many),
+        ("PyratEngine.step_many", PyratEngine.step_many),
+    ):
+
+        def play() -> None:
+            engine.reset()
+            step_many(engine, p1_moves, p2_moves)
+
+        engine.reset()
+        nb_played = len(step_many(engine, p1_moves, p2_moves))
+        time = min(Timer(play).repeat(repeat=5, number=1))
+        print(f"{name} : {time / nb_played * 1e6:.1f} us per move, {nb_played} moves")
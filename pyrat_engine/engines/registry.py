@@ -0,0 +1,182 @@
+"""Registry of the engines, imported lazily, and make_engine to build the fastest
+one for a maze on this machine."""
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+import importlib
+import importlib.util
+from dataclasses import dataclass
+
+from pyrat_engine.state.base import CurrentGameState
+
+
+@dataclass(frozen=True)
+class EngineSpec:
+    """How to import an engine, and when make_engine may pick it"""
+
+    name: str
+    # "module:ClassName", only imported when the engine is used
+    path: str
+    # Batched engines play several games at once, from a sequence of states
+    batched: bool = False
+    # Optional modules the engine needs to be fast
+    requires: Sequence[str] = ()
+    # Whether make_engine may pick this engine when it is not asked for by name
+    auto_select: bool = True
+    # Whether the engine takes a max_turns argument
+    has_max_turns: bool = True
+
+    def is_available(self) -> bool:
+        return all(
+            importlib.util.find_spec(module) is not None for module in self.requires
+        )
+
+    def load(self) -> Callable:
+        module_name, class_name = self.path.split(":")
+        return getattr(importlib.import_module(module_name), class_name)
+
+
+ENGINES: Dict[str, EngineSpec] = {}
+
+
+def register_engine(spec: EngineSpec) -> None:
+    """Add an engine to the registry, replacing any engine of the same name"""
+    ENGINES[spec.name] = spec
+
+
+def available_engines(batched: bool = False) -> List[str]:
+    """Names of the registered engines that make_engine may pick"""
+    return [
+        name
+        for name, spec in ENGINES.items()
+        if spec.batched == batched and spec.auto_select and spec.is_available()
+    ]
+
+
+for _spec in (
+    EngineSpec("numpy", "pyrat_engine.engines.numpy_vectorized.engine:NumpyEngine"),
+    EngineSpec(
+        "packed_numpy",
+        "pyrat_engine.engines.numpy_vectorized.packed_engine:PackedNumpyEngine",
+    ),
+    EngineSpec(
+        "numba",
+        "pyrat_engine.engines.numba_jit.engine:NumbaEngine",
+        requires=("numba",),
+    ),
+    EngineSpec("bitboard", "pyrat_engine.engines.bitboard.engine:BitboardEngine"),
+    EngineSpec("flat_array", "pyrat_engine.engines.flat_array.engine:FlatArrayEngine"),
+    # Follows the rules of player_move_handler rather than those of the other
+    # engines, it is only built when asked for by name
+    EngineSpec(
+        "vanilla_py",
+        "pyrat_engine.engines.vanilla_py.vanilla_py_engine:VanillaPyEngine",
+        auto_select=False,
+        has_max_turns=False,
+    ),
+    EngineSpec(
+        "batched_numpy",
+        "pyrat_engine.engines.numpy_vectorized.batched_engine:BatchedNumpyEngine",
+        batched=True,
+    ),
+):
+    register_engine(_spec)
+
+
+def make_engine(
+    state: Union[CurrentGameState, Sequence[CurrentGameState]],
+    batch_size: int = 1,
+    prefer: Optional[Union[str, Sequence[str]]] = None,
+    max_turns: Optional[int] = None,
+    cache_path: Optional[str] = None,
+):
+    """Build the fastest engine for state on this machine.
+    Choosing between several engines runs a short calibration the first time a maze
+    size and batch size are seen, its timings are cached on disk (see
+    benchmarking.calibration).
+    Args:
+        state: the state to start the game from. With batch_size > 1, either the
+            state of every game of the batch or one state for all of them
+        batch_size: number of games played at once, a batched engine is built
+            above 1
+        prefer: (optional) the name of the engine to build, or the names of the
+            engines to choose from
+        max_turns: (optional) the game is over after max_turns turns
+        cache_path: (optional) the calibration cache file
+
+    Returns:
+        the engine, a PyratEngine or a batched engine
+    """
+    state = _batch_states(state, batch_size)
+    names = _candidate_names(prefer, batch_size)
+    return _build_fastest(names, state, batch_size, max_turns, cache_path)
+
+
+def _batch_states(
+    state: Union[CurrentGameState, Sequence[CurrentGameState]], batch_size: int
+) -> Union[CurrentGameState, Sequence[CurrentGameState]]:
+    """Check batch_size, and repeat a single state for every game of a batch"""
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+    if batch_size == 1:
+        return state
+    if isinstance(state, CurrentGameState):
+        state = [state] * batch_size
+    if len(state) != batch_size:
+        raise ValueError(f"Expected {batch_size} states, got {len(state)}")
+    return state
+
+
+def _candidate_names(
+    prefer: Optional[Union[str, Sequence[str]]], batch_size: int
+) -> List[str]:
+    """Names of the engines to choose from, see make_engine. An engine asked for
+    alone is kept even if it is not available, so that it fails when built."""
+    batched = batch_size > 1
+    if isinstance(prefer, str):
+        names = [prefer]
+    elif prefer is not None:
+        names = list(prefer)
+    else:
+        names = available_engines(batched)
+    for name in names:
+        if name not in ENGINES:
+            raise ValueError(f"Unknown engine {name}, expected one of {list(ENGINES)}")
+        if ENGINES[name].batched != batched:
+            raise ValueError(
+                f"Engine {name} does not play batches of {batch_size} games"
+            )
+    if len(names) > 1:
+        names = [name for name in names if ENGINES[name].is_available()]
+    if not names:
+        raise ValueError(f"None of the engines {prefer} is available")
+    return names
+
+
+def _build_fastest(
+    names: List[str],
+    state: Union[CurrentGameState, Sequence[CurrentGameState]],
+    batch_size: int,
+    max_turns: Optional[int],
+    cache_path: Optional[str],
+):
+    """Build the engine of names with the best calibrated timing"""
+    if len(names) == 1:
+        name = names[0]
+    else:
+        # Deferred, the calibration imports the numpy engines
+        from pyrat_engine.benchmarking.calibration import calibrated_timings
+
+        timings = calibrated_timings(
+            {name: ENGINES[name].load() for name in names},
+            state[0] if batch_size > 1 else state,
+            batch_size,
+            cache_path,
+        )
+        name = min(names, key=timings.__getitem__)
+
+    spec = ENGINES[name]
+    if max_turns is not None:
+        if not spec.has_max_turns:
+            raise ValueError(f"Engine {name} does not handle max_turns")
+        return spec.load()(state, max_turns=max_turns)
+    return spec.load()(state)
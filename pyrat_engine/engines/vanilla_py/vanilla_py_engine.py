@@ -1,38 +1,283 @@
-from typing import List, Optional, Tuple
+from typing import List, Optional, Set, Tuple
 
-from copy import deepcopy
+from copy import copy
+from dataclasses import dataclass
 
-from pyrat_engine.engines.base import PyratEngine
+from pyrat_engine.engines.base import PyratEngine, is_over, open_moves
 from pyrat_engine.initializer.configs import MazeConfig, PlayerConfig
 from pyrat_engine.initializer.initializer import CurrentStateInitializer
-from pyrat_engine.state.base import CurrentGameState
+from pyrat_engine.state.base import (
+    AnyGameState,
+    CurrentGameState,
+    MazeTopology,
+    game_topology,
+)
 from pyrat_engine.types import Coordinates, Move
 
 
+@dataclass
+class _MazeTables:
+    """The static part of the game, with cells numbered x * maze_height + y.
+    Shared between the engines playing on the same maze."""
+
+    maze_width: int
+    maze_height: int
+    topology: MazeTopology
+    # next_cell[cell][move] is the cell reached by move, cell itself if the move is
+    # blocked by a wall or the maze border
+    next_cell: List[Tuple[int, ...]]
+    # mud_cost[cell][move] is the mud the player gets by making move from cell
+    mud_cost: List[Tuple[int, ...]]
+
+    @classmethod
+    def from_state(cls, state: AnyGameState) -> "_MazeTables":
+        """Tables of the maze of state, from the topology of the maze"""
+        topology = game_topology(state)
+        return topology.derived(cls, cls.from_topology)
+
+    @classmethod
+    def from_topology(cls, topology: MazeTopology) -> "_MazeTables":
+        width, height = topology.maze_width, topology.maze_height
+        all_walls, all_muds = topology.walls_dict(), topology.mud_dict()
+        next_cell = []
+        mud_cost = []
+        for x in range(width):
+            for y in range(height):
+                position = (x, y)
+                cell = x * height + y
+                muds = all_muds.get(position, {})
+                # Blocked moves and DID_NOT_MOVE stay in place
+                next_cells = [cell] * len(Move)
+                mud_costs = [0] * len(Move)
+                for move, (dest_x, dest_y) in open_moves(
+                    position, width, height, all_walls
+                ):
+                    next_cells[move] = dest_x * height + dest_y
+                    mud_costs[move] = muds.get((dest_x, dest_y), 0)
+                next_cell.append(tuple(next_cells))
+                mud_cost.append(tuple(mud_costs))
+        return cls(
+            maze_width=width,
+            maze_height=height,
+            topology=topology,
+            next_cell=next_cell,
+            mud_cost=mud_cost,
+        )
+
+
+@dataclass
+class _DynamicState:
+    """The part of the game that moves change"""
+
+    player_cells: List[int]
+    player_muds: List[int]
+    player_misses: List[int]
+    player_scores: List[float]
+    cheeses: Set[int]
+    # The cheeses are listed in this order in the CurrentGameState
+    cheese_order: List[int]
+
+    @classmethod
+    def from_state(cls, state: AnyGameState) -> "_DynamicState":
+        height = state.maze_height
+        return cls(
+            player_cells=[
+                state.player1_pos[0] * height + state.player1_pos[1],
+                state.player2_pos[0] * height + state.player2_pos[1],
+            ],
+            player_muds=[state.player1_mud, state.player2_mud],
+            player_misses=[state.player1_misses, state.player2_misses],
+            player_scores=[state.player1_score, state.player2_score],
+            cheeses={x * height + y for x, y in state.current_cheese_list},
+            cheese_order=[x * height + y for x, y in state.current_cheese_list],
+        )
+
+    def copy(self) -> "_DynamicState":
+        return _DynamicState(
+            player_cells=list(self.player_cells),
+            player_muds=list(self.player_muds),
+            player_misses=list(self.player_misses),
+            player_scores=list(self.player_scores),
+            cheeses=set(self.cheeses),
+            cheese_order=list(self.cheese_order),
+        )
+
+
 class VanillaPyEngine(PyratEngine):
+    """Pure python engine, following the rules of player_move_handler.move.
+    The maze is turned into per cell tables of the cell reached and of the mud
+    taken by each move, and the cheeses are kept in a set : moves are made in place
+    with O(1) lookups, and recorded in an undo log to be unmade."""
+
     def __init__(
         self,
-        game_state: CurrentGameState,
+        game_state: AnyGameState,
     ):
-        self.initial_state: CurrentGameState = deepcopy(game_state)
-        self.current_game_state: CurrentGameState = deepcopy(game_state)
+        # Neither keeps a reference to the mutable parts of game_state
+        self._initial_maze = _MazeTables.from_state(game_state)
+        self._initial_dynamic_state = _DynamicState.from_state(game_state)
+        # Each record holds the cells, muds, misses and scores of both players
+        # before a move, and the cells of the cheeses eaten during the move
+        self._undo_log: List[Tuple] = []
+        self.reset()
 
     def reset(self) -> None:
         """Reset the PGN to the initial state with the config provided."""
-        self.set_current_game_state(self.initial_state)
+        self._maze = self._initial_maze
+        self._state = self._initial_dynamic_state.copy()
+        self._undo_log.clear()
 
     def set_current_game_state(self, current_game_state: CurrentGameState) -> None:
-        self.current_game_state = deepcopy(current_game_state)
+        self._maze = _MazeTables.from_state(current_game_state)
+        self._state = _DynamicState.from_state(current_game_state)
+        self._undo_log.clear()
+
+    @property
+    def initial_state(self) -> CurrentGameState:
+        return self._to_current_game_state(
+            self._initial_maze, self._initial_dynamic_state
+        )
 
     def get_current_game_state(self) -> CurrentGameState:
-        return deepcopy(self.current_game_state)
+        return self._to_current_game_state(self._maze, self._state)
+
+    @staticmethod
+    def _to_current_game_state(
+        maze: _MazeTables, state: _DynamicState
+    ) -> CurrentGameState:
+        height = maze.maze_height
+        return CurrentGameState(
+            maze_width=maze.maze_width,
+            maze_height=height,
+            walls=maze.topology.walls_dict(),
+            mud=maze.topology.mud_dict(),
+            current_cheese_list=[
+                divmod(cell, height)
+                for cell in state.cheese_order
+                if cell in state.cheeses
+            ],
+            player1_pos=divmod(state.player_cells[0], height),
+            player1_score=state.player_scores[0],
+            player1_mud=state.player_muds[0],
+            player1_misses=state.player_misses[0],
+            player2_pos=divmod(state.player_cells[1], height),
+            player2_score=state.player_scores[1],
+            player2_mud=state.player_muds[1],
+            player2_misses=state.player_misses[1],
+        )
 
     def move(self, p1_move: Move, p2_move: Move) -> Tuple[float, float]:
+        state = self._state
+        cells = state.player_cells
+        muds = state.player_muds
+        misses = state.player_misses
+        scores = state.player_scores
+        cheeses = state.cheeses
+        record = (
+            cells[0],
+            cells[1],
+            muds[0],
+            muds[1],
+            misses[0],
+            misses[1],
+            scores[0],
+            scores[1],
+        )
 
-        return (0.0, 0.0)  # placeholder for now
+        for player, player_move in ((0, p1_move), (1, p2_move)):
+            cell = cells[player]
+            if muds[player] > 0:
+                # A stuck player stays in place
+                muds[player] -= 1
+                misses[player] += 1
+            else:
+                destination = self._maze.next_cell[cell][player_move]
+                muds[player] = self._maze.mud_cost[cell][player_move]
+                if destination == cell:
+                    misses[player] += 1
+                cells[player] = destination
+
+        # The players take the cheese of their cell once they are out of the mud
+        is_player1_stuck = muds[0] > 0
+        is_player2_stuck = muds[1] > 0
+        cell1, cell2 = cells
+        eaten_cheeses = []
+        points1 = points2 = 0.0
+        if (
+            not (is_player1_stuck or is_player2_stuck)
+            and cell1 == cell2
+            and cell1 in cheeses
+        ):
+            cheeses.remove(cell1)
+            eaten_cheeses.append(cell1)
+            points1 = points2 = 0.5
+        if not is_player1_stuck and cell1 in cheeses:
+            cheeses.remove(cell1)
+            eaten_cheeses.append(cell1)
+            points1 += 1
+        if not is_player2_stuck and cell2 in cheeses:
+            cheeses.remove(cell2)
+            eaten_cheeses.append(cell2)
+            points2 += 1
+        scores[0] += points1
+        scores[1] += points2
+        self._undo_log.append((record, eaten_cheeses))
+        return points1, points2
 
     def unmove(self, p1_move: Move, p2_move: Move, cheeses: List[Coordinates] = None):
-        return
+        """Unmake the last move. The moves are not needed, the engine keeps what it
+        needs to restore the previous state in its undo log.
+        Args:
+            p1_move: the move to unmake for player 1
+            p2_move: the move to unmake for player 2
+            cheeses: (optional) Any other cheeses to put back in
+        """
+        if not self._undo_log:
+            raise ValueError("There is no move to unmake")
+        record, eaten_cheeses = self._undo_log.pop()
+        state = self._state
+        (
+            state.player_cells[0],
+            state.player_cells[1],
+            state.player_muds[0],
+            state.player_muds[1],
+            state.player_misses[0],
+            state.player_misses[1],
+            state.player_scores[0],
+            state.player_scores[1],
+        ) = record
+        state.cheeses.update(eaten_cheeses)
+        if cheeses is not None:
+            for x, y in cheeses:
+                cell = x * self._maze.maze_height + y
+                if cell not in state.cheese_order:
+                    state.cheese_order.append(cell)
+                state.cheeses.add(cell)
+
+    def is_terminal(self) -> bool:
+        state = self._state
+        score1, score2 = state.player_scores
+        total_cheeses = len(state.cheeses) + score1 + score2
+        return is_over(len(state.cheeses), score1, score2, total_cheeses / 2)
+
+    def _scores(self) -> Tuple[float, float]:
+        score1, score2 = self._state.player_scores
+        return score1, score2
+
+    def snapshot(self) -> _DynamicState:
+        """Copy of the dynamic part of the current state"""
+        return self._state.copy()
+
+    def restore(self, snapshot: _DynamicState) -> None:
+        self._state = snapshot.copy()
+        self._undo_log.clear()
+
+    def clone(self) -> "VanillaPyEngine":
+        """Clone sharing the maze tables, that are never modified"""
+        clone = copy(self)
+        clone._state = self._state.copy()
+        clone._undo_log = []
+        return clone
 
 
 class VanillaPyEngineConfigBuilder:
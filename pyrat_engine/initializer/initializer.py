@@ -1,4 +1,4 @@
-from copy import deepcopy
+from typing import Optional
 
 from pyrat_engine.initializer.configs import MazeConfig, PlayerConfig
 from pyrat_engine.initializer.mud_generator import MudGenerator
@@ -7,7 +7,13 @@ from pyrat_engine.initializer.random_state_generators import (
     PlayerPositionGenerator,
     WallsGenerator,
 )
-from pyrat_engine.state.base import CurrentGameState, HistoricGameState
+from pyrat_engine.state.base import (
+    CurrentGameState,
+    GameState,
+    HistoricGameState,
+    MazeTopology,
+    intern_topology,
+)
 
 
 class CurrentStateInitializer:
@@ -24,26 +30,44 @@ class CurrentStateInitializer:
         self.maze_config = maze_config if maze_config is not None else MazeConfig()
 
     def __call__(self) -> CurrentGameState:
+        return self.game_state().to_current_game_state()
+
+    def game_state(self, topology: Optional[MazeTopology] = None) -> GameState:
+        """
+        Create a game on an interned topology
+        Args:
+            topology: (optional) the maze to play on, only the players and cheeses
+                are generated then. A new maze is generated by default.
+        """
+        if topology is not None and (topology.maze_width, topology.maze_height) != (
+            self.maze_config.width,
+            self.maze_config.height,
+        ):
+            raise ValueError(
+                f"The topology is {topology.maze_width}x{topology.maze_height}, the"
+                f" maze config {self.maze_config.width}x{self.maze_config.height}"
+            )
         p1_pos, p2_pos = PlayerPositionGenerator(
             maze_width=self.maze_config.width, maze_height=self.maze_config.height
         ).from_config(self.player_config)
         cheese_list = CheeseGenerator(p1_pos=p1_pos, p2_pos=p2_pos).from_maze_config(
             self.maze_config
         )
-        walls = WallsGenerator().from_maze_config(self.maze_config)
+        if topology is None:
+            walls = WallsGenerator().from_maze_config(self.maze_config)
 
-        mud = MudGenerator().from_maze_config_and_walls(
-            maze_config=self.maze_config, walls=walls
-        )
+            mud = MudGenerator().from_maze_config_and_walls(
+                maze_config=self.maze_config, walls=walls
+            )
+            topology = MazeTopology.from_walls_and_mud(
+                self.maze_config.width, self.maze_config.height, walls, mud
+            )
 
-        return CurrentGameState(
-            maze_width=self.maze_config.width,
-            maze_height=self.maze_config.height,
+        return GameState(
+            topology=intern_topology(topology),
             player1_pos=p1_pos,
             player2_pos=p2_pos,
             current_cheese_list=cheese_list,
-            walls=walls,
-            mud=mud,
         )
 
 
@@ -65,7 +89,8 @@ class HistoricStateInitializer:
 
         return HistoricGameState(
             current_game_state=current_game_state,
-            original_cheese_list=deepcopy(current_game_state.current_cheese_list),
+            # Coordinates are immutable tuples, copying the list is enough
+            original_cheese_list=list(current_game_state.current_cheese_list),
             player1_moves_history=[],
             player2_moves_history=[],
         )
@@ -1,6 +1,7 @@
-from typing import List
+from typing import Any, Callable, Dict, Hashable, List, Tuple, TypeVar, Union
 
-from dataclasses import dataclass, field
+import weakref
+from dataclasses import dataclass, field, replace
 
 from pyrat_engine.types import Coordinates, Move, Muds, Walls
 
@@ -42,6 +43,178 @@ class CurrentGameState:
     player2_misses: int = 0
 
 
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class MazeTopology:
+    """The part of a game that never changes : the maze dimensions, walls and mud.
+    It is immutable and hashable, so the games on the same maze can share a single
+    instance (see intern_topology) along with the tables engines derive from it."""
+
+    maze_width: int
+    maze_height: int
+    # Walls in the order of the Walls dict : (cell, (neighbour, ...)) pairs
+    walls: Tuple[Tuple[Coordinates, Tuple[Coordinates, ...]], ...] = ()
+    # Mud in the order of the Muds dict : (cell, ((neighbour, cost), ...)) pairs
+    mud: Tuple[Tuple[Coordinates, Tuple[Tuple[Coordinates, int], ...]], ...] = ()
+    # Values derived from the topology, see derived
+    _derived: Dict[Hashable, Any] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def _key(self) -> Tuple:
+        return self.maze_width, self.maze_height, self.walls, self.mud
+
+    @classmethod
+    def from_walls_and_mud(
+        cls, maze_width: int, maze_height: int, walls: Walls, mud: Muds
+    ) -> "MazeTopology":
+        return cls(
+            maze_width=maze_width,
+            maze_height=maze_height,
+            walls=tuple(
+                (tuple(cell), tuple(map(tuple, neighbours)))
+                for cell, neighbours in walls.items()
+            ),
+            mud=tuple(
+                (
+                    tuple(cell),
+                    tuple(
+                        (tuple(neighbour), cost) for neighbour, cost in costs.items()
+                    ),
+                )
+                for cell, costs in mud.items()
+            ),
+        )
+
+    @classmethod
+    def from_current_game_state(cls, state: "CurrentGameState") -> "MazeTopology":
+        return cls.from_walls_and_mud(
+            state.maze_width, state.maze_height, state.walls, state.mud
+        )
+
+    def walls_dict(self) -> Walls:
+        """New Walls dict, the caller may modify it"""
+        return {cell: list(neighbours) for cell, neighbours in self.walls}
+
+    def mud_dict(self) -> Muds:
+        """New Muds dict, the caller may modify it"""
+        return {cell: dict(costs) for cell, costs in self.mud}
+
+    def derived(self, key: Hashable, build: Callable[["MazeTopology"], T]) -> T:
+        """
+        Value derived from the topology, built on the first call for each key.
+        Engines keep their static tables here : the engines of games on an interned
+        topology share them.
+        Args:
+            key: identifies the value, usually the class of the value
+            build: builds the value from the topology, it must not be modified
+                afterwards
+        """
+        try:
+            return self._derived[key]
+        except KeyError:
+            value = self._derived[key] = build(self)
+            return value
+
+
+# Keyed by the content of the topologies, keying by the topologies themselves would
+# keep them alive
+_INTERNED_TOPOLOGIES: "weakref.WeakValueDictionary[Tuple, MazeTopology]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+def intern_topology(topology: MazeTopology) -> MazeTopology:
+    """The single live instance equal to topology, topology itself if there is none.
+    Interned topologies are dropped once no game uses them anymore."""
+    return _INTERNED_TOPOLOGIES.setdefault(topology._key(), topology)
+
+
+@dataclass
+class GameState:
+    """The dynamic part of a CurrentGameState, on a shared MazeTopology"""
+
+    topology: MazeTopology
+
+    # Cheeses
+    current_cheese_list: List[Coordinates] = field(default_factory=list)
+
+    # Player 1
+    player1_pos: Coordinates = (0, 0)
+    player1_score: float = 0
+    player1_mud: int = 0
+    player1_misses: int = 0
+
+    # Player 2
+    player2_pos: Coordinates = (0, 0)
+    player2_score: float = 0
+    player2_mud: int = 0
+    player2_misses: int = 0
+
+    @classmethod
+    def from_current_game_state(cls, state: CurrentGameState) -> "GameState":
+        """GameState of state, on the interned topology of its maze"""
+        return cls(
+            topology=intern_topology(MazeTopology.from_current_game_state(state)),
+            current_cheese_list=list(state.current_cheese_list),
+            player1_pos=state.player1_pos,
+            player1_score=state.player1_score,
+            player1_mud=state.player1_mud,
+            player1_misses=state.player1_misses,
+            player2_pos=state.player2_pos,
+            player2_score=state.player2_score,
+            player2_mud=state.player2_mud,
+            player2_misses=state.player2_misses,
+        )
+
+    @property
+    def maze_width(self) -> int:
+        return self.topology.maze_width
+
+    @property
+    def maze_height(self) -> int:
+        return self.topology.maze_height
+
+    def to_current_game_state(self) -> CurrentGameState:
+        return CurrentGameState(
+            maze_width=self.topology.maze_width,
+            maze_height=self.topology.maze_height,
+            current_cheese_list=list(self.current_cheese_list),
+            walls=self.topology.walls_dict(),
+            mud=self.topology.mud_dict(),
+            player1_pos=self.player1_pos,
+            player1_score=self.player1_score,
+            player1_mud=self.player1_mud,
+            player1_misses=self.player1_misses,
+            player2_pos=self.player2_pos,
+            player2_score=self.player2_score,
+            player2_mud=self.player2_mud,
+            player2_misses=self.player2_misses,
+        )
+
+    def copy(self) -> "GameState":
+        """Copy sharing the topology"""
+        return replace(self, current_cheese_list=list(self.current_cheese_list))
+
+
+# What the engines start a game from. A GameState skips rebuilding the topology.
+AnyGameState = Union[CurrentGameState, GameState]
+
+
+def game_topology(state: AnyGameState) -> MazeTopology:
+    """The topology of the maze of state, interned for a CurrentGameState. The
+    topology of a GameState is used as is, it is interned when the GameState comes
+    from GameState.from_current_game_state or from an initializer."""
+    if isinstance(state, GameState):
+        return state.topology
+    return intern_topology(MazeTopology.from_current_game_state(state))
+
+
 @dataclass
 class HistoricGameState:
     """Contains all the information needed to retrace the history of a game up to a
@@ -40,6 +40,7 @@ setup(
     install_requires=read_requirements("./requirements/requirements.txt"),
     extras_require={
         "dev": read_requirements("./requirements/requirements-dev.txt"),
+        "numba": read_requirements("./requirements/requirements-numba.txt"),
     },
     cmdclass={"develop": PostDevelopCommand},
     include_package_data=True,
@@ -0,0 +1,24 @@
+from pyrat_engine.engines.base import is_over, open_moves
+from pyrat_engine.types import Move
+
+
+def test_open_moves():
+    # The (1, 1) -> (1, 2) wall is only listed from (1, 2)
+    walls = {(1, 2): [(1, 1)], (1, 1): [(0, 1)]}
+    assert list(open_moves((1, 1), 3, 3, walls)) == [
+        (Move.DOWN, (1, 0)),
+        (Move.RIGHT, (2, 1)),
+    ]
+    # Corner of the maze
+    assert list(open_moves((0, 0), 3, 3, walls)) == [
+        (Move.UP, (0, 1)),
+        (Move.RIGHT, (1, 0)),
+    ]
+
+
+def test_is_over():
+    assert not is_over(3, 1, 1, 2.5)
+    assert is_over(0, 2, 3, 2.5)
+    assert is_over(1, 3, 1, 2.5)
+    assert not is_over(3, 1, 1, 2.5, turn=9, max_turns=10)
+    assert is_over(3, 1, 1, 2.5, turn=10, max_turns=10)
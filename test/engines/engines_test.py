@@ -0,0 +1,87 @@
+import pytest
+import random
+
+from pyrat_engine.engines.bitboard import BitboardEngine
+from pyrat_engine.engines.flat_array import FlatArrayEngine
+from pyrat_engine.engines.numba_jit import NumbaEngine
+from pyrat_engine.engines.numpy_vectorized import NumpyEngine
+from pyrat_engine.state.base import CurrentGameState
+from pyrat_engine.types import Move
+from test.engines.helpers import assert_same_dynamic_state
+
+# Engines following the same rules as NumpyEngine
+ENGINE_CLASSES = [NumbaEngine, BitboardEngine, FlatArrayEngine]
+
+
+@pytest.mark.parametrize("engine_cls", ENGINE_CLASSES)
+@pytest.mark.parametrize("max_turns", [None, 40])
+def test_engine_matches_numpy_engine(
+    current_game_state_with_mud_and_cheese: CurrentGameState,
+    engine_cls,
+    max_turns: int,
+):
+    engine = NumpyEngine(current_game_state_with_mud_and_cheese, max_turns=max_turns)
+    other_engine = engine_cls(
+        current_game_state_with_mud_and_cheese, max_turns=max_turns
+    )
+    move_list = list(Move)
+    for turn in range(300):
+        if turn % 100 == 0:
+            engine.reset()
+            other_engine.reset()
+        p1_move = random.choice(move_list)
+        p2_move = random.choice(move_list)
+        assert engine.step(p1_move, p2_move) == other_engine.step(p1_move, p2_move)
+        assert_same_dynamic_state(
+            engine.get_current_game_state(), other_engine.get_current_game_state()
+        )
+        assert engine.is_terminal() == other_engine.is_terminal()
+        assert engine.winner() == other_engine.winner()
+        for player in range(2):
+            assert (
+                engine.legal_moves(player) == other_engine.legal_moves(player)
+            ).all()
+
+
+@pytest.mark.parametrize("engine_cls", ENGINE_CLASSES)
+def test_engine_unmove_and_clone(
+    current_game_state_with_mud_and_cheese: CurrentGameState, engine_cls
+):
+    engine = engine_cls(current_game_state_with_mud_and_cheese)
+    initial_state = engine.get_current_game_state()
+    # More moves than the initial capacity of the NumbaEngine history
+    moves = [(random.choice(list(Move)), random.choice(list(Move))) for _ in range(300)]
+    for p1_move, p2_move in moves:
+        engine.move(p1_move, p2_move)
+    clone = engine.clone()
+    played_state = engine.get_current_game_state()
+    for p1_move, p2_move in reversed(moves):
+        engine.unmove(p1_move, p2_move)
+    assert engine.get_current_game_state() == initial_state
+    assert clone.get_current_game_state() == played_state
+    with pytest.raises(ValueError):
+        engine.unmove(Move.UP, Move.UP)
+
+
+@pytest.mark.parametrize("engine_cls", ENGINE_CLASSES)
+def test_engine_handles_deep_mud(engine_cls):
+    # Mud up to 255 turns fits in the uint8 costs of NumpyEngine
+    state = CurrentGameState(
+        maze_width=2,
+        maze_height=1,
+        current_cheese_list=[(1, 0)],
+        mud={(0, 0): {(1, 0): 200}, (1, 0): {(0, 0): 200}},
+        player1_pos=(0, 0),
+        player2_pos=(0, 0),
+    )
+    engine = NumpyEngine(state)
+    other_engine = engine_cls(state)
+    assert engine.move(Move.RIGHT, Move.DID_NOT_MOVE) == other_engine.move(
+        Move.RIGHT, Move.DID_NOT_MOVE
+    )
+    for _ in range(200):
+        assert engine.move(Move.UP, Move.UP) == other_engine.move(Move.UP, Move.UP)
+        assert_same_dynamic_state(
+            engine.get_current_game_state(), other_engine.get_current_game_state()
+        )
+    assert other_engine.is_terminal()
@@ -0,0 +1,17 @@
+import random
+
+from pyrat_engine.engines.flat_array import FlatArrayEngine
+from pyrat_engine.state.base import CurrentGameState
+from pyrat_engine.types import Move
+
+
+def test_flat_array_engine_snapshot_restore(
+    current_game_state_with_mud_and_cheese: CurrentGameState,
+):
+    engine = FlatArrayEngine(current_game_state_with_mud_and_cheese)
+    initial_state = engine.get_current_game_state()
+    snapshot = engine.snapshot()
+    for _ in range(50):
+        engine.move(random.choice(list(Move)), random.choice(list(Move)))
+    engine.restore(snapshot)
+    assert engine.get_current_game_state() == initial_state
@@ -0,0 +1,17 @@
+from pyrat_engine.state.base import CurrentGameState
+
+
+def assert_same_dynamic_state(state: CurrentGameState, other: CurrentGameState):
+    """Compare the cheeses and players of two states, not their maze"""
+    for name in (
+        "current_cheese_list",
+        "player1_pos",
+        "player1_score",
+        "player1_mud",
+        "player1_misses",
+        "player2_pos",
+        "player2_score",
+        "player2_mud",
+        "player2_misses",
+    ):
+        assert getattr(state, name) == getattr(other, name), name
@@ -0,0 +1,61 @@
+import importlib.util
+import random
+import sys
+
+from pyrat_engine.engines.numba_jit import NumbaEngine
+from pyrat_engine.engines.numba_jit import engine as numba_engine
+from pyrat_engine.engines.numba_jit import kernels
+from pyrat_engine.engines.numpy_vectorized import NumpyEngine
+from pyrat_engine.state.base import CurrentGameState
+from pyrat_engine.types import Move
+
+
+def test_numba_engine_unmove_restores_counters(
+    current_game_state_with_mud_and_cheese: CurrentGameState,
+):
+    engine = NumbaEngine(current_game_state_with_mud_and_cheese)
+    nb_cheeses = engine.state.board.remaining_cheeses
+    moves = [(random.choice(list(Move)), random.choice(list(Move))) for _ in range(50)]
+    for p1_move, p2_move in moves:
+        engine.move(p1_move, p2_move)
+    for p1_move, p2_move in reversed(moves):
+        engine.unmove(p1_move, p2_move)
+    assert engine.state.board.remaining_cheeses == nb_cheeses
+    assert engine.state.turn == 0
+
+
+def test_numba_engine_step_past_history_capacity(
+    current_game_state_with_mud_and_cheese: CurrentGameState,
+):
+    engine = NumpyEngine(current_game_state_with_mud_and_cheese)
+    numba_engine = NumbaEngine(current_game_state_with_mud_and_cheese)
+    # More moves than the initial capacity of the history
+    for _ in range(300):
+        p1_move, p2_move = random.choice(list(Move)), random.choice(list(Move))
+        assert engine.step(p1_move, p2_move) == numba_engine.step(p1_move, p2_move)
+
+
+def test_numba_engine_without_numba(
+    current_game_state_with_mud_and_cheese: CurrentGameState, monkeypatch
+):
+    # Import the kernels as if numba was not installed
+    monkeypatch.setitem(sys.modules, "numba", None)
+    spec = importlib.util.spec_from_file_location("plain_kernels", kernels.__file__)
+    plain_kernels = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(plain_kernels)
+    assert not plain_kernels.NUMBA_AVAILABLE
+    monkeypatch.setattr(numba_engine, "move_kernel", plain_kernels.move_kernel)
+    monkeypatch.setattr(numba_engine, "unmove_kernel", plain_kernels.unmove_kernel)
+
+    engine = NumpyEngine(current_game_state_with_mud_and_cheese)
+    plain_engine = NumbaEngine(current_game_state_with_mud_and_cheese)
+    moves = [(random.choice(list(Move)), random.choice(list(Move))) for _ in range(50)]
+    for p1_move, p2_move in moves:
+        assert engine.move(p1_move, p2_move) == plain_engine.move(p1_move, p2_move)
+        assert engine.get_current_game_state() == plain_engine.get_current_game_state()
+    for p1_move, p2_move in reversed(moves):
+        plain_engine.unmove(p1_move, p2_move)
+    assert (
+        plain_engine.get_current_game_state()
+        == NumpyEngine(current_game_state_with_mud_and_cheese).get_current_game_state()
+    )
@@ -2,8 +2,15 @@ import numpy as np
 import pytest
 
 from pyrat_engine.engines.numpy_vectorized.base import Board as NpBoard
+from pyrat_engine.engines.numpy_vectorized.base import (
+    PackedBoard,
+    to_cell,
+    to_coordinates,
+)
+from pyrat_engine.engines.numpy_vectorized.helpers import board_from_current_game_state
 from pyrat_engine.state.base import CurrentGameState
-from pyrat_engine.utils import get_direction, valid_neighbors
+from pyrat_engine.types import Move
+from pyrat_engine.utils import down, get_direction, left, right, up, valid_neighbors
 
 
 class TestBoard:
@@ -65,3 +72,141 @@ class TestBoard:
                         )
                     else:
                         assert board_3_2.cost[coordinate][move] == 1
+
+    def test_board__player_cells(self, board_3_2: NpBoard) -> None:
+        assert board_3_2.player_cells[0] == to_cell((0, 0), 2)
+        assert board_3_2.player_cells[1] == to_cell((2, 1), 2)
+        assert to_coordinates(board_3_2.player_cells[1], 2) == (2, 1)
+
+    def test_board__next_cell(
+        self, board_3_2: NpBoard, maze_3_2: CurrentGameState
+    ) -> None:
+        width, height = maze_3_2.maze_width, maze_3_2.maze_height
+        moves = {Move.UP: up, Move.DOWN: down, Move.LEFT: left, Move.RIGHT: right}
+        for i in range(width):
+            for j in range(height):
+                coordinate = (i, j)
+                cell = to_cell(coordinate, height)
+                assert board_3_2.next_cell[cell][Move.DID_NOT_MOVE] == cell
+                for move, destination in moves.items():
+                    neighbour = destination(coordinate)
+                    if board_3_2.can_move[coordinate][move]:
+                        expected = to_cell(neighbour, height)
+                    else:
+                        expected = cell
+                    assert board_3_2.next_cell[cell][move] == expected
+
+    def test_board__move_cost(self, maze_2_2_mud: CurrentGameState) -> None:
+        board = NpBoard(
+            maze_width=maze_2_2_mud.maze_width,
+            maze_height=maze_2_2_mud.maze_height,
+            p1_pos=maze_2_2_mud.player1_pos,
+            p2_pos=maze_2_2_mud.player2_pos,
+            walls=maze_2_2_mud.walls,
+            muds=maze_2_2_mud.mud,
+            cheeses=maze_2_2_mud.current_cheese_list,
+        )
+        assert board.move_cost[to_cell((0, 0), 2)][Move.UP] == 2
+        assert board.move_cost[to_cell((0, 0), 2)][Move.RIGHT] == 2
+        assert board.move_cost[to_cell((0, 1), 2)][Move.DOWN] == 2
+        assert board.move_cost[to_cell((1, 1), 2)][Move.DOWN] == 1
+        # Impossible moves take 1 turn
+        assert board.move_cost[to_cell((0, 0), 2)][Move.LEFT] == 1
+
+    def test_board__cheeses(self, board_3_2: NpBoard) -> None:
+        assert board_3_2.remaining_cheeses == 2
+        assert board_3_2.cheese_cells[to_cell((2, 0), 2)]
+        assert board_3_2.cheese_cells[to_cell((0, 1), 2)]
+        assert board_3_2.cheeses[2, 0] and board_3_2.cheeses[0, 1]
+
+        board_3_2.remove_cheese(to_cell((2, 0), 2))
+        board_3_2.remove_cheese(to_cell((2, 0), 2))
+        assert board_3_2.remaining_cheeses == 1
+        assert not board_3_2.cheeses[2, 0]
+
+        board_3_2.put_cheese(to_cell((1, 1), 2))
+        board_3_2.put_cheese(to_cell((1, 1), 2))
+        assert board_3_2.remaining_cheeses == 2
+        assert board_3_2.cheeses[1, 1]
+
+    def test_board__pad_and_crop(self, board_3_2: NpBoard) -> None:
+        padded = board_3_2.pad(5, 4)
+        assert (padded.maze_width, padded.maze_height) == (5, 4)
+        assert padded.remaining_cheeses == board_3_2.remaining_cheeses
+        assert (
+            np.array(to_coordinates(padded.player_cells, 4))
+            == np.array(to_coordinates(board_3_2.player_cells, 2))
+        ).all()
+        # No move leads in or out of the padding
+        assert not padded.can_move[3:].any()
+        assert not padded.can_move[:, 2:].any()
+        real_cells = padded.next_cell.reshape(5, 4, 5)[:3, :2]
+        x, y = to_coordinates(real_cells, 4)
+        assert (x < 3).all() and (y < 2).all()
+
+        cropped = padded.crop(3, 2)
+        for name in ("player_cells", "can_move", "cost", "next_cell", "cheese_cells"):
+            assert (getattr(cropped, name) == getattr(board_3_2, name)).all()
+        with pytest.raises(ValueError):
+            board_3_2.pad(2, 4)
+
+
+class TestPackedBoard:
+    @pytest.mark.parametrize(
+        "state_fixture",
+        ["maze_3_2", "maze_2_2_mud", "current_game_state_with_mud_and_cheese"],
+    )
+    def test_packed_board__round_trip(self, state_fixture: str, request) -> None:
+        board = board_from_current_game_state(request.getfixturevalue(state_fixture))
+        unpacked = PackedBoard.from_board(board).to_board()
+        assert (unpacked.player_cells == board.player_cells).all()
+        assert (unpacked.can_move == board.can_move).all()
+        assert (unpacked.cost == board.cost).all()
+        assert (unpacked.next_cell == board.next_cell).all()
+        assert (unpacked.move_cost == board.move_cost).all()
+        assert (unpacked.cheese_cells == board.cheese_cells).all()
+        assert unpacked.remaining_cheeses == board.remaining_cheeses
+
+    def test_packed_board__decoding(
+        self, current_game_state_with_mud_and_cheese: CurrentGameState
+    ) -> None:
+        board = board_from_current_game_state(current_game_state_with_mud_and_cheese)
+        packed = PackedBoard.from_board(board)
+        nb_cells = board.maze_width * board.maze_height
+        cells = np.repeat(np.arange(nb_cells), 5)
+        moves = np.tile(np.arange(5), nb_cells)
+        is_blocked = packed.is_blocked(cells, moves)
+        assert (is_blocked == ~board.can_move.reshape(-1)).all()
+        next_cells = board.next_cell.reshape(-1)
+        mud_cost = packed.mud_cost(
+            cells[~is_blocked], next_cells[~is_blocked], moves[~is_blocked]
+        )
+        assert (mud_cost == board.move_cost.reshape(-1)[~is_blocked]).all()
+        assert (packed.has_cheese(np.arange(nb_cells)) == board.cheese_cells).all()
+
+    def test_packed_board__cheeses(self, maze_3_2: CurrentGameState) -> None:
+        packed = PackedBoard.from_board(board_from_current_game_state(maze_3_2))
+        assert packed.remaining_cheeses == 2
+        packed.remove_cheese(to_cell((0, 1), 2))
+        packed.remove_cheese(to_cell((0, 1), 2))
+        assert packed.remaining_cheeses == 1
+        assert not packed.has_cheese(np.array([to_cell((0, 1), 2)]))[0]
+        packed.put_cheese(to_cell((1, 1), 2))
+        assert packed.remaining_cheeses == 2
+        assert packed.has_cheese(np.array([to_cell((1, 1), 2)]))[0]
+
+    def test_packed_board__size(
+        self, current_game_state_with_mud_and_cheese: CurrentGameState
+    ) -> None:
+        board = board_from_current_game_state(current_game_state_with_mud_and_cheese)
+        packed = PackedBoard.from_board(board)
+        board_arrays = (
+            board.player_cells,
+            board.can_move,
+            board.cost,
+            board.next_cell,
+            board.move_cost,
+            board.cheese_cells,
+        )
+        board_nbytes = sum(array.nbytes for array in board_arrays)
+        assert packed.nbytes * 10 < board_nbytes
@@ -0,0 +1,214 @@
+from typing import List
+
+import gc
+import numpy as np
+import pytest
+import random
+from copy import deepcopy
+
+from pyrat_engine.engines.numpy_vectorized import BatchedNumpyEngine, NumpyEngine
+from pyrat_engine.engines.numpy_vectorized.base import to_coordinates
+from pyrat_engine.initializer.configs import MazeConfig
+from pyrat_engine.initializer.initializer import CurrentStateInitializer
+from pyrat_engine.state.base import CurrentGameState
+from pyrat_engine.types import Move
+
+
+@pytest.fixture
+def game_states(small_maze_config: MazeConfig) -> List[CurrentGameState]:
+    random.seed(7)
+    maze_config = deepcopy(small_maze_config)
+    maze_config.mud_density = 0.5
+    initializer = CurrentStateInitializer(maze_config=maze_config)
+    return [initializer() for _ in range(8)]
+
+
+def test_batched_move_matches_single_engine(game_states: List[CurrentGameState]):
+    batched_engine = BatchedNumpyEngine(game_states)
+    engines = [NumpyEngine(state) for state in game_states]
+    rng = np.random.default_rng(0)
+    for _ in range(100):
+        p1_moves = rng.integers(0, len(Move), size=len(engines))
+        p2_moves = rng.integers(0, len(Move), size=len(engines))
+        was_finished = batched_engine.is_finished.copy()
+        points = batched_engine.move(p1_moves, p2_moves)
+        for game, engine in enumerate(engines):
+            if was_finished[game]:
+                assert (points[game] == 0).all()
+                continue
+            previous_scores = engine.state.game_data.player_scores.copy()
+            engine.move(Move(p1_moves[game]), Move(p2_moves[game]))
+            assert (
+                engine.state.game_data.player_scores - previous_scores == points[game]
+            ).all()
+            assert (
+                batched_engine.get_current_game_state(game)
+                == engine.get_current_game_state()
+            )
+    assert batched_engine.is_finished.any()
+
+
+def test_finished_games_are_masked(maze_3_2: CurrentGameState):
+    # player 1 is right under a cheese, player 2 is right above the other one
+    batched_engine = BatchedNumpyEngine([maze_3_2, maze_3_2])
+    batched_engine.move([Move.UP, Move.DID_NOT_MOVE], [Move.DOWN, Move.DID_NOT_MOVE])
+    assert (batched_engine.is_finished == [True, False]).all()
+
+    finished_state = batched_engine.get_current_game_state(0)
+    points = batched_engine.move([Move.DOWN, Move.UP], [Move.LEFT, Move.DOWN])
+    assert (points == [[0, 0], [1, 1]]).all()
+    assert batched_engine.get_current_game_state(0) == finished_state
+    assert batched_engine.is_finished.all()
+
+    batched_engine.reset()
+    assert not batched_engine.is_finished.any()
+    assert (
+        batched_engine.get_current_game_state(0)
+        == NumpyEngine(maze_3_2).get_current_game_state()
+    )
+
+
+def test_different_dimensions_are_rejected(
+    maze_3_2: CurrentGameState, maze_2_2_mud: CurrentGameState
+):
+    with pytest.raises(ValueError):
+        BatchedNumpyEngine([maze_3_2, maze_2_2_mud])
+
+
+def test_padded_mazes_match_single_engine(
+    game_states: List[CurrentGameState],
+    maze_3_2: CurrentGameState,
+    maze_2_2_mud: CurrentGameState,
+):
+    states = game_states[:4] + [maze_3_2, maze_2_2_mud]
+    batched_engine = BatchedNumpyEngine(states, padded_size=(6, 5))
+    engines = [NumpyEngine(state) for state in states]
+    valid_cells = batched_engine.state.board.valid_cells
+    assert valid_cells.sum(axis=1).tolist() == [25] * 4 + [6, 4]
+    rng = np.random.default_rng(2)
+    for _ in range(50):
+        p1_moves = rng.integers(0, len(Move), size=len(engines))
+        p2_moves = rng.integers(0, len(Move), size=len(engines))
+        was_finished = batched_engine.is_finished.copy()
+        batched_engine.move(p1_moves, p2_moves)
+        # Players never walk into the padding
+        player_cells = batched_engine.state.board.player_cells
+        assert np.take_along_axis(valid_cells, player_cells, axis=1).all()
+        for game, engine in enumerate(engines):
+            if not was_finished[game]:
+                engine.move(Move(p1_moves[game]), Move(p2_moves[game]))
+            assert (
+                batched_engine.get_current_game_state(game)
+                == engine.get_current_game_state()
+            )
+
+
+def test_sharded_batch_matches_single_worker(game_states: List[CurrentGameState]):
+    engine = BatchedNumpyEngine(game_states)
+    with BatchedNumpyEngine(game_states, nb_workers=3) as sharded_engine:
+        rng = np.random.default_rng(3)
+        for _ in range(50):
+            p1_moves = rng.integers(0, len(Move), size=len(game_states))
+            p2_moves = rng.integers(0, len(Move), size=len(game_states))
+            expected = engine.step(p1_moves, p2_moves)
+            assert (sharded_engine.step(p1_moves, p2_moves) == expected).all()
+            engine.reset_games(engine.is_finished)
+            sharded_engine.reset_games(sharded_engine.is_finished)
+        sharded_engine.reset()
+        engine.reset()
+        for game in range(len(game_states)):
+            assert sharded_engine.get_current_game_state(
+                game
+            ) == engine.get_current_game_state(game)
+    assert sharded_engine._executor is None
+
+
+def test_dropped_sharded_batch_stops_its_threads(
+    game_states: List[CurrentGameState],
+):
+    sharded_engine = BatchedNumpyEngine(game_states, nb_workers=3)
+    executor = sharded_engine._executor
+    sharded_engine.move([Move.UP] * len(game_states), [Move.UP] * len(game_states))
+    del sharded_engine
+    gc.collect()
+    assert executor._shutdown
+
+
+def test_batched_step_matches_single_step(game_states: List[CurrentGameState]):
+    batched_engine = BatchedNumpyEngine(game_states)
+    engines = [NumpyEngine(state) for state in game_states]
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        p1_moves = rng.integers(0, len(Move), size=len(engines))
+        p2_moves = rng.integers(0, len(Move), size=len(engines))
+        was_finished = batched_engine.is_finished.copy()
+        results = batched_engine.step(p1_moves, p2_moves)
+        for game, engine in enumerate(engines):
+            if was_finished[game]:
+                continue
+            step_result = engine.step(Move(p1_moves[game]), Move(p2_moves[game]))
+            result = results[game]
+            assert tuple(result["points"]) == step_result.points
+            assert tuple(result["missed"]) == step_result.missed
+            assert tuple(result["muds"]) == step_result.muds
+            assert result["is_terminal"] == step_result.is_terminal
+            eaten_cheeses = tuple(
+                None
+                if cell < 0
+                else to_coordinates(cell, engine.state.board.maze_height)
+                for cell in result["eaten_cheeses"].tolist()
+            )
+            assert eaten_cheeses == step_result.eaten_cheeses
+
+
+def test_batched_legal_moves(game_states: List[CurrentGameState]):
+    batched_engine = BatchedNumpyEngine(game_states)
+    rng = np.random.default_rng(2)
+    for _ in range(20):
+        legal_moves = batched_engine.legal_moves()
+        for game in range(batched_engine.nb_games):
+            if batched_engine.is_finished[game]:
+                assert legal_moves[game, :, : Move.DID_NOT_MOVE].sum() == 0
+                continue
+            engine = NumpyEngine(batched_engine.get_current_game_state(game))
+            for player in range(2):
+                assert (legal_moves[game, player] == engine.legal_moves(player)).all()
+        batched_engine.move(
+            rng.integers(0, len(Move), size=batched_engine.nb_games),
+            rng.integers(0, len(Move), size=batched_engine.nb_games),
+        )
+
+
+def test_max_turns_winners_and_reset_games(maze_3_2: CurrentGameState):
+    batched_engine = BatchedNumpyEngine([maze_3_2, maze_3_2, maze_3_2], max_turns=2)
+    batched_engine.move(
+        [Move.UP, Move.UP, Move.DID_NOT_MOVE], [Move.DOWN, Move.RIGHT, Move.RIGHT]
+    )
+    # Both players of the first game ate a cheese
+    assert batched_engine.is_finished.tolist() == [True, False, False]
+    assert batched_engine.winners().tolist() == [-1, -1, -1]
+    batched_engine.move([Move.UP] * 3, [Move.RIGHT] * 3)
+    assert batched_engine.is_finished.all()
+    assert batched_engine.winners().tolist() == [-1, 0, 0]
+
+    batched_engine.reset_games([False, True, True])
+    assert batched_engine.is_finished.tolist() == [True, False, False]
+    assert batched_engine.state.turns.tolist() == [1, 0, 0]
+    for game in (1, 2):
+        assert (
+            batched_engine.get_current_game_state(game)
+            == NumpyEngine(maze_3_2).get_current_game_state()
+        )
+
+
+def test_reset_finished_games(maze_3_2: CurrentGameState):
+    batched_engine = BatchedNumpyEngine([maze_3_2] * 4, max_turns=3)
+    for _ in range(3):
+        batched_engine.move([Move.DID_NOT_MOVE] * 4, [Move.DID_NOT_MOVE] * 4)
+    assert batched_engine.is_finished.all()
+
+    batched_engine.reset_games(batched_engine.is_finished)
+    assert not batched_engine.is_finished.any()
+    assert batched_engine.state.turns.tolist() == [0] * 4
+    batched_engine.move([Move.DID_NOT_MOVE] * 4, [Move.DID_NOT_MOVE] * 4)
+    assert not batched_engine.is_finished.any()
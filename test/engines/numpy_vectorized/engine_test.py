@@ -0,0 +1,392 @@
+import os
+from typing import List, Tuple
+
+import numpy as np
+import pytest
+import random
+import tracemalloc
+
+import pyrat_engine
+from pyrat_engine.engines.base import PyratEngine, StepResult
+from pyrat_engine.engines.numpy_vectorized import NumpyEngine
+from pyrat_engine.engines.numpy_vectorized.helpers import (
+    current_game_state_from_state,
+    state_from_batched_state,
+)
+from pyrat_engine.initializer.configs import MazeConfig
+from pyrat_engine.initializer.initializer import CurrentStateInitializer
+from pyrat_engine.state.base import CurrentGameState
+from pyrat_engine.types import Move
+
+
+def make_unmake(engine: NumpyEngine, moves: List[Tuple[Move, Move]]) -> None:
+    for p1_move, p2_move in moves:
+        engine.move(p1_move, p2_move)
+    for p1_move, p2_move in reversed(moves):
+        engine.unmove(p1_move, p2_move)
+
+
+def test_allocation_free_matches_default(
+    current_game_state_with_mud_and_cheese: CurrentGameState,
+):
+    engine = NumpyEngine(current_game_state_with_mud_and_cheese)
+    allocation_free_engine = NumpyEngine(
+        current_game_state_with_mud_and_cheese, allocation_free=True
+    )
+    move_list = list(Move)
+    for turn in range(300):
+        if turn % 100 == 0:
+            engine.reset()
+            allocation_free_engine.reset()
+        p1_move = random.choice(move_list)
+        p2_move = random.choice(move_list)
+        engine.move(p1_move, p2_move)
+        allocation_free_engine.move(p1_move, p2_move)
+        assert (
+            engine.get_current_game_state()
+            == allocation_free_engine.get_current_game_state()
+        )
+
+
+def test_allocation_free_move_does_not_allocate(current_game_state: CurrentGameState):
+    engine = NumpyEngine(current_game_state, allocation_free=True)
+    moves = [
+        (random.choice(list(Move)), random.choice(list(Move))) for _ in range(1000)
+    ]
+    # Only look at the allocations made by the engine and by numpy
+    filters = [
+        tracemalloc.Filter(
+            True, os.path.join(os.path.dirname(pyrat_engine.__file__), "*")
+        ),
+        tracemalloc.Filter(True, os.path.join(os.path.dirname(np.__file__), "*")),
+    ]
+    # Grow the history to its final capacity before tracing. Otherwise UndoStack._grow
+    # leaves an object allocated in the warm up that is freed in the measured moves
+    make_unmake(engine, moves)
+    tracemalloc.start()
+    try:
+        # The first moves under tracing allocate the interpreter frames
+        for _ in range(2):
+            make_unmake(engine, moves)
+        before = tracemalloc.take_snapshot().filter_traces(filters)
+        make_unmake(engine, moves)
+        after = tracemalloc.take_snapshot().filter_traces(filters)
+    finally:
+        tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    assert allocated == 0
+
+
+@pytest.mark.parametrize("allocation_free", [False, True])
+def test_unmove_restores_previous_state(
+    current_game_state_with_mud_and_cheese: CurrentGameState, allocation_free: bool
+):
+    engine = NumpyEngine(
+        current_game_state_with_mud_and_cheese, allocation_free=allocation_free
+    )
+    move_list = list(Move)
+    states = []
+    moves = []
+    for _ in range(300):
+        states.append(engine.get_current_game_state())
+        moves.append((random.choice(move_list), random.choice(move_list)))
+        engine.move(*moves[-1])
+    for state, (p1_move, p2_move) in zip(reversed(states), reversed(moves)):
+        engine.unmove(p1_move, p2_move)
+        assert engine.get_current_game_state() == state
+
+    with pytest.raises(ValueError):
+        engine.unmove(Move.UP, Move.UP)
+
+
+def test_move_returns_points(maze_3_2: CurrentGameState):
+    engine = NumpyEngine(maze_3_2)
+    assert engine.move(Move.UP, Move.DID_NOT_MOVE) == (1.0, 0.0)
+    assert engine.move(Move.DOWN, Move.DOWN) == (0.0, 1.0)
+    engine.unmove(Move.DOWN, Move.DOWN)
+    engine.unmove(Move.UP, Move.DID_NOT_MOVE)
+    assert (
+        engine.get_current_game_state()
+        == NumpyEngine(maze_3_2).get_current_game_state()
+    )
+
+
+def test_unmove_puts_extra_cheeses_back(maze_3_2: CurrentGameState):
+    engine = NumpyEngine(maze_3_2)
+    engine.move(Move.UP, Move.DID_NOT_MOVE)
+    engine.unmove(Move.UP, Move.DID_NOT_MOVE, cheeses=[(1, 1)])
+    assert engine.get_current_game_state().current_cheese_list == [
+        (0, 1),
+        (1, 1),
+        (2, 0),
+    ]
+
+
+def test_snapshot_restore(current_game_state_with_mud_and_cheese: CurrentGameState):
+    engine = NumpyEngine(current_game_state_with_mud_and_cheese, allocation_free=True)
+    for _ in range(5):
+        engine.move(random.choice(list(Move)), random.choice(list(Move)))
+    snapshot = engine.snapshot()
+    saved_state = engine.get_current_game_state()
+    for _ in range(20):
+        engine.move(random.choice(list(Move)), random.choice(list(Move)))
+    engine.restore(snapshot)
+    assert engine.get_current_game_state() == saved_state
+    # The snapshot can be restored several times
+    engine.move(Move.UP, Move.UP)
+    engine.restore(snapshot)
+    assert engine.get_current_game_state() == saved_state
+
+
+def test_clone_is_independent(
+    current_game_state_with_mud_and_cheese: CurrentGameState,
+):
+    engine = NumpyEngine(current_game_state_with_mud_and_cheese)
+    engine.move(Move.UP, Move.LEFT)
+    clone = engine.clone()
+    assert clone.get_current_game_state() == engine.get_current_game_state()
+    # The static arrays are shared
+    assert clone.state.board.next_cell is engine.state.board.next_cell
+
+    saved_state = engine.get_current_game_state()
+    for _ in range(20):
+        clone.move(random.choice(list(Move)), random.choice(list(Move)))
+    assert engine.get_current_game_state() == saved_state
+    # The clone does not inherit the history of the engine
+    with pytest.raises(ValueError):
+        engine.clone().unmove(Move.UP, Move.LEFT)
+    clone.reset()
+    assert (
+        clone.get_current_game_state()
+        == NumpyEngine(current_game_state_with_mud_and_cheese).get_current_game_state()
+    )
+
+
+def test_lazy_current_game_state(
+    current_game_state_with_mud_and_cheese: CurrentGameState,
+):
+    engine = NumpyEngine(current_game_state_with_mud_and_cheese)
+    for _ in range(10):
+        engine.move(random.choice(list(Move)), random.choice(list(Move)))
+    lazy_state = engine.get_current_game_state(lazy=True)
+    state = engine.get_current_game_state()
+    assert lazy_state == state
+    assert lazy_state.to_current_game_state() == state
+    assert lazy_state.player1_pos == state.player1_pos
+    # The view does not follow the engine
+    engine.move(Move.UP, Move.DOWN)
+    engine.move(Move.RIGHT, Move.LEFT)
+    assert lazy_state == state
+    # The dicts are built once
+    assert lazy_state.walls is lazy_state.walls
+
+
+@pytest.mark.parametrize("allocation_free", [False, True])
+def test_step_matches_default_step(
+    current_game_state_with_mud_and_cheese: CurrentGameState, allocation_free: bool
+):
+    engine = NumpyEngine(
+        current_game_state_with_mud_and_cheese, allocation_free=allocation_free
+    )
+    reference = NumpyEngine(current_game_state_with_mud_and_cheese)
+    for _ in range(100):
+        p1_move = random.choice(list(Move))
+        p2_move = random.choice(list(Move))
+        step_result = engine.step(p1_move, p2_move)
+        assert step_result == PyratEngine.step(reference, p1_move, p2_move)
+        if step_result.is_terminal:
+            break
+
+
+def test_step_result(maze_3_2: CurrentGameState):
+    # Player 1 eats a cheese, player 2 walks into the maze boundary
+    step_result = NumpyEngine(maze_3_2).step(Move.UP, Move.RIGHT)
+    assert step_result == StepResult(
+        points=(1.0, 0.0),
+        eaten_cheeses=((0, 1), None),
+        missed=(False, True),
+        muds=(0, 0),
+        is_terminal=False,
+    )
+
+
+@pytest.mark.parametrize("max_turns", [None, 20])
+def test_step_many_matches_moves(
+    current_game_state_with_mud_and_cheese: CurrentGameState, max_turns: int
+):
+    engine = NumpyEngine(current_game_state_with_mud_and_cheese, max_turns=max_turns)
+    reference = NumpyEngine(current_game_state_with_mud_and_cheese, max_turns=max_turns)
+    rng = np.random.default_rng(0)
+    p1_moves = rng.integers(0, len(Move), size=500)
+    p2_moves = rng.integers(0, len(Move), size=500)
+    rewards = engine.step_many(p1_moves, p2_moves)
+    expected_rewards = PyratEngine.step_many(reference, p1_moves, p2_moves)
+    # The game ends before all the moves are played
+    assert len(rewards) < 500
+    if max_turns is not None:
+        assert len(rewards) <= max_turns
+    assert (rewards == expected_rewards).all()
+    assert engine.get_current_game_state() == reference.get_current_game_state()
+
+    # Every move can be unmade
+    for turn in reversed(range(len(rewards))):
+        engine.unmove(Move(p1_moves[turn]), Move(p2_moves[turn]))
+    assert (
+        engine.get_current_game_state()
+        == NumpyEngine(current_game_state_with_mud_and_cheese).get_current_game_state()
+    )
+
+
+def test_step_many_rejects_different_lengths(current_game_state: CurrentGameState):
+    with pytest.raises(ValueError):
+        NumpyEngine(current_game_state).step_many([Move.UP], [])
+
+
+def test_legal_moves_match_default(
+    current_game_state_with_mud_and_cheese: CurrentGameState,
+):
+    engine = NumpyEngine(current_game_state_with_mud_and_cheese)
+    for _ in range(50):
+        for player in range(2):
+            assert (
+                engine.legal_moves(player) == PyratEngine.legal_moves(engine, player)
+            ).all()
+        assert engine.effective_joint_moves() == PyratEngine.effective_joint_moves(
+            engine
+        )
+        # Every joint move has the same outcome as its effective joint move
+        p1_move, p2_move = random.choice(list(Move)), random.choice(list(Move))
+        effective_p1_move = (
+            p1_move if engine.legal_moves(0)[p1_move] else Move.DID_NOT_MOVE
+        )
+        effective_p2_move = (
+            p2_move if engine.legal_moves(1)[p2_move] else Move.DID_NOT_MOVE
+        )
+        assert (effective_p1_move, effective_p2_move) in engine.effective_joint_moves()
+        clone = engine.clone()
+        clone.move(effective_p1_move, effective_p2_move)
+        engine.move(p1_move, p2_move)
+        assert engine.get_current_game_state() == clone.get_current_game_state()
+
+
+def test_is_terminal_and_winner(maze_3_2: CurrentGameState):
+    engine = NumpyEngine(maze_3_2)
+    assert not engine.is_terminal()
+    assert engine.winner() is None
+    # Player 1 eats one of the 2 cheeses, that is not more than half of them
+    engine.move(Move.UP, Move.RIGHT)
+    assert not engine.is_terminal()
+    assert engine.winner() is None
+    engine.unmove(Move.UP, Move.RIGHT)
+
+    # Both players eat a cheese : draw
+    engine.move(Move.UP, Move.DOWN)
+    assert engine.is_terminal()
+    assert engine.winner() is None
+
+    # Player 1 already has a point, one more cheese makes it win
+    maze_3_2.player1_score = 1
+    engine = NumpyEngine(maze_3_2)
+    engine.move(Move.UP, Move.RIGHT)
+    assert engine.is_terminal()
+    assert engine.winner() == 0
+    assert engine.is_terminal() == PyratEngine.is_terminal(engine)
+
+
+def test_max_turns(maze_3_2: CurrentGameState):
+    engine = NumpyEngine(maze_3_2, max_turns=2)
+    engine.move(Move.DID_NOT_MOVE, Move.DID_NOT_MOVE)
+    assert not engine.is_terminal()
+    engine.move(Move.DID_NOT_MOVE, Move.DID_NOT_MOVE)
+    assert engine.is_terminal()
+    assert engine.winner() is None
+    engine.unmove(Move.DID_NOT_MOVE, Move.DID_NOT_MOVE)
+    assert not engine.is_terminal()
+    snapshot = engine.snapshot()
+    engine.reset()
+    engine.restore(snapshot)
+    assert engine.step(Move.DID_NOT_MOVE, Move.DID_NOT_MOVE).is_terminal
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_advance_until_decision_matches_default(seed: int):
+    random.seed(seed)
+    maze_config = MazeConfig(
+        width=7, height=5, nb_cheese=15, mud_density=0.8, mud_range=6, wall_density=0.9
+    )
+    state = CurrentStateInitializer(maze_config=maze_config)()
+    engine = NumpyEngine(state, allocation_free=seed % 2 == 0, max_turns=150)
+    nb_advances = 0
+    while not engine.is_terminal():
+        reference = engine.clone()
+        saved_state = engine.get_current_game_state()
+        nb_turns = engine.advance_until_decision()
+        assert nb_turns == PyratEngine.advance_until_decision(reference)
+        assert engine.get_current_game_state() == reference.get_current_game_state()
+        assert engine.is_terminal() == reference.is_terminal()
+        if nb_turns > 0:
+            nb_advances += 1
+            # The whole advance is unmade at once
+            engine.unmove(Move.DID_NOT_MOVE, Move.DID_NOT_MOVE)
+            assert engine.get_current_game_state() == saved_state
+            engine.advance_until_decision()
+        engine.move(random.choice(list(Move)), random.choice(list(Move)))
+    assert nb_advances > 0
+
+
+def test_expand_matches_moves(
+    current_game_state_with_mud_and_cheese: CurrentGameState,
+):
+    engine = NumpyEngine(current_game_state_with_mud_and_cheese)
+    for _ in range(30):
+        saved_state = engine.get_current_game_state()
+        successors = engine.expand()
+        # The parent state is left untouched
+        assert engine.get_current_game_state() == saved_state
+        nb_successors = engine.legal_moves(0).sum() * engine.legal_moves(1).sum()
+        assert len(successors.moves) == nb_successors
+        for p1_move in Move:
+            for p2_move in Move:
+                child = engine.clone()
+                step_result = child.step(p1_move, p2_move)
+                index = successors.successor_index[p1_move, p2_move]
+                assert tuple(successors.rewards[index]) == step_result.points
+                assert successors.is_terminal[index] == step_result.is_terminal
+                successor_state = current_game_state_from_state(
+                    state_from_batched_state(successors.state, index)
+                )
+                assert successor_state == child.get_current_game_state()
+        engine.move(random.choice(list(Move)), random.choice(list(Move)))
+
+
+@pytest.mark.parametrize("allocation_free", [False, True])
+def test_load_reuses_arrays(
+    current_game_state: CurrentGameState,
+    current_game_state_with_mud_and_cheese: CurrentGameState,
+    maze_3_2: CurrentGameState,
+    allocation_free: bool,
+):
+    engine = NumpyEngine(current_game_state, allocation_free=allocation_free)
+    engine.move(Move.UP, Move.DOWN)
+    cheese_cells = engine.state.board.cheese_cells
+    engine.load(current_game_state_with_mud_and_cheese)
+    assert engine.state.board.cheese_cells is cheese_cells
+    reference = NumpyEngine(current_game_state_with_mud_and_cheese)
+    # The maze arrays are shared with the other engines on the maze
+    assert engine.state.board.next_cell is reference.state.board.next_cell
+    assert engine.get_current_game_state() == reference.get_current_game_state()
+    for _ in range(30):
+        p1_move = random.choice(list(Move))
+        p2_move = random.choice(list(Move))
+        assert engine.move(p1_move, p2_move) == reference.move(p1_move, p2_move)
+        assert engine.is_terminal() == reference.is_terminal()
+    reference.reset()
+    engine.reset()
+    assert engine.get_current_game_state() == reference.get_current_game_state()
+
+    # Other dimensions, the arrays are allocated again
+    engine.load(maze_3_2)
+    assert (
+        engine.get_current_game_state()
+        == NumpyEngine(maze_3_2).get_current_game_state()
+    )
@@ -1,11 +1,19 @@
+import pytest
+import random
+
 from pyrat_engine.engines.numpy_vectorized.helpers import (
     board_from_current_game_state,
+    bucket_by_size,
     get_current_cheese_list,
     get_muds,
     get_player_positions,
     get_walls,
 )
+from pyrat_engine.initializer.configs import MazeConfig
+from pyrat_engine.initializer.initializer import CurrentStateInitializer
 from pyrat_engine.state.base import CurrentGameState
+from pyrat_engine.types import Muds, Walls
+from pyrat_engine.utils import add_mud, add_wall, get_direction, valid_neighbors
 
 
 def test_get_player_positions(maze_3_2: CurrentGameState):
@@ -49,3 +57,69 @@ def test_board_from_game_state(maze_3_2: CurrentGameState):
     board = board_from_current_game_state(maze_3_2)
     assert board.maze_height == maze_3_2.maze_height
     assert board.maze_width == maze_3_2.maze_width
+
+
+def _loop_get_walls(board) -> Walls:
+    """Cell by cell reference implementation of get_walls"""
+    walls: Walls = {}
+    for i in range(board.maze_width):
+        for j in range(board.maze_height):
+            coordinate = (i, j)
+            for neighbour in valid_neighbors(
+                coordinate, board.maze_width, board.maze_height
+            ):
+                move = get_direction(coordinate, neighbour)
+                if not board.can_move[coordinate][move]:
+                    add_wall(walls, (coordinate, neighbour))
+    return walls
+
+
+def _loop_get_muds(board) -> Muds:
+    """Cell by cell reference implementation of get_muds"""
+    muds: Muds = {}
+    for i in range(board.maze_width):
+        for j in range(board.maze_height):
+            coordinate = (i, j)
+            for neighbour in valid_neighbors(
+                coordinate, board.maze_width, board.maze_height
+            ):
+                move = get_direction(coordinate, neighbour)
+                cost = board.cost[coordinate][move]
+                if cost > 1:
+                    add_mud(muds, coordinate, neighbour, cost)
+    return muds
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_conversions_match_loops(seed: int):
+    random.seed(seed)
+    maze_config = MazeConfig(width=11, height=7, mud_density=0.3, wall_density=0.5)
+    state = CurrentStateInitializer(maze_config=maze_config)()
+    board = board_from_current_game_state(state)
+    # The neighbour lists are compared in order
+    assert get_walls(board) == _loop_get_walls(board)
+    assert get_muds(board) == _loop_get_muds(board)
+
+
+def test_non_adjacent_wall_is_rejected(maze_3_2: CurrentGameState):
+    maze_3_2.walls = {(0, 0): [(2, 0)], (2, 0): [(0, 0)]}
+    with pytest.raises(ValueError):
+        board_from_current_game_state(maze_3_2)
+
+
+def test_bucket_by_size():
+    sizes = [(21, 15), (5, 5), (20, 15), (4, 5), (21, 14), (3, 3), (100, 2)]
+    buckets = bucket_by_size(sizes, max_overhead=0.25)
+    assert sorted(index for indices in buckets.values() for index in indices) == list(
+        range(len(sizes))
+    )
+    for (bucket_width, bucket_height), indices in buckets.items():
+        for index in indices:
+            width, height = sizes[index]
+            assert bucket_width >= width and bucket_height >= height
+            assert bucket_width * bucket_height <= 1.25 * width * height
+    assert buckets[(21, 15)] == [0, 2, 4]
+    assert buckets[(5, 5)] == [1, 3]
+    assert bucket_by_size(sizes, max_overhead=0) == {
+        size: [index] for index, size in enumerate(sizes)
+    }
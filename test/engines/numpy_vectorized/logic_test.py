@@ -1,163 +1,101 @@
 import numpy as np
 import numpy.typing as npt
-import pytest
 import random
 
 from pyrat_engine.engines.numpy_vectorized import NumpyEngine
-from pyrat_engine.engines.numpy_vectorized.helpers import state_from_current_state
+from pyrat_engine.engines.numpy_vectorized.base import (
+    NumpyState,
+    to_cell,
+    to_coordinates,
+)
+from pyrat_engine.engines.numpy_vectorized.helpers import (
+    multiplayer_state_from_current_state,
+    state_from_current_state,
+)
 from pyrat_engine.engines.numpy_vectorized.logic import (
     calculate_new_muds,
     compute_new_positions,
-    move_down,
-    move_left,
-    move_right,
-    move_up,
+    effective_moves,
+    legal_moves,
+    move,
+    move_players,
     update_cheese_and_score,
 )
 from pyrat_engine.state.base import CurrentGameState
 from pyrat_engine.types import Move
 
 
-def is_fortran_contiguous(array: npt.NDArray) -> bool:
-    """Check that the array is in fortran order in memory"""
-    return array.flags.f_contiguous
-
-
-@pytest.fixture
-def player_matrices() -> npt.NDArray[bool]:
-    arr = np.zeros((2, 3, 3), dtype=bool)
-    arr[0, 0, 0] = True
-    arr[1, 2, 2] = True
-    return arr
-
-
-def test_move_up(player_matrices: npt.NDArray[bool]) -> None:
-    ret = move_up(player_matrices[0])
-    coordinate = ret.nonzero()
-    # went from (0,0) to (0,1)
-    assert coordinate[0] == 0
-    assert coordinate[1] == 1
-
-    ret = move_up(player_matrices[1])
-    coordinate = ret.nonzero()
-    # went from (2,2) to (2,0)
-    assert coordinate[0] == 2
-    assert coordinate[1] == 0
-
-
-def test_move_down(player_matrices: npt.NDArray[bool]) -> None:
-    ret = move_down(player_matrices[0])
-    coordinate = ret.nonzero()
-    # went from (0,0) to (0,2)
-    assert coordinate[0] == 0
-    assert coordinate[1] == 2
-
-    ret = move_down(player_matrices[1])
-    coordinate = ret.nonzero()
-    # went from (2,2) to (2,1)
-    assert coordinate[0] == 2
-    assert coordinate[1] == 1
-
-
-def test_move_right(player_matrices: npt.NDArray[bool]) -> None:
-    ret = move_right(player_matrices[0])
-    coordinate = ret.nonzero()
-    # went from (0,0) to (1,0)
-    assert coordinate[0] == 1
-    assert coordinate[1] == 0
-
-    ret = move_right(player_matrices[1])
-    coordinate = ret.nonzero()
-    # went from (2,2) to (0,2)
-    assert coordinate[0] == 0
-    assert coordinate[1] == 2
-
-
-def test_move_left(player_matrices: npt.NDArray[bool]) -> None:
-    ret = move_left(player_matrices[0])
-    coordinate = ret.nonzero()
-    # went from (0,0) to (2,0)
-    assert coordinate[0] == 2
-    assert coordinate[1] == 0
-
-    ret = move_left(player_matrices[1])
-    coordinate = ret.nonzero()
-    # went from (2,2) to (1,2)
-    assert coordinate[0] == 1
-    assert coordinate[1] == 2
+def cells_to_coordinates(state: NumpyState, cells: npt.NDArray) -> npt.NDArray:
+    return np.stack(to_coordinates(cells, state.board.maze_height), axis=1)
 
 
 def test_compute_new_positions(maze_3_2: CurrentGameState):
     # Players are originally in (0,0) and (2,1)
     # There are walls between (0,0) and (1,0) and (0,1) and (1,1)
     state = state_from_current_state(maze_3_2)
-    new_positions = compute_new_positions(state, p1_move=Move.UP, p2_move=Move.DOWN)
-    player_positions = new_positions.nonzero()
-    player_positions = np.stack(player_positions[:2]).T
+    new_cells = compute_new_positions(state, (Move.UP, Move.DOWN))
+    player_positions = cells_to_coordinates(state, new_cells)
     assert (player_positions[0] == [0, 1]).all()
     assert (player_positions[1] == [2, 0]).all()
-    assert is_fortran_contiguous(new_positions)
 
-    new_positions = compute_new_positions(state, p1_move=Move.DOWN, p2_move=Move.LEFT)
-    player_positions = new_positions.nonzero()
-    player_positions = np.stack(player_positions[:2]).T
+    new_cells = compute_new_positions(state, (Move.DOWN, Move.LEFT))
+    player_positions = cells_to_coordinates(state, new_cells)
     assert (player_positions[0] == [0, 0]).all()
     assert (player_positions[1] == [1, 1]).all()
-    assert is_fortran_contiguous(new_positions)
 
-    new_positions = compute_new_positions(
-        state, p1_move=Move.DID_NOT_MOVE, p2_move=Move.RIGHT
-    )
-    player_positions = new_positions.nonzero()
-    player_positions = np.stack(player_positions[:2]).T
+    new_cells = compute_new_positions(state, (Move.DID_NOT_MOVE, Move.RIGHT))
+    player_positions = cells_to_coordinates(state, new_cells)
+    assert (player_positions[0] == [0, 0]).all()
+    assert (player_positions[1] == [2, 1]).all()
+
+    # Wall between (0,0) and (1,0)
+    new_cells = compute_new_positions(state, (Move.RIGHT, Move.UP))
+    player_positions = cells_to_coordinates(state, new_cells)
     assert (player_positions[0] == [0, 0]).all()
     assert (player_positions[1] == [2, 1]).all()
-    assert is_fortran_contiguous(new_positions)
 
 
-def test_get_misses(maze_3_2: CurrentGameState):
+def test_compute_new_positions_stuck(maze_3_2: CurrentGameState):
+    maze_3_2.player1_mud = 2
     state = state_from_current_state(maze_3_2)
+    new_cells = compute_new_positions(state, (Move.UP, Move.DOWN))
+    player_positions = cells_to_coordinates(state, new_cells)
+    assert (player_positions[0] == [0, 0]).all()
+    assert (player_positions[1] == [2, 0]).all()
 
-    def get_misses(
-        player_positions: npt.NDArray[bool], new_positions: npt.NDArray[bool]
-    ) -> npt.NDArray:
-        return (state.board.player_positions == new_positions).all(axis=(0, 1))
 
-    player_misses = get_misses(
-        state.board.player_positions, state.board.player_positions
-    )
-    assert player_misses.size == 2
-    assert (player_misses == [True, True]).all()
+def test_get_misses(maze_3_2: CurrentGameState):
+    state = state_from_current_state(maze_3_2)
 
-    new_positions = compute_new_positions(
-        state, p1_move=Move.DID_NOT_MOVE, p2_move=Move.LEFT
-    )
-    player_misses = get_misses(state.board.player_positions, new_positions)
-    assert (player_misses == [True, False]).all()
+    move(state, p1_move=Move.DID_NOT_MOVE, p2_move=Move.LEFT)
+    assert (state.game_data.player_misses == [1, 0]).all()
+
+    move(state, p1_move=Move.RIGHT, p2_move=Move.DOWN)
+    assert (state.game_data.player_misses == [2, 0]).all()
 
-    new_positions = compute_new_positions(state, p1_move=Move.UP, p2_move=Move.RIGHT)
-    player_misses = get_misses(state.board.player_positions, new_positions)
-    assert (player_misses == [False, True]).all()
+    # Wall between (0,0) and (1,0)
+    move(state, p1_move=Move.UP, p2_move=Move.LEFT)
+    assert (state.game_data.player_misses == [2, 1]).all()
 
 
 def test_get_muds(maze_2_2_mud: CurrentGameState):
     state = state_from_current_state(maze_2_2_mud)
-    new_muds = calculate_new_muds(state, Move.UP, Move.RIGHT)
+    new_muds = calculate_new_muds(state, (Move.UP, Move.RIGHT))
     assert (new_muds == [2, 1]).all()
 
     # test if the player is still stuck
     state.game_data.player_muds = np.array([3, 4])
-    new_muds = calculate_new_muds(state, Move.UP, Move.RIGHT)
+    new_muds = calculate_new_muds(state, (Move.UP, Move.RIGHT))
     assert (new_muds == [3, 4]).all()
 
     # test if only 1 of the players is still stuck
     state.game_data.player_muds = np.array([0, 4])
-    new_muds = calculate_new_muds(state, Move.UP, Move.RIGHT)
+    new_muds = calculate_new_muds(state, (Move.UP, Move.RIGHT))
     assert (new_muds == [2, 4]).all()
 
     # test if only 1 of the players is still stuck
     state.game_data.player_muds = np.array([4, 0])
-    new_muds = calculate_new_muds(state, Move.UP, Move.RIGHT)
+    new_muds = calculate_new_muds(state, (Move.UP, Move.RIGHT))
     assert (new_muds == [4, 1]).all()
 
 
@@ -169,6 +107,7 @@ def test_update_cheeses_and_scores(maze_2_2_mud: CurrentGameState):
     update_cheese_and_score(state)
     assert (state.game_data.player_scores == [1, 1]).all()
     assert (state.board.cheeses == np.zeros((2, 2))).all()
+    assert state.board.remaining_cheeses == 0
 
     # Place 1 player on a cheese
     maze_2_2_mud.player1_pos = (1, 0)
@@ -233,6 +172,9 @@ def test_data_types(maze_2_2_mud: CurrentGameState):
     move_list = list(Move)
     for _ in range(200):
         assert engine.state.board.player_positions.dtype == bool
+        assert engine.state.board.player_cells.dtype == np.intp
+        assert engine.state.board.next_cell.dtype == np.intp
+        assert engine.state.board.move_cost.dtype == np.uint8
         assert engine.state.board.can_move.dtype == bool
         assert engine.state.board.cost.dtype == np.uint8
         assert engine.state.board.cheeses.dtype == bool
@@ -240,3 +182,107 @@ def test_data_types(maze_2_2_mud: CurrentGameState):
         p1_move = random.choice(move_list)
         p2_move = random.choice(move_list)
         engine.move(p1_move, p2_move)
+
+
+def test_move_mud_is_taken_from_the_starting_cell(maze_2_2_mud: CurrentGameState):
+    state = state_from_current_state(maze_2_2_mud)
+    # (0,0) -> (0,1) costs 2 turns, (1,1) -> (1,0) costs 1 turn
+    move(state, Move.UP, Move.DOWN)
+    assert (state.game_data.player_muds == [1, 0]).all()
+    # player 1 is still in the mud and does not get the cheese yet
+    assert (state.game_data.player_scores == [0, 1]).all()
+    move(state, Move.UP, Move.DID_NOT_MOVE)
+    assert (state.game_data.player_muds == [0, 0]).all()
+    assert (state.game_data.player_scores == [1, 1]).all()
+
+
+def test_update_cheeses_and_scores_shared_cheese(maze_2_2_mud: CurrentGameState):
+    maze_2_2_mud.player1_pos = (1, 0)
+    maze_2_2_mud.player2_pos = (1, 0)
+    state = state_from_current_state(maze_2_2_mud)
+    update_cheese_and_score(state)
+    assert (state.game_data.player_scores == [0.5, 0.5]).all()
+    assert state.board.remaining_cheeses == 1
+
+
+def test_move_players_shares_cheeses(maze_2_2_mud: CurrentGameState):
+    # 3 players on the (1, 0) cheese, 1 player going up the mud to the (0, 1) one
+    state = multiplayer_state_from_current_state(
+        maze_2_2_mud, [(1, 0), (1, 0), (1, 0), (0, 0)]
+    )
+    points = move_players(
+        state, [Move.DID_NOT_MOVE, Move.LEFT, Move.DID_NOT_MOVE, Move.UP]
+    )
+    # The player going left is in the (1, 0) -> (0, 0) mud
+    assert points.tolist() == [0.5, 0, 0.5, 0]
+    assert state.game_data.player_misses.tolist() == [1, 0, 1, 0]
+    assert state.game_data.player_muds.tolist() == [0, 1, 0, 1]
+    assert state.board.remaining_cheeses == 1
+
+    state = multiplayer_state_from_current_state(
+        maze_2_2_mud, [(1, 0), (1, 0), (1, 0), (0, 0)]
+    )
+    points = move_players(state, [Move.DID_NOT_MOVE] * 3 + [Move.UP])
+    assert np.allclose(points, [1 / 3, 1 / 3, 1 / 3, 0])
+    points = move_players(state, [Move.DID_NOT_MOVE] * 4)
+    assert points.tolist() == [0, 0, 0, 1]
+    assert state.board.remaining_cheeses == 0
+    assert state.board.player_positions.sum(axis=(0, 1)).tolist() == [1] * 4
+
+
+def test_move_players_shares_add_up(maze_2_2_mud: CurrentGameState):
+    # 3 players share the (1, 0) cheese, put back after every turn
+    state = multiplayer_state_from_current_state(
+        maze_2_2_mud, [(1, 0), (1, 0), (1, 0), (0, 0)]
+    )
+    for _ in range(300):
+        move_players(state, [Move.DID_NOT_MOVE] * 4)
+        state.board.put_cheese(to_cell((1, 0), state.board.maze_height))
+    assert np.allclose(state.game_data.player_scores, [100, 100, 100, 0], rtol=0)
+
+
+def test_move_players_matches_move(current_game_state_with_mud: CurrentGameState):
+    state = state_from_current_state(current_game_state_with_mud)
+    multiplayer_state = multiplayer_state_from_current_state(
+        current_game_state_with_mud,
+        [
+            current_game_state_with_mud.player1_pos,
+            current_game_state_with_mud.player2_pos,
+        ],
+    )
+    for _ in range(100):
+        moves = [random.choice(list(Move)), random.choice(list(Move))]
+        points = move(state, *moves)
+        assert (move_players(multiplayer_state, moves) == points).all()
+        assert (multiplayer_state.board.player_cells == state.board.player_cells).all()
+        for name in ("player_scores", "player_muds", "player_misses"):
+            assert (
+                getattr(multiplayer_state.game_data, name)
+                == getattr(state.game_data, name)
+            ).all()
+
+
+def test_legal_moves(maze_3_2: CurrentGameState):
+    state = state_from_current_state(maze_3_2)
+    is_legal = legal_moves(state)
+    # Player 1 in (0, 0) has a wall on its right
+    assert is_legal[0].tolist() == [True, False, False, False, True]
+    # Player 2 in (2, 1) can go left and down
+    assert is_legal[1].tolist() == [False, True, True, False, True]
+    # A stuck player can only stay in place
+    state.game_data.player_muds[1] = 2
+    assert legal_moves(state)[1].tolist() == [False, False, False, False, True]
+
+
+def test_effective_moves(maze_3_2: CurrentGameState):
+    state = state_from_current_state(maze_3_2)
+    assert effective_moves(state).tolist() == [
+        [
+            Move.UP,
+            Move.DID_NOT_MOVE,
+            Move.DID_NOT_MOVE,
+            Move.DID_NOT_MOVE,
+            Move.DID_NOT_MOVE,
+        ],
+        [Move.DID_NOT_MOVE, Move.LEFT, Move.DOWN, Move.DID_NOT_MOVE, Move.DID_NOT_MOVE],
+    ]
@@ -0,0 +1,35 @@
+import random
+
+from pyrat_engine.engines.numpy_vectorized import NumpyEngine, PackedNumpyEngine
+from pyrat_engine.state.base import CurrentGameState
+from pyrat_engine.types import Move
+
+
+def test_packed_engine_matches_numpy_engine(
+    current_game_state_with_mud_and_cheese: CurrentGameState,
+):
+    engine = NumpyEngine(current_game_state_with_mud_and_cheese)
+    packed_engine = PackedNumpyEngine(current_game_state_with_mud_and_cheese)
+    assert engine.get_current_game_state() == packed_engine.get_current_game_state()
+    move_list = list(Move)
+    for turn in range(300):
+        if turn % 100 == 0:
+            engine.reset()
+            packed_engine.reset()
+        p1_move = random.choice(move_list)
+        p2_move = random.choice(move_list)
+        assert engine.move(p1_move, p2_move) == packed_engine.move(p1_move, p2_move)
+        assert engine.get_current_game_state() == packed_engine.get_current_game_state()
+
+
+def test_packed_engine_unmove(
+    current_game_state_with_mud_and_cheese: CurrentGameState,
+):
+    engine = PackedNumpyEngine(current_game_state_with_mud_and_cheese)
+    initial_state = engine.get_current_game_state()
+    moves = [(random.choice(list(Move)), random.choice(list(Move))) for _ in range(50)]
+    for p1_move, p2_move in moves:
+        engine.move(p1_move, p2_move)
+    for p1_move, p2_move in reversed(moves):
+        engine.unmove(p1_move, p2_move)
+    assert engine.get_current_game_state() == initial_state
@@ -0,0 +1,38 @@
+from pyrat_engine.engines.numpy_vectorized import NumpyEngine
+from pyrat_engine.engines.numpy_vectorized.pool import EnginePool
+from pyrat_engine.state.base import CurrentGameState
+from pyrat_engine.types import Move
+
+
+def test_engines_are_recycled_by_size(
+    current_game_state: CurrentGameState,
+    current_game_state_with_mud: CurrentGameState,
+    maze_3_2: CurrentGameState,
+):
+    pool = EnginePool(max_idle_per_size=1, max_turns=10)
+    with pool.engine(current_game_state) as engine:
+        engine.move(Move.UP, Move.UP)
+    assert len(pool) == 1
+
+    # A maze of another size gets a new engine
+    small_engine = pool.acquire(maze_3_2)
+    assert small_engine is not engine
+    assert (
+        small_engine.get_current_game_state()
+        == NumpyEngine(maze_3_2).get_current_game_state()
+    )
+
+    recycled_engine = pool.acquire(current_game_state_with_mud)
+    assert recycled_engine is engine
+    assert len(pool) == 0
+    assert (
+        recycled_engine.get_current_game_state()
+        == NumpyEngine(current_game_state_with_mud).get_current_game_state()
+    )
+    assert recycled_engine._max_turns == 10
+
+    pool.release(recycled_engine)
+    pool.release(pool.acquire(maze_3_2))
+    pool.release(small_engine)
+    # At most one idle engine per size
+    assert len(pool) == 2
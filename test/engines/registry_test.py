@@ -0,0 +1,84 @@
+import json
+
+import math
+import pytest
+
+from pyrat_engine.benchmarking import calibration
+from pyrat_engine.engines import ENGINES, available_engines, make_engine
+from pyrat_engine.engines.bitboard import BitboardEngine
+from pyrat_engine.engines.flat_array import FlatArrayEngine
+from pyrat_engine.engines.numpy_vectorized import BatchedNumpyEngine, NumpyEngine
+from pyrat_engine.state.base import CurrentGameState
+
+
+@pytest.fixture
+def cache_path(tmp_path) -> str:
+    return str(tmp_path / "calibration.json")
+
+
+def test_make_engine_by_name(current_game_state: CurrentGameState, cache_path: str):
+    engine = make_engine(current_game_state, prefer="bitboard", cache_path=cache_path)
+    assert isinstance(engine, BitboardEngine)
+    engine = make_engine(current_game_state, prefer="numpy", max_turns=3)
+    assert isinstance(engine, NumpyEngine)
+    assert engine._max_turns == 3
+    # A single engine is built without calibrating
+    assert calibration.load_calibration(cache_path) == {}
+
+    with pytest.raises(ValueError):
+        make_engine(current_game_state, prefer="unknown")
+    with pytest.raises(ValueError):
+        make_engine(current_game_state, prefer="batched_numpy")
+    with pytest.raises(ValueError):
+        make_engine(current_game_state, prefer="vanilla_py", max_turns=3)
+
+
+def test_make_engine_picks_the_fastest_and_caches_timings(
+    current_game_state: CurrentGameState, cache_path: str, monkeypatch
+):
+    fake_timings = {NumpyEngine: 2.0, BitboardEngine: 3.0, FlatArrayEngine: 1.0}
+    timed = []
+
+    def time_engine(engine_cls, state, batch_size=1):
+        timed.append(engine_cls)
+        return fake_timings.get(engine_cls, math.inf)
+
+    monkeypatch.setattr(calibration, "time_engine", time_engine)
+    prefer = ["numpy", "bitboard", "flat_array"]
+    engine = make_engine(current_game_state, prefer=prefer, cache_path=cache_path)
+    assert isinstance(engine, FlatArrayEngine)
+    assert sorted(timed, key=id) == sorted(fake_timings, key=id)
+
+    # The second time comes from the cache
+    timed.clear()
+    engine = make_engine(current_game_state, prefer=prefer[:2], cache_path=cache_path)
+    assert isinstance(engine, NumpyEngine)
+    assert timed == []
+    with open(cache_path) as cache_file:
+        cache = json.load(cache_file)
+    key = calibration.calibration_key(current_game_state)
+    assert cache[calibration.machine_key()][key] == {
+        "numpy": 2.0,
+        "bitboard": 3.0,
+        "flat_array": 1.0,
+    }
+
+
+def test_make_engine_calibrates_available_engines(
+    current_game_state_with_mud_and_cheese: CurrentGameState, cache_path: str
+):
+    engine = make_engine(current_game_state_with_mud_and_cheese, cache_path=cache_path)
+    timings = calibration.load_calibration(cache_path)[
+        calibration.calibration_key(current_game_state_with_mud_and_cheese)
+    ]
+    assert sorted(timings) == sorted(available_engines())
+    fastest = min(timings, key=timings.__getitem__)
+    assert isinstance(engine, ENGINES[fastest].load())
+
+
+def test_make_engine_batch(current_game_state: CurrentGameState, cache_path: str):
+    engine = make_engine(current_game_state, batch_size=4, cache_path=cache_path)
+    assert isinstance(engine, BatchedNumpyEngine)
+    assert engine.nb_games == 4
+    with pytest.raises(ValueError):
+        make_engine([current_game_state] * 3, batch_size=4)
@@ -0,0 +1,67 @@
+import pytest
+import random
+from copy import deepcopy
+
+from pyrat_engine.engines.base import is_over
+from pyrat_engine.engines.vanilla_py import player_move_handler
+from pyrat_engine.engines.vanilla_py.vanilla_py_engine import VanillaPyEngine
+from pyrat_engine.state.base import CurrentGameState
+from pyrat_engine.types import Move
+
+
+def test_move_matches_player_move_handler(
+    current_game_state_with_mud_and_cheese: CurrentGameState,
+):
+    engine = VanillaPyEngine(current_game_state_with_mud_and_cheese)
+    reference = deepcopy(current_game_state_with_mud_and_cheese)
+    half_cheeses = len(reference.current_cheese_list) / 2
+    for _ in range(200):
+        p1_move = random.choice(list(Move))
+        p2_move = random.choice(list(Move))
+        scores = (reference.player1_score, reference.player2_score)
+        player_move_handler.move(reference, p1_move, p2_move)
+        assert engine.move(p1_move, p2_move) == (
+            reference.player1_score - scores[0],
+            reference.player2_score - scores[1],
+        )
+        assert engine.get_current_game_state() == reference
+        assert engine.is_terminal() == is_over(
+            len(reference.current_cheese_list),
+            reference.player1_score,
+            reference.player2_score,
+            half_cheeses,
+        )
+
+
+def test_unmove_restores_previous_state(
+    current_game_state_with_mud_and_cheese: CurrentGameState,
+):
+    engine = VanillaPyEngine(current_game_state_with_mud_and_cheese)
+    states = []
+    for _ in range(100):
+        states.append(engine.get_current_game_state())
+        engine.move(random.choice(list(Move)), random.choice(list(Move)))
+    for state in reversed(states):
+        engine.unmove(Move.DID_NOT_MOVE, Move.DID_NOT_MOVE)
+        assert engine.get_current_game_state() == state
+    with pytest.raises(ValueError):
+        engine.unmove(Move.DID_NOT_MOVE, Move.DID_NOT_MOVE)
+
+
+def test_snapshot_restore(current_game_state_with_mud: CurrentGameState):
+    engine = VanillaPyEngine(current_game_state_with_mud)
+    snapshot = engine.snapshot()
+    for _ in range(20):
+        engine.move(random.choice(list(Move)), random.choice(list(Move)))
+    engine.restore(snapshot)
+    assert engine.get_current_game_state() == current_game_state_with_mud
+
+
+def test_clone_is_independent(current_game_state_with_mud: CurrentGameState):
+    engine = VanillaPyEngine(current_game_state_with_mud)
+    clone = engine.clone()
+    for _ in range(20):
+        clone.move(random.choice(list(Move)), random.choice(list(Move)))
+    assert engine.get_current_game_state() == current_game_state_with_mud
+    clone.reset()
+    assert clone.get_current_game_state() == current_game_state_with_mud
@@ -0,0 +1,115 @@
+import gc
+import pytest
+
+from pyrat_engine.engines.bitboard import BitboardEngine
+from pyrat_engine.engines.flat_array import FlatArrayEngine
+from pyrat_engine.engines.numba_jit import NumbaEngine
+from pyrat_engine.engines.numpy_vectorized import NumpyEngine, PackedNumpyEngine
+from pyrat_engine.engines.vanilla_py.vanilla_py_engine import VanillaPyEngine
+from pyrat_engine.initializer.configs import MazeConfig
+from pyrat_engine.initializer.initializer import CurrentStateInitializer
+from pyrat_engine.state.base import (
+    CurrentGameState,
+    GameState,
+    MazeTopology,
+    intern_topology,
+)
+from pyrat_engine.types import Move
+
+
+def test_topology_round_trip(current_game_state_with_mud: CurrentGameState):
+    topology = MazeTopology.from_current_game_state(current_game_state_with_mud)
+    assert topology.walls_dict() == current_game_state_with_mud.walls
+    assert topology.mud_dict() == current_game_state_with_mud.mud
+    # Each call gives a new dict
+    assert topology.walls_dict() is not topology.walls_dict()
+
+    game_state = GameState.from_current_game_state(current_game_state_with_mud)
+    assert game_state.to_current_game_state() == current_game_state_with_mud
+    copy = game_state.copy()
+    copy.current_cheese_list.append((0, 0))
+    assert copy.topology is game_state.topology
+    assert copy.current_cheese_list != game_state.current_cheese_list
+
+
+def test_intern_topology(current_game_state_with_mud: CurrentGameState):
+    topology = intern_topology(
+        MazeTopology.from_current_game_state(current_game_state_with_mud)
+    )
+    other = MazeTopology.from_current_game_state(current_game_state_with_mud)
+    assert other == topology and hash(other) == hash(topology)
+    assert other is not topology
+    assert intern_topology(other) is topology
+    with pytest.raises(AttributeError):
+        topology.maze_width = 3
+
+
+def test_interned_topologies_are_not_kept_alive():
+    # A maze no other test uses
+    topology = intern_topology(MazeTopology(3, 1, walls=(((0, 0), ((1, 0),)),)))
+    other = MazeTopology(3, 1, walls=(((0, 0), ((1, 0),)),))
+    del topology
+    gc.collect()
+    assert intern_topology(other) is other
+
+
+@pytest.mark.parametrize(
+    "engine_cls", [BitboardEngine, FlatArrayEngine, VanillaPyEngine]
+)
+def test_engines_share_the_tables_of_a_maze(
+    current_game_state_with_mud_and_cheese: CurrentGameState, engine_cls
+):
+    engine = engine_cls(current_game_state_with_mud_and_cheese)
+    other_engine = engine_cls(current_game_state_with_mud_and_cheese)
+    assert engine._maze is other_engine._maze
+    assert engine.get_current_game_state() == other_engine.get_current_game_state()
+
+
+@pytest.mark.parametrize("engine_cls", [NumpyEngine, NumbaEngine])
+def test_numpy_engines_share_the_arrays_of_a_maze(
+    current_game_state_with_mud_and_cheese: CurrentGameState, engine_cls
+):
+    engine = engine_cls(current_game_state_with_mud_and_cheese)
+    other_engine = engine_cls(
+        GameState.from_current_game_state(current_game_state_with_mud_and_cheese)
+    )
+    board, other_board = engine.state.board, other_engine.state.board
+    assert board.topology is other_board.topology
+    for name in ("can_move", "cost", "next_cell", "move_cost"):
+        assert getattr(board, name) is getattr(other_board, name)
+    assert board.cheese_cells is not other_board.cheese_cells
+    engine.move(Move.UP, Move.UP)
+    assert engine.get_current_game_state() != other_engine.get_current_game_state()
+
+
+@pytest.mark.parametrize(
+    "engine_cls",
+    [
+        NumpyEngine,
+        PackedNumpyEngine,
+        NumbaEngine,
+        BitboardEngine,
+        FlatArrayEngine,
+        VanillaPyEngine,
+    ],
+)
+def test_engines_start_from_a_game_state(
+    current_game_state_with_mud_and_cheese: CurrentGameState, engine_cls
+):
+    game_state = GameState.from_current_game_state(
+        current_game_state_with_mud_and_cheese
+    )
+    assert (
+        engine_cls(game_state).get_current_game_state()
+        == engine_cls(current_game_state_with_mud_and_cheese).get_current_game_state()
+    )
+
+
+def test_initializer_games_on_a_topology(small_maze_config: MazeConfig):
+    initializer = CurrentStateInitializer(maze_config=small_maze_config)
+    game_state = initializer.game_state()
+    other_game_state = initializer.game_state(game_state.topology)
+    assert other_game_state.topology is game_state.topology
+    assert isinstance(initializer(), CurrentGameState)
+    with pytest.raises(ValueError):
+        CurrentStateInitializer().game_state(game_state.topology)